@@ -0,0 +1,157 @@
+"""Production ASGI entry point for the Flight Delay Prediction API
+
+Run with an ASGI server, e.g.
+
+    uvicorn asgi_app:app --host 0.0.0.0 --port 5000
+
+POST /api/predict-delay is served natively: concurrent requests are
+collected into micro-batches and scored with predict_delay_risk_many, which
+checks the prediction cache like the Flask route and scores the misses in
+one vectorized call (or on the single-flight path when there is one miss).
+The model that scores a batch also supplies its route history. With
+FLIGHT_DELAY_PROFILE_SLOWEST set, each micro-batch is profiled as one
+request. GET /api/batcher-stats reports queue depth, batch sizes and wait
+times. Every other route is delegated to the Flask app in
+delay_prediction_api through asgiref's WSGI adapter.
+
+Tuning (environment variables):
+    FLIGHT_DELAY_MAX_BATCH_SIZE  largest micro-batch (default 64)
+    FLIGHT_DELAY_MAX_WAIT_MS     longest a request waits for a batch to fill (default 5)
+    FLIGHT_DELAY_MAX_QUEUE       queued requests before answering 503 (default 10000)
+"""
+import json
+import os
+import time
+
+from asgiref.wsgi import WsgiToAsgi
+
+import delay_prediction_api as api
+from metrics import REGISTRY, stage_timer
+from micro_batcher import BatcherClosedError, MicroBatcher, QueueFullError
+
+REGISTRY.histogram('flight_delay_micro_batch_size', 'Requests per micro-batch',
+                   buckets=MicroBatcher.BATCH_SIZE_BUCKETS)
+
+def score_micro_batch(requests):
+    """Score a micro-batch of (prediction data, flight data, departure time) requests
+    
+    The batch is scored by the model active when it runs, which it holds
+    until the responses are complete, so a hot-swap never splits a batch
+    across models and route history comes from the model that scored the
+    flight. Results match what the Flask route returns for each request.
+    """
+    start = time.perf_counter()
+    profiler = api.request_profiler
+    if profiler is not None:
+        profiler.begin()
+    REGISTRY.observe('flight_delay_micro_batch_size', len(requests))
+    with api.swapper.lease() as predictor:
+        results = predictor.predict_delay_risk_many([prediction_data for prediction_data, _, _ in requests])
+        with stage_timer('recommendations'):
+            for result, (_, flight_data, departure_time) in zip(results, requests):
+                if 'error' not in result:
+                    api.add_prediction_context(result, flight_data, departure_time, predictor)
+    if profiler is not None:
+        profiler.end(f'POST /api/predict-delay (micro-batch of {len(requests)})', time.perf_counter() - start)
+    return results
+
+batcher = MicroBatcher(
+    score_micro_batch,
+    max_batch_size=int(os.environ.get('FLIGHT_DELAY_MAX_BATCH_SIZE', '64')),
+    max_wait_ms=float(os.environ.get('FLIGHT_DELAY_MAX_WAIT_MS', '5')),
+    max_queue_size=int(os.environ.get('FLIGHT_DELAY_MAX_QUEUE', '10000'))
+)
+
+flask_app = WsgiToAsgi(api.app)
+
+REGISTRY.gauge('flight_delay_batcher_queue_depth', 'Requests waiting for a micro-batch',
+               lambda: batcher.stats()['queue_depth'])
+
+async def app(scope, receive, send):
+    """ASGI application"""
+    if scope['type'] == 'lifespan':
+        await _lifespan(receive, send)
+        return
+    if scope['type'] != 'http':
+        return
+
+    path = scope['path']
+    method = scope['method']
+    if path == '/api/predict-delay' and method == 'POST':
+        start = time.perf_counter()
+        status = await _predict_delay(receive, send)
+        REGISTRY.observe('flight_delay_request_seconds', time.perf_counter() - start,
+                         endpoint='predict_delay')
+        REGISTRY.inc('flight_delay_requests_total', endpoint='predict_delay', status=status)
+    elif path == '/api/batcher-stats' and method == 'GET':
+        await _send_json(send, 200, batcher.stats())
+    else:
+        await flask_app(scope, receive, send)
+
+async def _predict_delay(receive, send):
+    """Micro-batched equivalent of delay_prediction_api.predict_delay"""
+    if not api.model_loader.ready:
+        await _send_json(send, 503, {
+            'error': 'Model is not ready yet',
+            'model_state': api.model_loader.state
+        }, retry_after=api.RETRY_AFTER_SECONDS)
+        return 503
+
+    body = await _read_body(receive)
+    try:
+        with stage_timer('parse_request'):
+            flight_data = json.loads(body)
+        prediction_data, departure_time = api.build_prediction_data(flight_data)
+    except ValueError as e:
+        await _send_json(send, 400, {'error': str(e)})
+        return 400
+
+    try:
+        result = await batcher.submit((prediction_data, flight_data, departure_time))
+    except (QueueFullError, BatcherClosedError) as e:
+        await _send_json(send, 503, {'error': str(e)}, retry_after=1)
+        return 503
+    except Exception as e:
+        REGISTRY.inc('flight_delay_errors_total', endpoint='predict_delay', error=type(e).__name__)
+        await _send_json(send, 500, {'error': str(e)})
+        return 500
+
+    if 'error' in result:
+        await _send_json(send, 400, result)
+        return 400
+    await _send_json(send, 200, result)
+    return 200
+
+async def _read_body(receive):
+    chunks = []
+    while True:
+        message = await receive()
+        chunks.append(message.get('body', b''))
+        if not message.get('more_body'):
+            return b''.join(chunks)
+
+async def _send_json(send, status, payload, retry_after=None):
+    body = json.dumps(payload).encode()
+    headers = [
+        (b'content-type', b'application/json'),
+        (b'content-length', str(len(body)).encode()),
+        (b'access-control-allow-origin', b'*')
+    ]
+    if retry_after is not None:
+        headers.append((b'retry-after', str(retry_after).encode()))
+    await send({'type': 'http.response.start', 'status': status, 'headers': headers})
+    await send({'type': 'http.response.body', 'body': body})
+
+async def _lifespan(receive, send):
+    while True:
+        message = await receive()
+        if message['type'] == 'lifespan.startup':
+            await send({'type': 'lifespan.startup.complete'})
+        elif message['type'] == 'lifespan.shutdown':
+            await batcher.close()
+            await send({'type': 'lifespan.shutdown.complete'})
+            return
+
+if __name__ == '__main__':
+    import uvicorn
+    uvicorn.run(app, host='0.0.0.0', port=int(os.environ.get('PORT', '5000')))
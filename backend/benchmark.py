@@ -0,0 +1,447 @@
+"""Benchmark suite for the flight delay predictor and API
+
+Run the benchmarks and write the results as JSON:
+
+    python benchmark.py run --output results.json
+    python benchmark.py run --sizes 10000,50000 --concurrency 1,8,32 --output results.json
+
+Compare a run against a stored baseline. The exit status is 1 if any
+benchmark regressed by more than --threshold:
+
+    python benchmark.py compare baseline.json results.json --threshold 0.10
+
+Every benchmark reports p50/p95/p99/mean latency in milliseconds,
+throughput, and the process's peak RSS after it ran. Peak RSS is a
+high-water mark, so it only grows through a run. The API benchmarks use
+Flask's test client by default, and the ASGI app's micro-batched
+/api/predict-delay is driven in-process at the same concurrency levels. Pass
+--url to drive a running server instead.
+"""
+import asyncio
+import argparse
+import contextlib
+import io
+import json
+import multiprocessing
+import os
+import platform
+import sys
+import tempfile
+import threading
+import time
+import urllib.error
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+import numpy as np
+import sklearn
+
+from flight_delay_predictor import FlightDelayPredictor, INFERENCE_ENGINES
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+DEFAULT_SIZES = (1000, 10000)
+DEFAULT_BATCH_SIZES = (1, 100, 1000, 10000)
+DEFAULT_CONCURRENCY = (1, 8)
+
+# Metrics where a larger value is worse; throughput is the opposite
+LATENCY_METRICS = ('p50_ms', 'p95_ms', 'p99_ms')
+
+SAMPLE_FLIGHT = {
+    'airline': 'AA',
+    'origin_airport': 'JFK',
+    'dest_airport': 'LAX',
+    'departure_time': '2024-07-15T08:30:00',
+    'distance': 2500,
+    'temperature': 85,
+    'wind_speed': 15,
+    'visibility': 10,
+    'precipitation': 0,
+    'origin_congestion': 0.7,
+    'dest_congestion': 0.6
+}
+
+def peak_rss_mb():
+    """Peak resident set size of this process in MB, or None if unknown"""
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is in bytes on macOS and in kilobytes elsewhere
+    return peak / (1024 * 1024) if sys.platform == 'darwin' else peak / 1024
+
+def summarize(latencies, items=None, wall_time=None):
+    """Latency percentiles (ms) and throughput for a list of per-call seconds
+
+    items is the number of units processed (rows, requests) and defaults to
+    the number of calls. wall_time defaults to the sum of the latencies,
+    which is right for sequential runs; concurrent runs pass the elapsed
+    time instead.
+    """
+    latencies_ms = np.asarray(latencies, dtype=float) * 1000
+    items = len(latencies_ms) if items is None else items
+    wall_time = latencies_ms.sum() / 1000 if wall_time is None else wall_time
+    p50, p95, p99 = np.percentile(latencies_ms, [50, 95, 99])
+    return {
+        'calls': len(latencies_ms),
+        'p50_ms': round(float(p50), 4),
+        'p95_ms': round(float(p95), 4),
+        'p99_ms': round(float(p99), 4),
+        'mean_ms': round(float(latencies_ms.mean()), 4),
+        'throughput_per_s': round(items / wall_time, 2) if wall_time > 0 else None,
+        'peak_rss_mb': peak_rss_mb()
+    }
+
+def time_calls(func, repeat):
+    """Call func repeat times and return the per-call seconds"""
+    latencies = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        latencies.append(time.perf_counter() - start)
+    return latencies
+
+@contextlib.contextmanager
+def quiet():
+    """Silence the predictor's progress output while timing"""
+    with contextlib.redirect_stdout(io.StringIO()):
+        yield
+
+class BenchmarkRunner:
+    """Runs the predictor and API benchmarks and collects their summaries"""
+    def __init__(self, sizes=DEFAULT_SIZES, batch_sizes=DEFAULT_BATCH_SIZES,
+                 concurrency=DEFAULT_CONCURRENCY, repeat=5, single_calls=500,
+                 api_requests=500, url=None, workdir=None, seed=42):
+        self.sizes = sizes
+        self.batch_sizes = batch_sizes
+        self.concurrency = concurrency
+        self.repeat = repeat
+        self.single_calls = single_calls
+        self.api_requests = api_requests
+        self.url = url
+        # Training data is generated from seed, prediction inputs from seed + 1
+        self.seed = seed
+        self.workdir = workdir or tempfile.mkdtemp(prefix='flight_delay_bench_')
+        self.results = {}
+
+    def record(self, name, summary, **params):
+        summary.update(params)
+        self.results[name] = summary
+        print(f"{name:45s} p50={summary['p50_ms']:10.3f}ms p95={summary['p95_ms']:10.3f}ms "
+              f"throughput={summary['throughput_per_s']}/s")
+
+    def run(self):
+        predictor = None
+        for n_samples in self.sizes:
+            predictor = self.bench_training(n_samples)
+        self.bench_persistence(predictor)
+        self.bench_prediction(predictor)
+        self.bench_worker_pool(predictor)
+        self.bench_api(predictor)
+        self.bench_asgi()
+        return {'meta': self.meta(), 'results': self.results}
+
+    def meta(self):
+        return {
+            'created_at': datetime.now().isoformat(timespec='seconds'),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'cpu_count': os.cpu_count(),
+            'numpy_version': np.__version__,
+            'sklearn_version': sklearn.__version__,
+            'sizes': list(self.sizes),
+            'batch_sizes': list(self.batch_sizes),
+            'concurrency': list(self.concurrency),
+            'repeat': self.repeat,
+            'seed': self.seed,
+            'api_target': self.url or 'flask-test-client'
+        }
+
+    def bench_training(self, n_samples):
+        """generate_synthetic_data and train_model at one training set size"""
+        predictor = FlightDelayPredictor()
+        latencies = time_calls(lambda: predictor.generate_synthetic_data(n_samples, random_state=self.seed),
+                               self.repeat)
+        self.record(f'generate_synthetic_data[{n_samples}]',
+                    summarize(latencies, items=n_samples * len(latencies)), rows=n_samples)
+
+        df = predictor.generate_synthetic_data(n_samples, random_state=self.seed)
+        with quiet():
+            latencies = time_calls(lambda: predictor.train_model(df, verbose=False), 1)
+        self.record(f'train_model[{n_samples}]', summarize(latencies, items=n_samples), rows=n_samples)
+        return predictor
+
+    def bench_persistence(self, predictor):
+        """Save and load the bundle directory and the legacy pickle"""
+        bundle_path = os.path.join(self.workdir, 'bundle')
+        pickle_path = os.path.join(self.workdir, 'model.pkl')
+        with quiet():
+            save_bundle = time_calls(lambda: predictor.save_bundle(bundle_path), self.repeat)
+            load_bundle = time_calls(lambda: FlightDelayPredictor().load_model(bundle_path), self.repeat)
+            save_pickle = time_calls(lambda: predictor.save_model(pickle_path), self.repeat)
+            load_pickle = time_calls(lambda: FlightDelayPredictor().load_model(pickle_path), self.repeat)
+        self.record('save_bundle', summarize(save_bundle))
+        self.record('load_model[bundle]', summarize(load_bundle))
+        self.record('save_model[pkl]', summarize(save_pickle))
+        self.record('load_model[pkl]', summarize(load_pickle))
+        self.bundle_path = bundle_path
+
+    def bench_prediction(self, predictor):
+        """Single-flight and batch scoring with each inference engine"""
+        rows = predictor.generate_synthetic_data(max(self.batch_sizes), random_state=self.seed + 1)
+        rows = rows[predictor.feature_columns].to_dict('records')
+        flight = rows[0]
+        for engine in INFERENCE_ENGINES:
+            predictor.inference_engine = engine
+            if engine == 'compiled' and predictor.compiled_model is None:
+                predictor.compile_model()
+
+            latencies = time_calls(lambda: predictor.predict_delay_risk(flight), self.single_calls)
+            self.record(f'predict_delay_risk[{engine}]', summarize(latencies), engine=engine)
+
+            for batch_size in self.batch_sizes:
+                batch = rows[:batch_size]
+                latencies = time_calls(lambda: predictor.predict_delay_risk_batch(batch), self.repeat)
+                self.record(f'predict_delay_risk_batch[{engine},{batch_size}]',
+                            summarize(latencies, items=batch_size * len(latencies)),
+                            engine=engine, rows=batch_size)
+
+    def bench_worker_pool(self, predictor):
+        """The largest batch scored in-process and split across forked inference workers"""
+        if 'fork' not in multiprocessing.get_all_start_methods():
+            return
+        from worker_pool import InferenceWorkerPool
+        batch_size = max(self.batch_sizes)
+        rows = predictor.generate_synthetic_data(batch_size, random_state=self.seed + 1)
+        rows = rows[predictor.feature_columns].to_dict('records')
+        n_workers = max(2, os.cpu_count() or 1)
+        pool = InferenceWorkerPool(predictor, n_workers=n_workers,
+                                   min_rows_per_worker=max(1, batch_size // n_workers))
+        with quiet():
+            pool.start()
+        try:
+            for name, scorer in (('in_process', predictor), (f'workers={n_workers}', pool)):
+                scorer.predict_delay_risk_batch(rows)
+                latencies = time_calls(lambda: scorer.predict_delay_risk_batch(rows), self.repeat)
+                self.record(f'worker_pool[{name},{batch_size}]',
+                            summarize(latencies, items=batch_size * len(latencies)), rows=batch_size)
+        finally:
+            pool.close()
+
+    def bench_api(self, predictor):
+        """Drive /api/predict-delay and /api/batch-predict at each concurrency level"""
+        post = self._remote_post if self.url else self._test_client_post()
+        batch = [SAMPLE_FLIGHT] * 100
+        for concurrency in self.concurrency:
+            for endpoint, payload, rows in (('/api/predict-delay', SAMPLE_FLIGHT, 1),
+                                            ('/api/batch-predict', batch, len(batch))):
+                latencies, elapsed, failures = self._drive(post, endpoint, payload, concurrency)
+                summary = summarize(latencies, items=rows * len(latencies), wall_time=elapsed)
+                self.record(f'api[{endpoint},c={concurrency}]', summary,
+                            concurrency=concurrency, rows_per_request=rows, failures=failures)
+
+    def bench_asgi(self):
+        """Drive the ASGI app's micro-batched /api/predict-delay in-process
+
+        Results are named like the Flask test client's, with asgi in place
+        of api, so the two can be read side by side at each concurrency.
+        Skipped when benchmarking a remote server.
+        """
+        if self.url:
+            return
+        import asgi_app
+        body = json.dumps(SAMPLE_FLIGHT).encode()
+        for concurrency in self.concurrency:
+            latencies, elapsed, failures = asyncio.run(
+                self._drive_asgi(asgi_app.app, '/api/predict-delay', body, concurrency))
+            summary = summarize(latencies, items=len(latencies), wall_time=elapsed)
+            self.record(f'asgi[/api/predict-delay,c={concurrency}]', summary,
+                        concurrency=concurrency, rows_per_request=1, failures=failures)
+
+    async def _drive_asgi(self, app, endpoint, body, concurrency):
+        latencies = []
+        failures = 0
+        requests = iter(range(self.api_requests))
+
+        async def client():
+            nonlocal failures
+            for _ in requests:
+                start = time.perf_counter()
+                status = await asgi_post(app, endpoint, body)
+                latencies.append(time.perf_counter() - start)
+                if status != 200:
+                    failures += 1
+
+        start = time.perf_counter()
+        await asyncio.gather(*(client() for _ in range(concurrency)))
+        return latencies, time.perf_counter() - start, failures
+
+    def _drive(self, post, endpoint, payload, concurrency):
+        body = json.dumps(payload).encode()
+        latencies = []
+        failures = 0
+        lock = threading.Lock()
+
+        def one_request(_):
+            nonlocal failures
+            start = time.perf_counter()
+            status = post(endpoint, body)
+            latency = time.perf_counter() - start
+            with lock:
+                latencies.append(latency)
+                if status != 200:
+                    failures += 1
+
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=concurrency) as executor:
+            list(executor.map(one_request, range(self.api_requests)))
+        return latencies, time.perf_counter() - start, failures
+
+    def _test_client_post(self):
+        # The API loads its model at import time; point it at the bundle saved
+        # by bench_persistence and keep the prediction cache out of the way
+        os.environ['FLIGHT_DELAY_MODEL_PATH'] = self.bundle_path
+        os.environ.setdefault('FLIGHT_DELAY_CACHE_SIZE', '0')
+        with quiet():
+            import delay_prediction_api
+            delay_prediction_api.model_loader.wait()
+        # Werkzeug test clients are not safe to share between threads
+        clients = threading.local()
+
+        def post(endpoint, body):
+            if not hasattr(clients, 'client'):
+                clients.client = delay_prediction_api.app.test_client()
+            response = clients.client.post(endpoint, data=body, content_type='application/json')
+            return response.status_code
+
+        return post
+
+    def _remote_post(self, endpoint, body):
+        request = urllib.request.Request(
+            self.url.rstrip('/') + endpoint, data=body,
+            headers={'Content-Type': 'application/json'}
+        )
+        try:
+            with urllib.request.urlopen(request) as response:
+                response.read()
+                return response.status
+        except urllib.error.HTTPError as e:
+            return e.code
+
+async def asgi_post(app, endpoint, body):
+    """POST a JSON body to an ASGI app in-process and return the status code"""
+    scope = {
+        'type': 'http',
+        'asgi': {'version': '3.0'},
+        'http_version': '1.1',
+        'method': 'POST',
+        'scheme': 'http',
+        'path': endpoint,
+        'raw_path': endpoint.encode(),
+        'root_path': '',
+        'query_string': b'',
+        'headers': [(b'content-type', b'application/json'),
+                    (b'content-length', str(len(body)).encode())],
+        'server': ('benchmark', 80),
+        'client': ('127.0.0.1', 0)
+    }
+    messages = [{'type': 'http.request', 'body': body, 'more_body': False}]
+    status = None
+
+    async def receive():
+        return messages.pop() if messages else {'type': 'http.disconnect'}
+
+    async def send(message):
+        nonlocal status
+        if message['type'] == 'http.response.start':
+            status = message['status']
+
+    await app(scope, receive, send)
+    return status
+
+def compare(baseline, current, threshold=0.10):
+    """Compare two result documents and return a list of regressions
+
+    Latency percentiles regress when they grow, and throughput regresses
+    when it drops, by more than threshold (a fraction of the baseline).
+    """
+    regressions = []
+    for name, base in sorted(baseline['results'].items()):
+        result = current['results'].get(name)
+        if result is None:
+            continue
+        for metric in LATENCY_METRICS + ('throughput_per_s',):
+            old, new = base.get(metric), result.get(metric)
+            if not old or new is None:
+                continue
+            change = (new - old) / old
+            worse = change > threshold if metric in LATENCY_METRICS else change < -threshold
+            if worse:
+                regressions.append({'benchmark': name, 'metric': metric,
+                                    'baseline': old, 'current': new, 'change': round(change, 4)})
+    return regressions
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    run_parser = commands.add_parser('run', help='run the benchmarks')
+    run_parser.add_argument('--output', default='benchmark_results.json')
+    run_parser.add_argument('--sizes', default=','.join(map(str, DEFAULT_SIZES)),
+                            help='comma-separated training set sizes')
+    run_parser.add_argument('--batch-sizes', default=','.join(map(str, DEFAULT_BATCH_SIZES)),
+                            help='comma-separated prediction batch sizes')
+    run_parser.add_argument('--concurrency', default=','.join(map(str, DEFAULT_CONCURRENCY)),
+                            help='comma-separated API client concurrency levels')
+    run_parser.add_argument('--repeat', type=int, default=5, help='timed repetitions per benchmark')
+    run_parser.add_argument('--single-calls', type=int, default=500,
+                            help='calls timed for single-flight prediction')
+    run_parser.add_argument('--api-requests', type=int, default=500,
+                            help='requests per API benchmark')
+    run_parser.add_argument('--url', help='benchmark a running server instead of the Flask test client')
+    run_parser.add_argument('--seed', type=int, default=42,
+                            help='seed for the synthetic training data and prediction inputs')
+
+    compare_parser = commands.add_parser('compare', help='flag regressions against a baseline')
+    compare_parser.add_argument('baseline')
+    compare_parser.add_argument('current')
+    compare_parser.add_argument('--threshold', type=float, default=0.10,
+                                help='allowed relative slowdown (default 0.10)')
+
+    args = parser.parse_args(argv)
+    if args.command == 'run':
+        runner = BenchmarkRunner(
+            sizes=[int(size) for size in args.sizes.split(',')],
+            batch_sizes=[int(size) for size in args.batch_sizes.split(',')],
+            concurrency=[int(level) for level in args.concurrency.split(',')],
+            repeat=args.repeat,
+            single_calls=args.single_calls,
+            api_requests=args.api_requests,
+            url=args.url,
+            seed=args.seed
+        )
+        report = runner.run()
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2)
+        print(f"Results written to {args.output}")
+        return 0
+
+    with open(args.baseline) as f:
+        baseline = json.load(f)
+    with open(args.current) as f:
+        current = json.load(f)
+    regressions = compare(baseline, current, args.threshold)
+    for regression in regressions:
+        print(f"REGRESSION {regression['benchmark']} {regression['metric']}: "
+              f"{regression['baseline']} -> {regression['current']} ({regression['change']:+.1%})")
+    missing = sorted(set(baseline['results']) - set(current['results']))
+    for name in missing:
+        print(f"MISSING {name}")
+    print(f"{len(regressions)} regression(s) beyond {args.threshold:.0%}")
+    return 1 if regressions else 0
+
+if __name__ == '__main__':
+    sys.exit(main())
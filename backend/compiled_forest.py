@@ -0,0 +1,224 @@
+import numpy as np
+
+# Rows scored per traversal block; bounds the (rows x trees) index matrix
+BLOCK_ROWS = 8192
+
+class CompiledForest:
+    """A fitted tree ensemble flattened into contiguous NumPy node arrays
+
+    All trees share one set of arrays (feature, threshold, children, value)
+    and every row is pushed through every tree at once, one depth level per
+    step. children interleaves the left and right child of each node, so the
+    next node is children[2 * node + went_right]. Leaves point back at
+    themselves, so after max_depth steps every row/tree pair has settled on
+    its leaf. No joblib dispatch is involved, which makes single rows and
+    small batches much cheaper to score than with
+    RandomForestClassifier.predict_proba.
+
+    Inputs are compared as float32, matching scikit-learn's tree code.
+    Missing values (NaN) are not supported.
+    """
+    ARRAY_NAMES = ('feature', 'threshold', 'children', 'value', 'roots')
+
+    def __init__(self, feature, threshold, children, value, roots, max_depth):
+        self.feature = feature
+        self.threshold = threshold
+        self.children = children
+        self.value = value
+        self.roots = roots
+        self.max_depth = int(max_depth)
+
+    @classmethod
+    def from_sklearn(cls, forest):
+        """Flatten a fitted RandomForestClassifier (or similar ensemble)"""
+        features, thresholds, children, values, roots = [], [], [], [], []
+        offset = 0
+        max_depth = 0
+        for estimator in forest.estimators_:
+            tree = estimator.tree_
+            n_nodes = tree.node_count
+            node_ids = np.arange(offset, offset + n_nodes)
+            is_leaf = tree.children_left == -1
+
+            features.append(np.where(is_leaf, 0, tree.feature))
+            thresholds.append(np.where(is_leaf, 0.0, tree.threshold))
+            children.append(np.stack([
+                np.where(is_leaf, node_ids, tree.children_left + offset),
+                np.where(is_leaf, node_ids, tree.children_right + offset)
+            ], axis=1).ravel())
+
+            # Per-node class distribution, normalized like predict_proba
+            value = tree.value[:, 0, :].astype(np.float64)
+            values.append(value / value.sum(axis=1, keepdims=True))
+
+            roots.append(offset)
+            max_depth = max(max_depth, tree.max_depth)
+            offset += n_nodes
+
+        return cls(
+            feature=np.concatenate(features).astype(np.int32),
+            threshold=np.concatenate(thresholds).astype(np.float64),
+            children=np.concatenate(children).astype(np.int32),
+            value=np.concatenate(values),
+            roots=np.asarray(roots, dtype=np.int32),
+            max_depth=max_depth
+        )
+
+    @property
+    def n_estimators(self):
+        return len(self.roots)
+
+    def predict_proba(self, X):
+        """Class probabilities averaged over all trees, shape (n_rows, n_classes)"""
+        X = np.asarray(X, dtype=np.float32)
+        if X.ndim == 1:
+            X = X.reshape(1, -1)
+        if len(X) <= BLOCK_ROWS:
+            return self._predict_block(X)
+        return np.concatenate([
+            self._predict_block(X[start:start + BLOCK_ROWS])
+            for start in range(0, len(X), BLOCK_ROWS)
+        ])
+
+    def _predict_block(self, X):
+        n_rows, n_features = X.shape
+        X_flat = X.ravel()
+        row_offsets = (np.arange(n_rows, dtype=np.intp) * n_features)[:, None]
+        nodes = np.broadcast_to(self.roots.astype(np.intp), (n_rows, len(self.roots)))
+        for _ in range(self.max_depth):
+            went_right = X_flat.take(row_offsets + self.feature.take(nodes)) > self.threshold.take(nodes)
+            nodes = self.children.take(nodes * 2 + went_right)
+        return self.value.take(nodes, axis=0).mean(axis=1)
+
+    def verify(self, forest, X, atol=1e-9):
+        """Raise ValueError if outputs differ from forest.predict_proba(X) by more than atol"""
+        max_diff = float(np.max(np.abs(self.predict_proba(X) - forest.predict_proba(X))))
+        if max_diff > atol:
+            raise ValueError(
+                f"Compiled forest differs from scikit-learn by {max_diff:.3g} (tolerance {atol:.3g})"
+            )
+        return max_diff
+
+    def to_arrays(self):
+        """Node arrays keyed by name, for saving alongside a model bundle"""
+        arrays = {name: getattr(self, name) for name in self.ARRAY_NAMES}
+        arrays['max_depth'] = np.asarray(self.max_depth)
+        return arrays
+
+    @classmethod
+    def from_arrays(cls, arrays):
+        """Rebuild from to_arrays() output (arrays may be memory-mapped)"""
+        kwargs = {name: arrays[name] for name in cls.ARRAY_NAMES}
+        return cls(max_depth=int(arrays['max_depth']), **kwargs)
+
+    @property
+    def nbytes(self):
+        """Memory held by the node arrays"""
+        return sum(np.asarray(array).nbytes for array in self.to_arrays().values())
+
+class CompactForest(CompiledForest):
+    """A CompiledForest re-encoded in small dtypes for memory-constrained hosts
+
+    Compared with CompiledForest, each node costs 11 bytes instead of 36:
+
+    - Thresholds are float32, rounded down, which gives exactly the same
+      split decisions for float32 inputs.
+    - Feature indices are uint8 (uint16 for wide models).
+    - Nodes are renumbered level by level so that siblings are adjacent,
+      which means children stores only the left child
+      (next = children[node] + went_right).
+    - Only leaves carry a class distribution. They index into one shared,
+      deduplicated float32 table of distinct leaf distributions.
+
+    Leaves have an infinite threshold, so a row that reaches a leaf stays
+    there. The only precision lost is the float32 leaf table, which can move
+    probabilities by about 1e-7.
+    """
+    ARRAY_NAMES = ('compact_feature', 'compact_threshold', 'compact_children',
+                   'compact_leaf_index', 'compact_leaf_values', 'roots')
+
+    def __init__(self, compact_feature, compact_threshold, compact_children, compact_leaf_index,
+                 compact_leaf_values, roots, max_depth):
+        self.feature = compact_feature
+        self.threshold = compact_threshold
+        self.children = compact_children
+        self.leaf_index = compact_leaf_index
+        self.leaf_values = compact_leaf_values
+        self.roots = roots
+        self.max_depth = int(max_depth)
+
+    @classmethod
+    def from_sklearn(cls, forest):
+        return cls.from_compiled(CompiledForest.from_sklearn(forest))
+
+    @classmethod
+    def from_compiled(cls, compiled):
+        """Re-encode a full-precision CompiledForest"""
+        children = np.asarray(compiled.children).reshape(-1, 2)
+        node_ids = np.arange(len(children))
+        is_leaf = children[:, 0] == node_ids
+
+        # Level-order renumbering: each internal node's children are appended
+        # as an adjacent pair, so the right child is always left + 1
+        order = [np.asarray(compiled.roots, dtype=np.intp)]
+        level = order[0]
+        while level.size:
+            internal = level[~is_leaf[level]]
+            level = children[internal].ravel()
+            order.append(level)
+        order = np.concatenate(order)
+        new_id = np.empty(len(children), dtype=np.int64)
+        new_id[order] = np.arange(len(order))
+
+        leaf = is_leaf[order]
+        threshold64 = np.asarray(compiled.threshold)[order]
+        threshold = threshold64.astype(np.float32)
+        # Round down so that x > threshold is unchanged for every float32 x
+        rounded_up = threshold > threshold64
+        threshold[rounded_up] = np.nextafter(threshold[rounded_up], np.float32(-np.inf))
+        threshold[leaf] = np.inf
+
+        n_features = int(np.asarray(compiled.feature).max()) + 1
+        feature = np.asarray(compiled.feature)[order]
+        feature[leaf] = 0
+
+        left = new_id[children[order, 0]]
+        left[leaf] = np.flatnonzero(leaf)
+
+        leaf_values, inverse = np.unique(
+            np.asarray(compiled.value, dtype=np.float32)[order[leaf]], axis=0, return_inverse=True
+        )
+        leaf_index = np.zeros(len(order), dtype=np.min_scalar_type(max(len(leaf_values) - 1, 0)))
+        leaf_index[leaf] = inverse.ravel()
+
+        return cls(
+            compact_feature=feature.astype(np.min_scalar_type(max(n_features - 1, 0))),
+            compact_threshold=threshold,
+            compact_children=left.astype(np.int32),
+            compact_leaf_index=leaf_index,
+            compact_leaf_values=leaf_values,
+            roots=new_id[np.asarray(compiled.roots)].astype(np.int32),
+            max_depth=compiled.max_depth
+        )
+
+    def _predict_block(self, X):
+        n_rows, n_features = X.shape
+        X_flat = X.ravel()
+        row_offsets = (np.arange(n_rows, dtype=np.intp) * n_features)[:, None]
+        nodes = np.broadcast_to(self.roots.astype(np.intp), (n_rows, len(self.roots)))
+        for _ in range(self.max_depth):
+            went_right = X_flat.take(row_offsets + self.feature.take(nodes)) > self.threshold.take(nodes)
+            nodes = self.children.take(nodes) + went_right
+        return self.leaf_values.take(self.leaf_index.take(nodes), axis=0).mean(axis=1, dtype=np.float64)
+
+    def to_arrays(self):
+        arrays = dict(zip(self.ARRAY_NAMES, (self.feature, self.threshold, self.children,
+                                             self.leaf_index, self.leaf_values, self.roots)))
+        arrays['max_depth'] = np.asarray(self.max_depth)
+        return arrays
+
+def forest_from_arrays(arrays):
+    """CompiledForest or CompactForest, whichever the saved arrays describe"""
+    if CompactForest.ARRAY_NAMES[0] in arrays:
+        return CompactForest.from_arrays(arrays)
+    return CompiledForest.from_arrays(arrays)
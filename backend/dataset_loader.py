@@ -0,0 +1,106 @@
+import glob
+import hashlib
+import os
+
+import pandas as pd
+
+# Training columns in feature order, with the compact dtypes used when
+# reading them from disk
+COMPACT_DTYPES = {
+    'airline': 'category',
+    'origin_airport': 'category',
+    'dest_airport': 'category',
+    'month': 'int8',
+    'day_of_week': 'int8',
+    'departure_hour': 'int8',
+    'distance': 'float32',
+    'temperature': 'float32',
+    'wind_speed': 'float32',
+    'visibility': 'float32',
+    'precipitation': 'float32',
+    'origin_congestion': 'float32',
+    'dest_congestion': 'float32',
+    'is_delayed': 'int8'
+}
+TARGET_COLUMN = 'is_delayed'
+FEATURE_COLUMNS = [col for col in COMPACT_DTYPES if col != TARGET_COLUMN]
+
+DATASET_EXTENSIONS = ('.parquet', '.pq', '.csv')
+
+def list_dataset_files(path):
+    """Data files making up a dataset, in a stable order
+
+    path may be a single file, a glob pattern, or a directory that is
+    searched recursively (so Hive-style partition directories work).
+    """
+    if os.path.isdir(path):
+        files = glob.glob(os.path.join(path, '**', '*'), recursive=True)
+    elif os.path.isfile(path):
+        files = [path]
+    else:
+        files = glob.glob(path, recursive=True)
+    files = sorted(f for f in files if os.path.isfile(f) and f.lower().endswith(DATASET_EXTENSIONS))
+    if not files:
+        raise FileNotFoundError(f"No Parquet or CSV files found at {path}")
+    return files
+
+def dataset_fingerprint(files):
+    """Cheap content fingerprint from file names, sizes and modification times"""
+    digest = hashlib.sha256()
+    for f in files:
+        stat = os.stat(f)
+        digest.update(f'{os.path.basename(f)}:{stat.st_size}:{stat.st_mtime_ns};'.encode())
+    return digest.hexdigest()
+
+def iter_dataset_blocks(files, columns=None, block_rows=1000000):
+    """Yield DataFrames of block_rows rows with compact dtypes
+
+    Only the requested columns are read. Parquet files are streamed by record
+    batch through pyarrow when it is installed; CSV files are read in chunks.
+    Small files are coalesced and chunks split across block boundaries, so
+    every block but the last has exactly block_rows rows.
+    """
+    columns = list(columns or COMPACT_DTYPES)
+    dtypes = {col: COMPACT_DTYPES[col] for col in columns if col in COMPACT_DTYPES}
+    pending = []
+    n_pending = 0
+    for f in files:
+        if f.lower().endswith('.csv'):
+            chunks = pd.read_csv(f, usecols=columns, dtype=dtypes, chunksize=block_rows)
+        else:
+            chunks = (chunk.astype(dtypes, copy=False) for chunk in _iter_parquet(f, columns, block_rows))
+        for chunk in chunks:
+            pending.append(chunk[columns])
+            n_pending += len(chunk)
+            if n_pending >= block_rows:
+                combined = _concat(pending)
+                start = 0
+                while n_pending - start >= block_rows:
+                    yield combined.iloc[start:start + block_rows]
+                    start += block_rows
+                # Carry the rows past the last full block into the next one
+                pending = [combined.iloc[start:]] if start < n_pending else []
+                n_pending -= start
+    if pending:
+        yield _concat(pending)
+
+def _concat(blocks):
+    if len(blocks) == 1:
+        return blocks[0]
+    # Chunks with different category sets concatenate to object columns
+    block = pd.concat(blocks, ignore_index=True)
+    for col, dtype in COMPACT_DTYPES.items():
+        if dtype == 'category' and col in block.columns and block[col].dtype != 'category':
+            block[col] = block[col].astype('category')
+    return block
+
+def _iter_parquet(path, columns, block_rows):
+    try:
+        import pyarrow.parquet as pq
+    except ImportError:
+        # Without pyarrow's streaming reader the whole file is read at once
+        yield pd.read_parquet(path, columns=columns)
+        return
+    parquet_file = pq.ParquetFile(path)
+    for batch in parquet_file.iter_batches(batch_size=block_rows, columns=columns):
+        yield batch.to_pandas()
@@ -1,210 +1,837 @@
-from flask import Flask, request, jsonify
+from flask import Flask, request, jsonify, Response, stream_with_context, g, has_request_context
 from flask_cors import CORS
+import csv
+import hmac
+import io
 import json
+import math
+import numpy as np
 from datetime import datetime
-from flight_delay_predictor import FlightDelayPredictor
+from flight_delay_predictor import FlightDelayPredictor, FEATURE_DEFAULTS
+from feature_store import ROUTE_FEATURES
+import json_encoding
+import model_bundle
+from model_loader import BackgroundModelLoader
+from prediction_cache import COARSE_BUCKETS, PredictionCache, RedisCacheBackend
+from worker_pool import InferenceWorkerPool
+from metrics import REGISTRY, stage_timer
+from drift_monitor import DriftMonitor
+from model_swap import ModelSwapper
+from profiler import SlowRequestProfiler
+import threading
+import time
+import urllib.request
+from functools import wraps
+from collections import Counter
 import os
 
 app = Flask(__name__)
 CORS(app)  # Enable CORS for all routes
 
-# Initialize the predictor
-predictor = FlightDelayPredictor()
+# Initialize the predictor. The compiled engine scores single flights without
+# joblib dispatch; set FLIGHT_DELAY_INFERENCE_ENGINE=sklearn to use
+# RandomForestClassifier.predict_proba instead.
+predictor = FlightDelayPredictor(
+    inference_engine=os.environ.get('FLIGHT_DELAY_INFERENCE_ENGINE', 'compiled')
+)
 
-# Load the model if it exists, otherwise train a new one
-model_path = 'flight_delay_model.pkl'
-if os.path.exists(model_path):
+# Cache single-flight predictions in front of the model. Set
+# FLIGHT_DELAY_CACHE_SIZE=0 to disable, and FLIGHT_DELAY_CACHE_REDIS_URL to
+# share hits between workers. FLIGHT_DELAY_CACHE_BUCKETING=1 keys on coarse
+# buckets of the continuous fields for more hits, at the cost of returning
+# the prediction for a nearby flight.
+cache_size = int(os.environ.get('FLIGHT_DELAY_CACHE_SIZE', '10000'))
+if cache_size > 0:
+    redis_url = os.environ.get('FLIGHT_DELAY_CACHE_REDIS_URL')
+    predictor.prediction_cache = PredictionCache(
+        max_size=cache_size,
+        ttl=float(os.environ.get('FLIGHT_DELAY_CACHE_TTL', '300')),
+        buckets=COARSE_BUCKETS if os.environ.get('FLIGHT_DELAY_CACHE_BUCKETING', '0') == '1' else None,
+        shared_backend=RedisCacheBackend(redis_url) if redis_url else None
+    )
+
+# Watch live traffic for drift away from the training data over a sliding
+# window (FLIGHT_DELAY_DRIFT_WINDOW seconds, 0 to disable). When a threshold
+# is crossed, an alert is logged and counted, and it is POSTed to
+# FLIGHT_DELAY_DRIFT_WEBHOOK if that is set, e.g. to trigger retraining.
+drift_window = int(os.environ.get('FLIGHT_DELAY_DRIFT_WINDOW', '3600'))
+if drift_window > 0:
+    predictor.drift_monitor = DriftMonitor(
+        window_seconds=drift_window,
+        psi_threshold=float(os.environ.get('FLIGHT_DELAY_DRIFT_PSI_THRESHOLD', '0.2')),
+        unseen_rate_threshold=float(os.environ.get('FLIGHT_DELAY_DRIFT_UNSEEN_THRESHOLD', '0.05')),
+        calibration_error_threshold=float(os.environ.get('FLIGHT_DELAY_DRIFT_CALIBRATION_THRESHOLD', '0.1'))
+    )
+
+# Load the model if it exists, otherwise train a new one. This happens in a
+# background thread so the app starts serving immediately; prediction
+# endpoints answer 503 until the model is ready. A legacy
+# flight_delay_model.pkl is served until a bundle has been saved.
+model_path = model_bundle.resolve_model_path(os.environ.get('FLIGHT_DELAY_MODEL_PATH', 'flight_delay_model'))
+model_loader = BackgroundModelLoader(predictor, model_path)
+model_loader.start()
+
+# Forked workers (e.g. gunicorn --preload) do not inherit the loader thread
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=lambda: model_loader.ready or model_loader.start())
+
+# Large batches are split across a pre-forked worker pool when
+# FLIGHT_DELAY_WORKERS is set; the workers are forked lazily, after the model
+# has been loaded, so they share it copy-on-write.
+n_inference_workers = int(os.environ.get('FLIGHT_DELAY_WORKERS', '0'))
+
+def build_worker_pool(model_predictor, path):
+    """Worker pool for one predictor, or None if FLIGHT_DELAY_WORKERS <= 1"""
+    if n_inference_workers <= 1:
+        return None
+    return InferenceWorkerPool(
+        model_predictor,
+        n_workers=n_inference_workers,
+        min_rows_per_worker=int(os.environ.get('FLIGHT_DELAY_MIN_ROWS_PER_WORKER', '2000')),
+        start_method=os.environ.get('FLIGHT_DELAY_WORKER_START_METHOD', 'fork'),
+        model_path=path
+    )
+
+# One pool per serving predictor, keyed by the predictor; a hot-swapped
+# model gets its own pool, and the old one is closed once its requests have
+# drained
+worker_pools = {predictor: build_worker_pool(predictor, model_path)}
+
+def batch_scorer(model_predictor):
+    """Worker pool of model_predictor, or the predictor itself"""
+    return worker_pools.get(model_predictor) or model_predictor
+
+# Hot-swap: POST /api/admin/reload-model, or set
+# FLIGHT_DELAY_MODEL_WATCH_INTERVAL to poll model_path, to load, validate
+# and warm a new model in the background and switch to it atomically. Each
+# request holds the predictor it started with, and a replaced model is
+# released once its in-flight requests have finished.
+def on_model_swap(new_predictor, old_predictor, path):
+    global predictor
+    worker_pools[new_predictor] = build_worker_pool(new_predictor, path)
+    predictor = new_predictor
+    model_loader.predictor = new_predictor
+
+def on_model_retire(old_predictor):
+    pool = worker_pools.pop(old_predictor, None)
+    if pool is not None:
+        pool.close()
+
+swapper = ModelSwapper(predictor, model_path, on_swap=on_model_swap, on_retire=on_model_retire)
+# A "model_path" posted to the reload endpoint must lie inside this
+# directory (FLIGHT_DELAY_MODEL_DIR, by default the one holding model_path)
+model_dir = os.path.realpath(os.environ.get('FLIGHT_DELAY_MODEL_DIR') or os.path.dirname(os.path.abspath(model_path)))
+model_watch_interval = float(os.environ.get('FLIGHT_DELAY_MODEL_WATCH_INTERVAL', '0'))
+if model_watch_interval > 0:
+    swapper.watch(model_watch_interval)
+
+def serving_predictor():
+    """Predictor leased by the current request, or the active one"""
+    if has_request_context() and 'predictor' in g:
+        return g.predictor
+    return swapper.current()
+
+# Admin endpoints require this token in the X-Admin-Token header; without
+# it they only answer requests from localhost
+ADMIN_TOKEN = os.environ.get('FLIGHT_DELAY_ADMIN_TOKEN')
+
+# Seconds clients should wait before retrying while the model is loading
+RETRY_AFTER_SECONDS = int(os.environ.get('FLIGHT_DELAY_RETRY_AFTER', '5'))
+
+def require_model(view):
+    """Answer 503 with Retry-After until the model is ready"""
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        if not model_loader.ready:
+            response = jsonify({
+                'error': 'Model is not ready yet',
+                'model_state': model_loader.state
+            })
+            response.status_code = 503
+            response.headers['Retry-After'] = str(RETRY_AFTER_SECONDS)
+            return response
+        return view(*args, **kwargs)
+    return wrapper
+
+# Fields every prediction request must provide
+REQUIRED_FIELDS = ['airline', 'origin_airport', 'dest_airport', 'departure_time']
+
+def build_prediction_data(flight_data):
+    """Validate a flight request object and map it onto the model features
+    
+    Returns the prediction data together with the parsed departure time and
+    raises ValueError with a client-facing message on bad input.
+    """
+    if not isinstance(flight_data, dict):
+        raise ValueError('Expected a flight object')
+    
+    # Validate required fields
+    for field in REQUIRED_FIELDS:
+        if field not in flight_data:
+            raise ValueError(f'Missing required field: {field}')
+    for field in ('airline', 'origin_airport', 'dest_airport'):
+        if not isinstance(flight_data[field], str):
+            raise ValueError(f'Invalid value for field: {field}')
+    
+    # Parse departure time
+    with stage_timer('parse_datetime'):
+        try:
+            departure_time = datetime.fromisoformat(flight_data['departure_time'].replace('Z', '+00:00'))
+        except (ValueError, AttributeError):
+            raise ValueError('Invalid departure_time format. Use ISO format.')
+    
+    # Extract time features
+    prediction_data = {
+        'airline': flight_data['airline'],
+        'origin_airport': flight_data['origin_airport'],
+        'dest_airport': flight_data['dest_airport'],
+        'month': departure_time.month,
+        'day_of_week': departure_time.weekday() + 1,  # Monday = 1
+        'departure_hour': departure_time.hour
+    }
+    for field, default in FEATURE_DEFAULTS.items():
+        prediction_data[field] = numeric_field(flight_data, field, default)
+    # Left as None when absent; the predictor fills them from its route
+    # feature store
+    for field in ROUTE_FEATURES:
+        prediction_data[field] = None if flight_data.get(field) is None else numeric_field(flight_data, field, None)
+    
+    return prediction_data, departure_time
+
+def numeric_field(flight_data, field, default):
+    """A numeric request field as a float, or default when it is absent
+    
+    Raises ValueError, with the message the batch validation uses, for
+    values that are not finite numbers.
+    """
+    value = flight_data.get(field, default)
     try:
-        predictor.load_model(model_path)
-        print("Loaded existing model")
-    except Exception as e:
-        print(f"Error loading model: {e}")
-        print("Training new model...")
-        train_data = predictor.generate_synthetic_data(n_samples=10000)
-        predictor.train_model(train_data)
-        predictor.save_model(model_path)
-else:
-    print("No existing model found. Training new model...")
-    train_data = predictor.generate_synthetic_data(n_samples=10000)
-    predictor.train_model(train_data)
-    predictor.save_model(model_path)
+        number = float(value)
+    except (TypeError, ValueError):
+        number = float('nan')
+    if not math.isfinite(number):
+        raise ValueError(f'Invalid value for field: {field}')
+    return number
 
 @app.route('/api/predict-delay', methods=['POST'])
+@require_model
 def predict_delay():
     """API endpoint to predict flight delay risk"""
     try:
         # Get flight data from request
-        flight_data = request.json
+        with stage_timer('parse_request'):
+            flight_data = request.json
         
-        # Validate required fields
-        required_fields = ['airline', 'origin_airport', 'dest_airport', 'departure_time']
-        for field in required_fields:
-            if field not in flight_data:
-                return jsonify({'error': f'Missing required field: {field}'}), 400
-        
-        # Parse departure time
         try:
-            departure_time = datetime.fromisoformat(flight_data['departure_time'].replace('Z', '+00:00'))
-        except ValueError:
-            return jsonify({'error': 'Invalid departure_time format. Use ISO format.'}), 400
-        
-        # Extract time features
-        month = departure_time.month
-        day_of_week = departure_time.weekday() + 1  # Monday = 1
-        departure_hour = departure_time.hour
-        
-        # Prepare data for prediction
-        prediction_data = {
-            'airline': flight_data['airline'],
-            'origin_airport': flight_data['origin_airport'],
-            'dest_airport': flight_data['dest_airport'],
-            'month': month,
-            'day_of_week': day_of_week,
-            'departure_hour': departure_hour,
-            'distance': flight_data.get('distance', 1000),  # Default distance
-            'temperature': flight_data.get('temperature', 70),  # Default temp
-            'wind_speed': flight_data.get('wind_speed', 10),  # Default wind
-            'visibility': flight_data.get('visibility', 10),  # Default visibility
-            'precipitation': flight_data.get('precipitation', 0),  # Default precipitation
-            'origin_congestion': flight_data.get('origin_congestion', 0.5),  # Default congestion
-            'dest_congestion': flight_data.get('dest_congestion', 0.5)  # Default congestion
-        }
+            prediction_data, departure_time = build_prediction_data(flight_data)
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
         
         # Make prediction
-        result = predictor.predict_delay_risk(prediction_data)
-        
-        # Add additional context
-        result['flight_info'] = {
-            'airline': flight_data['airline'],
-            'route': f"{flight_data['origin_airport']} → {flight_data['dest_airport']}",
-            'departure_time': flight_data['departure_time'],
-            'day_of_week': departure_time.strftime('%A'),
-            'month': departure_time.strftime('%B')
-        }
-        
-        # Add recommendations based on risk level
-        if result['risk_level'] == 'High':
-            result['recommendations'] = [
-                "Consider booking an earlier flight",
-                "Allow extra time for connections",
-                "Check weather conditions before departure",
-                "Consider travel insurance"
-            ]
-        elif result['risk_level'] == 'Medium':
-            result['recommendations'] = [
-                "Monitor flight status closely",
-                "Allow some buffer time for connections",
-                "Check weather forecast"
-            ]
-        else:
-            result['recommendations'] = [
-                "Flight is likely to be on time",
-                "Standard arrival planning should be sufficient"
-            ]
+        result = g.predictor.predict_delay_risk(prediction_data)
         
+        with stage_timer('recommendations'):
+            result = add_prediction_context(result, flight_data, departure_time)
         return jsonify(result)
         
     except Exception as e:
-        return jsonify({'error': str(e)}), 500
+        return internal_error(e)
+
+def add_prediction_context(result, flight_data, departure_time, model_predictor=None):
+    """Add flight info and risk-based recommendations to a single prediction
+    
+    Route history comes from model_predictor, by default the one serving
+    the current request.
+    """
+    if model_predictor is None:
+        model_predictor = serving_predictor()
+    # Add additional context
+    result['flight_info'] = {
+        'airline': flight_data['airline'],
+        'route': f"{flight_data['origin_airport']} → {flight_data['dest_airport']}",
+        'departure_time': flight_data['departure_time'],
+        'day_of_week': departure_time.strftime('%A'),
+        'month': departure_time.strftime('%B')
+    }
+    route_history = model_predictor.route_history(flight_data['origin_airport'], flight_data['dest_airport'])
+    if route_history is not None:
+        result['route_history'] = route_history
+    
+    # Add recommendations based on risk level
+    if result['risk_level'] == 'High':
+        result['recommendations'] = [
+            "Consider booking an earlier flight",
+            "Allow extra time for connections",
+            "Check weather conditions before departure",
+            "Consider travel insurance"
+        ]
+    elif result['risk_level'] == 'Medium':
+        result['recommendations'] = [
+            "Monitor flight status closely",
+            "Allow some buffer time for connections",
+            "Check weather forecast"
+        ]
+    else:
+        result['recommendations'] = [
+            "Flight is likely to be on time",
+            "Standard arrival planning should be sufficient"
+        ]
+    
+    return result
+
+# Batch responses come in two formats. 'rows' (the default) has one object
+# per flight. 'columnar' has parallel arrays and is encoded with
+# json_encoding. Clients choose with ?format= or by accepting
+# COLUMNAR_MEDIA_TYPE.
+COLUMNAR_MEDIA_TYPE = 'application/vnd.flight-delay.columnar+json'
+RESPONSE_FORMATS = ('rows', 'columnar')
+
+def batch_response_format():
+    """Negotiate the batch response format for the current request"""
+    requested = request.args.get('format')
+    if requested is not None:
+        if requested not in RESPONSE_FORMATS:
+            raise ValueError(f"format must be one of {', '.join(RESPONSE_FORMATS)}")
+        return requested
+    best = request.accept_mimetypes.best_match(['application/json', COLUMNAR_MEDIA_TYPE])
+    return 'columnar' if best == COLUMNAR_MEDIA_TYPE else 'rows'
 
 @app.route('/api/batch-predict', methods=['POST'])
+@require_model
 def batch_predict():
     """API endpoint to predict delay risk for multiple flights"""
     try:
-        flights_data = request.json
+        with stage_timer('parse_request'):
+            flights_data = request.json
         
         if not isinstance(flights_data, list):
             return jsonify({'error': 'Expected a list of flight objects'}), 400
         
-        results = []
-        for i, flight_data in enumerate(flights_data):
-            try:
-                # Use the same logic as single prediction
-                departure_time = datetime.fromisoformat(flight_data['departure_time'].replace('Z', '+00:00'))
-                
-                prediction_data = {
-                    'airline': flight_data['airline'],
-                    'origin_airport': flight_data['origin_airport'],
-                    'dest_airport': flight_data['dest_airport'],
-                    'month': departure_time.month,
-                    'day_of_week': departure_time.weekday() + 1,
-                    'departure_hour': departure_time.hour,
-                    'distance': flight_data.get('distance', 1000),
-                    'temperature': flight_data.get('temperature', 70),
-                    'wind_speed': flight_data.get('wind_speed', 10),
-                    'visibility': flight_data.get('visibility', 10),
-                    'precipitation': flight_data.get('precipitation', 0),
-                    'origin_congestion': flight_data.get('origin_congestion', 0.5),
-                    'dest_congestion': flight_data.get('dest_congestion', 0.5)
-                }
-                
-                result = predictor.predict_delay_risk(prediction_data)
-                result['flight_index'] = i
+        try:
+            response_format = batch_response_format()
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+        
+        if response_format == 'columnar':
+            predictions = score_flights_columnar(flights_data)
+            with stage_timer('serialize'):
+                return Response(json_encoding.dumps(predictions), mimetype=COLUMNAR_MEDIA_TYPE)
+        return jsonify({'predictions': score_flights(flights_data)})
+        
+    except Exception as e:
+        return internal_error(e)
+
+# Upper bound on the grid size of one scenario sweep
+MAX_SCENARIOS = int(os.environ.get('FLIGHT_DELAY_MAX_SCENARIOS', '10000'))
+
+@app.route('/api/predict-scenarios', methods=['POST'])
+@require_model
+def predict_scenarios():
+    """What-if sweep: delay risk of one flight over a grid of scenarios
+
+    The body is {"flight": {...}, "grid": {"departure_hour": [...], ...}}.
+    Every combination of grid values is scored in one vectorized call. The
+    response holds the probabilities as one nested matrix with an axis per
+    grid field, rather than an object per scenario.
+    """
+    try:
+        with stage_timer('parse_request'):
+            body = request.json
+
+        if not isinstance(body, dict) or not isinstance(body.get('grid'), dict):
+            return jsonify({'error': 'Expected {"flight": {...}, "grid": {field: [values]}}'}), 400
+        grid = body['grid']
+        if not all(isinstance(values, list) for values in grid.values()):
+            return jsonify({'error': 'Grid values must be lists'}), 400
+        n_scenarios = 1
+        for values in grid.values():
+            n_scenarios *= len(values)
+        if n_scenarios > MAX_SCENARIOS:
+            return jsonify({'error': f'Grid has {n_scenarios} scenarios; the limit is {MAX_SCENARIOS}'}), 400
+
+        try:
+            prediction_data, _ = build_prediction_data(body.get('flight'))
+            probabilities = g.predictor.predict_scenarios(prediction_data, grid)
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+
+        flight_data = body['flight']
+        lowest = np.unravel_index(np.argmin(probabilities), probabilities.shape)
+        lowest_risk = {field: grid[field][i] for field, i in zip(grid, lowest)}
+        lowest_risk['delay_probability'] = round(float(probabilities[lowest]), 4)
+        REGISTRY.inc('flight_delay_scenarios_total', n_scenarios)
+        return jsonify({
+            'flight_info': {
+                'airline': flight_data['airline'],
+                'route': f"{flight_data['origin_airport']} → {flight_data['dest_airport']}",
+                'departure_time': flight_data['departure_time']
+            },
+            'fields': list(grid),
+            'values': list(grid.values()),
+            'shape': list(probabilities.shape),
+            'delay_probability': np.round(probabilities, 4).tolist(),
+            'lowest_risk': lowest_risk
+        })
+
+    except Exception as e:
+        return internal_error(e)
+
+# Rows scored per vectorized chunk by the streaming endpoint
+STREAM_CHUNK_SIZE = 1000
+MAX_STREAM_CHUNK_SIZE = 10000
+
+@app.route('/api/batch-predict/stream', methods=['POST'])
+@require_model
+def batch_predict_stream():
+    """Stream delay predictions for an NDJSON or CSV upload
+    
+    The body is parsed incrementally and scored in fixed-size chunks; each
+    chunk's results are written back as NDJSON lines as soon as it is done.
+    Results carry the same flight_index/error fields as /api/batch-predict.
+    """
+    content_type = request.mimetype
+    if content_type == 'text/csv':
+        flights = _iter_csv_flights(request.stream)
+    elif content_type in ('application/x-ndjson', 'application/jsonl', 'application/json-seq', 'application/json'):
+        flights = _iter_ndjson_flights(request.stream)
+    else:
+        return jsonify({'error': 'Expected application/x-ndjson or text/csv body'}), 415
+    
+    try:
+        chunk_size = int(request.args.get('chunk_size', STREAM_CHUNK_SIZE))
+    except ValueError:
+        return jsonify({'error': 'chunk_size must be an integer'}), 400
+    chunk_size = max(1, min(chunk_size, MAX_STREAM_CHUNK_SIZE))
+    
+    def generate():
+        chunk = []
+        start_index = 0
+        for flight in flights:
+            chunk.append(flight)
+            if len(chunk) == chunk_size:
+                yield _ndjson_lines(score_flights(chunk, start_index))
+                start_index += len(chunk)
+                chunk = []
+        if chunk:
+            yield _ndjson_lines(score_flights(chunk, start_index))
+    
+    return Response(stream_with_context(generate()), mimetype='application/x-ndjson')
+
+class _InvalidFlight(dict):
+    """Placeholder for an input line that could not be parsed"""
+
+def _iter_ndjson_flights(stream):
+    """Yield one flight object per non-blank NDJSON line"""
+    for line in stream:
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            yield json.loads(line)
+        except ValueError as e:
+            yield _InvalidFlight(error=f'Invalid JSON: {e}')
+
+def _iter_csv_flights(stream):
+    """Yield one flight object per CSV row; empty cells use field defaults"""
+    reader = csv.DictReader(io.TextIOWrapper(stream, encoding='utf-8', newline=''))
+    for row in reader:
+        yield {key: value for key, value in row.items() if key and value not in ('', None)}
+
+def _ndjson_lines(results):
+    return ''.join(json.dumps(result) + '\n' for result in results)
+
+def internal_error(e):
+    """Log an unexpected exception, count it and answer 500"""
+    app.logger.exception("Unhandled error in %s", request.path)
+    REGISTRY.inc('flight_delay_errors_total', endpoint=request.endpoint or request.path,
+                 error=type(e).__name__)
+    return jsonify({'error': str(e)}), 500
+
+def parse_flights(flights_data):
+    """Map flight request objects onto prediction data
+    
+    Returns the prediction rows, the input position of each row and one
+    request-level error message (or None) per input flight.
+    """
+    rows = []
+    row_positions = []
+    errors = [None] * len(flights_data)
+    for i, flight_data in enumerate(flights_data):
+        if isinstance(flight_data, _InvalidFlight):
+            errors[i] = flight_data['error']
+            continue
+        try:
+            prediction_data, _ = build_prediction_data(flight_data)
+        except ValueError as e:
+            errors[i] = str(e)
+            continue
+        rows.append(prediction_data)
+        row_positions.append(i)
+    return rows, row_positions, errors
+
+def score_flights(flights_data, start_index=0):
+    """Score a list of flight request objects in one vectorized batch
+    
+    Request-level problems (missing fields, bad timestamps) and feature
+    validation errors are reported per flight, keyed by flight_index.
+    """
+    rows, row_positions, errors = parse_flights(flights_data)
+    results = [
+        {'flight_index': start_index + i, 'error': error} if error is not None else None
+        for i, error in enumerate(errors)
+    ]
+    
+    if rows:
+        batch_results = batch_scorer(serving_predictor()).predict_delay_risk_batch(rows)
+        risk_levels = Counter()
+        for i, result in zip(row_positions, batch_results):
+            flight_data = flights_data[i]
+            result['flight_index'] = start_index + i
+            if 'error' not in result:
+                risk_levels[result['risk_level']] += 1
                 result['flight_info'] = {
                     'airline': flight_data['airline'],
                     'route': f"{flight_data['origin_airport']} → {flight_data['dest_airport']}",
                     'departure_time': flight_data['departure_time']
                 }
-                results.append(result)
-                
-            except Exception as e:
-                results.append({
-                    'flight_index': i,
-                    'error': str(e)
-                })
-        
-        return jsonify({'predictions': results})
-        
-    except Exception as e:
-        return jsonify({'error': str(e)}), 500
+            results[i] = result
+        for risk_level, count in risk_levels.items():
+            REGISTRY.inc('flight_delay_predictions_total', count, risk_level=risk_level)
+    
+    return results
+
+def score_flights_columnar(flights_data):
+    """Score flights like score_flights, returning parallel arrays
+    
+    No per-flight objects are built. The probabilities come back from the
+    predictor as one array, and risk scores and levels are derived from it
+    in bulk. flight_info is left out; columns line up with the request by
+    position. Flights that could not be scored are null in every column and
+    listed under errors.
+    """
+    model_predictor = serving_predictor()
+    rows, row_positions, errors = parse_flights(flights_data)
+    delay_probabilities = np.full(len(flights_data), np.nan)
+    if rows:
+        probabilities, row_errors = batch_scorer(model_predictor).predict_delay_probabilities(rows)
+        delay_probabilities[row_positions] = probabilities
+        for i, error in zip(row_positions, row_errors):
+            if error is not None:
+                errors[i] = error
+    
+    risk_scores = model_predictor.risk_scores(delay_probabilities)
+    risk_levels = model_predictor.risk_levels(risk_scores)
+    failed = np.isnan(delay_probabilities)
+    for risk_level, count in Counter(risk_levels[~failed].tolist()).items():
+        REGISTRY.inc('flight_delay_predictions_total', count, risk_level=risk_level)
+    
+    response = {
+        'format': 'columnar',
+        'count': len(flights_data),
+        'delay_probability': delay_probabilities,
+        'risk_score': risk_scores,
+        'risk_level': risk_levels.tolist()
+    }
+    if failed.any():
+        response['risk_score'] = np.where(failed, None, risk_scores).tolist()
+        response['risk_level'] = np.where(failed, None, risk_levels).tolist()
+        response['errors'] = [{'flight_index': int(i), 'error': errors[i]} for i in np.flatnonzero(failed)]
+    return response
 
 @app.route('/api/model-info', methods=['GET'])
 def model_info():
-    """Get information about the trained model"""
+    """Get information about the trained model
+    
+    Answered from the bundle manifest, so the forest itself is never touched.
+    """
     try:
-        if predictor.model is None:
-            return jsonify({'error': 'Model not loaded'}), 500
-        
-        # Get feature importance
-        feature_importance = []
-        if hasattr(predictor.model, 'feature_importances_'):
-            for i, importance in enumerate(predictor.model.feature_importances_):
-                feature_importance.append({
-                    'feature': predictor.feature_columns[i],
-                    'importance': float(importance)
-                })
-            feature_importance.sort(key=lambda x: x['importance'], reverse=True)
+        manifest = g.predictor.manifest
+        if manifest is None and swapper.swaps == 0 and model_bundle.is_bundle(model_path):
+            manifest = model_bundle.read_manifest(model_path)
+        if manifest is None:
+            if not g.predictor.has_model:
+                return jsonify({'error': 'Model not loaded'}), 503
+            manifest = g.predictor.build_manifest()
         
+        categories = manifest.get('categories', {})
         model_info = {
-            'model_type': 'Random Forest Classifier',
-            'n_features': len(predictor.feature_columns),
-            'features': predictor.feature_columns,
-            'feature_importance': feature_importance[:10],  # Top 10
-            'airlines': list(predictor.label_encoders.get('airline', {}).classes_ if 'airline' in predictor.label_encoders else []),
-            'airports': list(predictor.label_encoders.get('origin_airport', {}).classes_ if 'origin_airport' in predictor.label_encoders else [])
+            'model_type': manifest.get('model_type'),
+            'model_version': manifest.get('model_version'),
+            'created_at': manifest.get('created_at'),
+            'sklearn_version': manifest.get('sklearn_version'),
+            'training_data_hash': manifest.get('training_data_hash'),
+            'metrics': manifest.get('metrics', {}),
+            'n_features': len(manifest['feature_columns']),
+            'features': manifest['feature_columns'],
+            'feature_importance': manifest.get('feature_importance', [])[:10],  # Top 10
+            'airlines': categories.get('airline', []),
+            'airports': categories.get('origin_airport', []),
+            'active_model_version': swapper.current().model_version,
+            'hot_swap': swapper.status()
         }
         
         return jsonify(model_info)
         
     except Exception as e:
-        return jsonify({'error': str(e)}), 500
+        return internal_error(e)
+
+@app.route('/api/cache-stats', methods=['GET'])
+def cache_stats():
+    """Prediction cache hit/miss/eviction counters"""
+    prediction_cache = g.predictor.prediction_cache
+    if prediction_cache is None:
+        return jsonify({'enabled': False})
+    stats = prediction_cache.stats()
+    stats['enabled'] = True
+    return jsonify(stats)
+
+@app.route('/api/drift', methods=['GET'])
+def drift_summary():
+    """Sliding-window feature drift, score distribution and calibration"""
+    drift_monitor = g.predictor.drift_monitor
+    if drift_monitor is None:
+        return jsonify({'enabled': False})
+    summary = drift_monitor.summary()
+    summary['enabled'] = True
+    summary['model_version'] = g.predictor.model_version
+    return Response(json_encoding.dumps(summary), mimetype='application/json')
+
+@app.route('/api/outcomes', methods=['POST'])
+@require_model
+def record_outcomes():
+    """Post actual outcomes back for calibration tracking
+
+    The body is a list of flight objects, as for /api/batch-predict, each
+    with a boolean "delayed". The flights are rescored with the current
+    model without being counted as live traffic.
+    """
+    try:
+        with stage_timer('parse_request'):
+            flights_data = request.json
+        
+        if not isinstance(flights_data, list):
+            return jsonify({'error': 'Expected a list of flight objects'}), 400
+        drift_monitor = g.predictor.drift_monitor
+        if drift_monitor is None:
+            return jsonify({'error': 'Drift monitoring is disabled'}), 409
+        
+        parsed_rows, parsed_positions, errors = parse_flights(flights_data)
+        rows, row_positions, delayed = [], [], []
+        for row, i in zip(parsed_rows, parsed_positions):
+            outcome = flights_data[i].get('delayed')
+            if not isinstance(outcome, (bool, int)) or outcome not in (0, 1):
+                errors[i] = 'Missing or invalid field: delayed'
+                continue
+            rows.append(row)
+            row_positions.append(i)
+            delayed.append(outcome)
+        
+        accepted = 0
+        if rows:
+            probabilities, row_errors = g.predictor.predict_delay_probabilities(rows, observe=False)
+            for i, error in zip(row_positions, row_errors):
+                if error is not None:
+                    errors[i] = error
+            scored = ~np.isnan(probabilities)
+            drift_monitor.observe_outcomes(probabilities[scored], np.array(delayed, dtype=float)[scored])
+            accepted = int(scored.sum())
+        
+        return jsonify({
+            'accepted': accepted,
+            'errors': [{'flight_index': i, 'error': error} for i, error in enumerate(errors) if error is not None]
+        })
+        
+    except Exception as e:
+        return internal_error(e)
+
+def on_drift_alert(alerts):
+    """Drift monitor hook: log, count and forward threshold alerts"""
+    model_version = swapper.current().model_version
+    app.logger.warning("Drift alert for model %s: %s", model_version, alerts)
+    for alert in alerts:
+        REGISTRY.inc('flight_delay_drift_alerts_total', check=alert['check'])
+    webhook = os.environ.get('FLIGHT_DELAY_DRIFT_WEBHOOK')
+    if webhook:
+        payload = json_encoding.dumps({'model_version': model_version, 'alerts': alerts})
+        threading.Thread(target=_post_webhook, args=(webhook, payload), daemon=True).start()
+
+def _post_webhook(url, payload):
+    try:
+        urllib.request.urlopen(urllib.request.Request(
+            url, data=payload, headers={'Content-Type': 'application/json'}, method='POST'
+        ), timeout=10)
+    except OSError:
+        app.logger.exception("Drift webhook %s failed", url)
+
+if predictor.drift_monitor is not None:
+    predictor.drift_monitor.add_hook(on_drift_alert)
+
+# Request counters and latency histograms for every endpoint, plus an opt-in
+# sampling profiler (FLIGHT_DELAY_PROFILE_SLOWEST=N) that keeps the stacks of
+# the N slowest requests
+REGISTRY.counter('flight_delay_requests_total', 'HTTP requests by endpoint and status')
+REGISTRY.histogram('flight_delay_request_seconds', 'HTTP request latency by endpoint')
+REGISTRY.counter('flight_delay_errors_total', 'Unhandled errors by endpoint and exception type')
+REGISTRY.counter('flight_delay_predictions_total', 'Batch predictions by risk level')
+REGISTRY.counter('flight_delay_scenarios_total', 'Scenarios scored by what-if sweeps')
+REGISTRY.counter('flight_delay_drift_alerts_total', 'Drift monitor alerts by check')
+REGISTRY.gauge('flight_delay_model_ready', 'Whether the model is loaded and ready',
+               lambda: int(model_loader.ready))
+REGISTRY.gauge('flight_delay_cache_events', 'Prediction cache counters',
+               lambda: {
+                   (('event', event),): value
+                   for event, value in swapper.current().prediction_cache.stats().items()
+                   if event in ('hits', 'misses', 'shared_hits', 'evictions', 'expirations', 'invalidations', 'size')
+               } if swapper.current().prediction_cache is not None else {})
+
+profile_slowest = int(os.environ.get('FLIGHT_DELAY_PROFILE_SLOWEST', '0'))
+request_profiler = None
+if profile_slowest > 0:
+    request_profiler = SlowRequestProfiler(
+        top_n=profile_slowest,
+        interval=float(os.environ.get('FLIGHT_DELAY_PROFILE_INTERVAL', '0.005'))
+    )
+    request_profiler.start()
+
+@app.before_request
+def start_request_timer():
+    request.environ['flight_delay.start'] = time.perf_counter()
+    if request_profiler is not None:
+        request_profiler.begin()
+
+@app.before_request
+def lease_predictor():
+    g.predictor = swapper.acquire()
+
+@app.teardown_request
+def release_predictor(exc):
+    # Streamed responses keep the request context, and so the lease, until
+    # the last chunk has been sent
+    leased = g.pop('predictor', None)
+    if leased is not None:
+        swapper.release(leased)
+
+@app.after_request
+def record_request_metrics(response):
+    start = request.environ.get('flight_delay.start')
+    if start is not None:
+        duration = time.perf_counter() - start
+        endpoint = request.endpoint or 'unknown'
+        REGISTRY.observe('flight_delay_request_seconds', duration, endpoint=endpoint)
+        REGISTRY.inc('flight_delay_requests_total', endpoint=endpoint, status=response.status_code)
+        if request_profiler is not None:
+            request_profiler.end(f'{request.method} {request.path}', duration)
+    return response
+
+def require_admin(view):
+    """Answer 403 unless the request carries ADMIN_TOKEN (or, without one, comes from localhost)"""
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        if ADMIN_TOKEN:
+            allowed = hmac.compare_digest(request.headers.get('X-Admin-Token', ''), ADMIN_TOKEN)
+        else:
+            allowed = request.remote_addr in ('127.0.0.1', '::1')
+        if not allowed:
+            return jsonify({'error': 'Admin access denied'}), 403
+        return view(*args, **kwargs)
+    return wrapper
+
+@app.route('/api/admin/reload-model', methods=['POST'])
+@require_admin
+@require_model
+def reload_model():
+    """Hot-swap the model without downtime
+    
+    Loads the bundle at model_path (or the "model_path" given in the body,
+    which must be inside model_dir), validates and warms it in the
+    background and then switches to it. Answers 202 at once; pass
+    ?wait=true to block until the swap is done. The current model keeps
+    serving if the new one fails to load.
+    """
+    body = request.get_json(silent=True) or {}
+    path = body.get('model_path', model_path)
+    if not isinstance(path, str):
+        return jsonify({'error': 'model_path must be a string'}), 400
+    if 'model_path' in body and os.path.commonpath([os.path.realpath(path), model_dir]) != model_dir:
+        return jsonify({'error': 'model_path must be inside the model directory'}), 403
+    if not os.path.exists(path):
+        return jsonify({'error': f'No model at {path}'}), 400
+    wait = request.args.get('wait', '').lower() in ('1', 'true', 'yes')
+    if not swapper.reload(path, wait=wait):
+        return jsonify({'error': 'A reload is already running', **swapper.status()}), 409
+    status = swapper.status()
+    if not wait:
+        return jsonify(status), 202
+    return jsonify(status), 500 if status['state'] == 'failed' else 200
+
+@app.route('/api/admin/reload-model', methods=['GET'])
+@require_admin
+def reload_status():
+    """State of the last hot-swap and of models still draining"""
+    return jsonify(swapper.status())
+
+@app.route('/api/metrics', methods=['GET'])
+def metrics():
+    """Prometheus metrics"""
+    return Response(REGISTRY.render(), mimetype='text/plain; version=0.0.4')
+
+@app.route('/api/metrics/profiles', methods=['GET'])
+def slow_request_profiles():
+    """Collapsed stacks of the slowest requests, for flamegraph tools
+    
+    ?format=json lists the kept requests with their durations and stacks.
+    """
+    if request_profiler is None:
+        return jsonify({'error': 'Profiling is disabled; set FLIGHT_DELAY_PROFILE_SLOWEST'}), 404
+    if request.args.get('format') == 'json':
+        return jsonify({'profiles': [
+            {'label': label, 'duration_ms': round(duration * 1000, 3), 'stacks': stacks}
+            for label, duration, stacks in request_profiler.profiles()
+        ]})
+    return Response(request_profiler.collapsed(), mimetype='text/plain')
 
 @app.route('/api/health', methods=['GET'])
 def health_check():
-    """Health check endpoint"""
+    """Health check endpoint
+    
+    The process is live as soon as it answers; it is ready once the model has
+    been loaded or trained.
+    """
     return jsonify({
         'status': 'healthy',
-        'model_loaded': predictor.model is not None,
+        'live': True,
+        'ready': model_loader.ready,
+        'model_loaded': model_loader.ready,
+        'model': model_loader.status(),
         'timestamp': datetime.now().isoformat()
     })
 
+@app.route('/api/ready', methods=['GET'])
+def readiness_check():
+    """Readiness probe: 200 once the model is ready, 503 before"""
+    status = model_loader.status()
+    if not model_loader.ready:
+        response = jsonify(status)
+        response.status_code = 503
+        response.headers['Retry-After'] = str(RETRY_AFTER_SECONDS)
+        return response
+    return jsonify(status)
+
 if __name__ == '__main__':
     print("Starting Flight Delay Prediction API...")
     print("API Endpoints:")
     print("  POST /api/predict-delay - Predict delay for a single flight")
     print("  POST /api/batch-predict - Predict delay for multiple flights")
+    print("  POST /api/batch-predict/stream - Stream predictions for an NDJSON or CSV upload")
+    print("  POST /api/predict-scenarios - What-if sweep for a single flight")
     print("  GET /api/model-info - Get model information")
-    print("  GET /api/health - Health check")
+    print("  GET /api/cache-stats - Prediction cache counters")
+    print("  GET /api/drift - Drift and calibration summary")
+    print("  POST /api/outcomes - Report actual outcomes for calibration")
+    print("  POST /api/admin/reload-model - Hot-swap the model")
+    print("  GET /api/metrics - Prometheus metrics")
+    print("  GET /api/health - Health check (liveness and readiness)")
+    print("  GET /api/ready - Readiness probe")
     print("\nExample request:")
     print("""
     POST /api/predict-delay
@@ -0,0 +1,288 @@
+import threading
+import time
+
+import numpy as np
+
+# Feature histograms are kept in standardized units (the scaled model input).
+# The training data is roughly zero-mean and unit-variance there, so one set
+# of edges suits every feature. The two outer bins are open-ended.
+FEATURE_EDGES = np.arange(-3.0, 3.5, 0.5)
+N_FEATURE_BINS = len(FEATURE_EDGES) + 1
+
+# Delay probabilities use ten equal-width bins, for both the score
+# histogram and calibration
+SCORE_EDGES = np.linspace(0.1, 0.9, 9)
+N_SCORE_BINS = len(SCORE_EDGES) + 1
+
+def feature_histograms(X_scaled):
+    """Per-feature bin counts of a scaled feature matrix, shape (n_features, N_FEATURE_BINS)"""
+    X_scaled = np.asarray(X_scaled, dtype=np.float64)
+    n_features = X_scaled.shape[1]
+    bins = np.searchsorted(FEATURE_EDGES, X_scaled, side='right')
+    flat = (bins + np.arange(n_features) * N_FEATURE_BINS).ravel()
+    return np.bincount(flat, minlength=n_features * N_FEATURE_BINS).reshape(n_features, N_FEATURE_BINS)
+
+def score_bins(probabilities):
+    return np.searchsorted(SCORE_EDGES, probabilities, side='right')
+
+def build_reference(X_scaled, probabilities):
+    """Reference distributions from held-out training data, for the bundle manifest"""
+    feature_counts = feature_histograms(X_scaled)
+    score_counts = np.bincount(score_bins(probabilities), minlength=N_SCORE_BINS)
+    return {
+        'n_rows': int(len(probabilities)),
+        'feature_histograms': np.round(feature_counts / len(probabilities), 6).tolist(),
+        'score_histogram': np.round(score_counts / len(probabilities), 6).tolist(),
+        'mean_score': float(np.mean(probabilities))
+    }
+
+def population_stability_index(expected, actual, floor=1e-4):
+    """PSI between two histograms given as proportions
+
+    Empty bins are floored so the log stays finite. Below 0.1 is usually read
+    as stable, and above 0.25 as a major shift.
+    """
+    expected = np.clip(np.asarray(expected, dtype=np.float64), floor, None)
+    actual = np.clip(np.asarray(actual, dtype=np.float64), floor, None)
+    return float(np.sum((actual - expected) * np.log(actual / expected)))
+
+class _Bucket:
+    """Sketches for one time slice of the window; merged at summary time"""
+    def __init__(self, n_features, n_categorical):
+        self.slot = None
+        self.rows = 0
+        self.mean = np.zeros(n_features)
+        self.m2 = np.zeros(n_features)
+        self.feature_counts = np.zeros((n_features, N_FEATURE_BINS), dtype=np.int64)
+        self.unseen = np.zeros(n_categorical, dtype=np.int64)
+        self.score_counts = np.zeros(N_SCORE_BINS, dtype=np.int64)
+        self.score_sum = 0.0
+        # Per score bin: outcomes, summed predictions, summed observed delays
+        self.outcome_count = np.zeros(N_SCORE_BINS, dtype=np.int64)
+        self.outcome_predicted = np.zeros(N_SCORE_BINS)
+        self.outcome_observed = np.zeros(N_SCORE_BINS)
+        self.squared_error = 0.0
+
+    def add_moments(self, rows, mean, m2):
+        """Merge another set of (count, mean, M2) moments (Chan et al.)"""
+        total = self.rows + rows
+        delta = mean - self.mean
+        self.mean = self.mean + delta * (rows / total)
+        self.m2 = self.m2 + m2 + delta ** 2 * (self.rows * rows / total)
+        self.rows = total
+
+class DriftMonitor:
+    """Sliding-window drift and calibration statistics for live predictions
+
+    The window is a ring of n_buckets time slices that together cover
+    window_seconds. When a slice expires it is cleared, so memory does not
+    grow with traffic. Each slice keeps fixed-size sketches:
+
+    - per feature: count, mean and M2 (merged with Chan's parallel update),
+      and a histogram in standardized units
+    - per categorical feature: the number of unseen categories, which
+      preprocess_data encodes as -1
+    - the delay-probability histogram
+    - calibration bins fed by observe_outcomes
+
+    summary() merges the live slices and compares them with the training
+    reference stored in the model bundle, using PSI for features and scores.
+    check() runs every time a new slice starts. When a threshold is crossed
+    it calls the registered hooks with the list of alerts, at most once per
+    cooldown_seconds. Hooks run on the request thread, so they should hand
+    slow work such as retraining to another thread or process.
+    """
+    def __init__(self, window_seconds=3600, n_buckets=12, psi_threshold=0.2,
+                 unseen_rate_threshold=0.05, calibration_error_threshold=0.1,
+                 min_rows=500, min_outcomes=200, cooldown_seconds=3600, clock=time.time):
+        self.window_seconds = window_seconds
+        self.n_buckets = n_buckets
+        self.bucket_seconds = window_seconds / n_buckets
+        self.psi_threshold = psi_threshold
+        self.unseen_rate_threshold = unseen_rate_threshold
+        self.calibration_error_threshold = calibration_error_threshold
+        self.min_rows = min_rows
+        self.min_outcomes = min_outcomes
+        self.cooldown_seconds = cooldown_seconds
+        self.clock = clock
+        self._hooks = []
+        self._lock = threading.Lock()
+        self._last_alert = None
+        self.reset([], [])
+
+    def add_hook(self, hook):
+        """Call hook(alerts) when drift or miscalibration crosses a threshold"""
+        self._hooks.append(hook)
+
+    def reset(self, feature_columns, categorical_columns, reference=None):
+        """Start a new window for a new model and its training reference"""
+        with self._lock:
+            self.feature_columns = list(feature_columns)
+            self.categorical_columns = [col for col in categorical_columns if col in self.feature_columns]
+            self.reference = reference
+            self._buckets = [_Bucket(len(self.feature_columns), len(self.categorical_columns))
+                             for _ in range(self.n_buckets)]
+
+    def observe(self, X_scaled, unseen, probabilities):
+        """Record a batch of scored rows
+
+        X_scaled is the scaled model input, unseen a boolean matrix with one
+        column per categorical feature, and probabilities the delay
+        probabilities.
+        """
+        X_scaled = np.asarray(X_scaled, dtype=np.float64)
+        rows = len(X_scaled)
+        if rows == 0 or X_scaled.shape[1] != len(self.feature_columns):
+            return
+        mean = X_scaled.mean(axis=0)
+        m2 = ((X_scaled - mean) ** 2).sum(axis=0)
+        feature_counts = feature_histograms(X_scaled)
+        unseen_counts = np.asarray(unseen).sum(axis=0)
+        score_counts = np.bincount(score_bins(probabilities), minlength=N_SCORE_BINS)
+
+        with self._lock:
+            bucket, rotated = self._current_bucket()
+            bucket.add_moments(rows, mean, m2)
+            bucket.feature_counts += feature_counts
+            bucket.unseen += unseen_counts
+            bucket.score_counts += score_counts
+            bucket.score_sum += float(np.sum(probabilities))
+        if rotated:
+            self.check()
+
+    def observe_outcomes(self, probabilities, delayed):
+        """Record actual outcomes (1 = delayed) for scored flights"""
+        probabilities = np.asarray(probabilities, dtype=np.float64)
+        delayed = np.asarray(delayed, dtype=np.float64)
+        bins = score_bins(probabilities)
+        with self._lock:
+            bucket, rotated = self._current_bucket()
+            bucket.outcome_count += np.bincount(bins, minlength=N_SCORE_BINS)
+            bucket.outcome_predicted += np.bincount(bins, weights=probabilities, minlength=N_SCORE_BINS)
+            bucket.outcome_observed += np.bincount(bins, weights=delayed, minlength=N_SCORE_BINS)
+            bucket.squared_error += float(np.sum((probabilities - delayed) ** 2))
+        if rotated:
+            self.check()
+
+    def _current_bucket(self):
+        """Bucket for the current time slice, cleared if it held an expired slice"""
+        slot = int(self.clock() // self.bucket_seconds)
+        index = slot % self.n_buckets
+        bucket = self._buckets[index]
+        if bucket.slot == slot:
+            return bucket, False
+        bucket = _Bucket(len(self.feature_columns), len(self.categorical_columns))
+        bucket.slot = slot
+        self._buckets[index] = bucket
+        return bucket, True
+
+    def summary(self):
+        """Window statistics, compared with the training reference where there is one"""
+        with self._lock:
+            oldest = int(self.clock() // self.bucket_seconds) - self.n_buckets + 1
+            live = [bucket for bucket in self._buckets if bucket.slot is not None and bucket.slot >= oldest]
+            merged = _Bucket(len(self.feature_columns), len(self.categorical_columns))
+            for bucket in live:
+                if bucket.rows:
+                    merged.add_moments(bucket.rows, bucket.mean, bucket.m2)
+                merged.feature_counts += bucket.feature_counts
+                merged.unseen += bucket.unseen
+                merged.score_counts += bucket.score_counts
+                merged.score_sum += bucket.score_sum
+                merged.outcome_count += bucket.outcome_count
+                merged.outcome_predicted += bucket.outcome_predicted
+                merged.outcome_observed += bucket.outcome_observed
+                merged.squared_error += bucket.squared_error
+            reference = self.reference
+            feature_columns = self.feature_columns
+            categorical_columns = self.categorical_columns
+
+        rows = merged.rows
+        summary = {
+            'window_seconds': self.window_seconds,
+            'rows': rows,
+            'has_reference': reference is not None,
+            'features': {},
+            'scores': None,
+            'calibration': None
+        }
+        if rows:
+            std = np.sqrt(merged.m2 / rows)
+            for i, col in enumerate(feature_columns):
+                stats = {
+                    # Standardized units: training data has mean 0 and std 1
+                    'mean': round(float(merged.mean[i]), 4),
+                    'std': round(float(std[i]), 4),
+                    'psi': None
+                }
+                if reference is not None:
+                    stats['psi'] = round(population_stability_index(
+                        reference['feature_histograms'][i], merged.feature_counts[i] / rows), 4)
+                if col in categorical_columns:
+                    stats['unseen_rate'] = round(float(merged.unseen[categorical_columns.index(col)]) / rows, 4)
+                summary['features'][col] = stats
+
+            summary['scores'] = {
+                'mean': round(merged.score_sum / rows, 4),
+                'histogram': np.round(merged.score_counts / rows, 4).tolist(),
+                'psi': None
+            }
+            if reference is not None:
+                summary['scores']['psi'] = round(population_stability_index(
+                    reference['score_histogram'], merged.score_counts / rows), 4)
+                summary['scores']['reference_mean'] = round(reference['mean_score'], 4)
+
+        outcomes = int(merged.outcome_count.sum())
+        if outcomes:
+            filled = merged.outcome_count > 0
+            predicted = merged.outcome_predicted[filled] / merged.outcome_count[filled]
+            observed = merged.outcome_observed[filled] / merged.outcome_count[filled]
+            weights = merged.outcome_count[filled] / outcomes
+            summary['calibration'] = {
+                'outcomes': outcomes,
+                'brier_score': round(merged.squared_error / outcomes, 4),
+                'expected_calibration_error': round(float(np.sum(weights * np.abs(predicted - observed))), 4),
+                'observed_delay_rate': round(float(merged.outcome_observed.sum()) / outcomes, 4),
+                'bins': [
+                    {'predicted': round(float(p), 4), 'observed': round(float(o), 4), 'count': int(n)}
+                    for p, o, n in zip(predicted, observed, merged.outcome_count[filled])
+                ]
+            }
+        summary['alerts'] = self._alerts(summary)
+        summary['last_alert'] = self._last_alert
+        return summary
+
+    def _alerts(self, summary):
+        alerts = []
+        if summary['rows'] >= self.min_rows:
+            for col, stats in summary['features'].items():
+                if stats['psi'] is not None and stats['psi'] > self.psi_threshold:
+                    alerts.append({'check': 'feature_psi', 'feature': col,
+                                   'value': stats['psi'], 'threshold': self.psi_threshold})
+                if stats.get('unseen_rate', 0) > self.unseen_rate_threshold:
+                    alerts.append({'check': 'unseen_rate', 'feature': col,
+                                   'value': stats['unseen_rate'], 'threshold': self.unseen_rate_threshold})
+            psi = summary['scores']['psi']
+            if psi is not None and psi > self.psi_threshold:
+                alerts.append({'check': 'score_psi', 'value': psi, 'threshold': self.psi_threshold})
+        calibration = summary['calibration']
+        if calibration is not None and calibration['outcomes'] >= self.min_outcomes:
+            error = calibration['expected_calibration_error']
+            if error > self.calibration_error_threshold:
+                alerts.append({'check': 'calibration_error', 'value': error,
+                               'threshold': self.calibration_error_threshold})
+        return alerts
+
+    def check(self):
+        """Evaluate the thresholds and call the hooks if any are crossed"""
+        alerts = self.summary()['alerts']
+        if not alerts or not self._hooks:
+            return alerts
+        now = self.clock()
+        with self._lock:
+            if self._last_alert is not None and now - self._last_alert['time'] < self.cooldown_seconds:
+                return alerts
+            self._last_alert = {'time': now, 'alerts': alerts}
+        for hook in self._hooks:
+            hook(alerts)
+        return alerts
@@ -0,0 +1,267 @@
+import numpy as np
+import pandas as pd
+
+# Route features that callers may leave out; preprocessing fills them from
+# the feature store
+ROUTE_FEATURES = ('distance', 'origin_congestion', 'dest_congestion')
+
+# Last-resort values when there is no store, or no history for a route
+ROUTE_FEATURE_DEFAULTS = {
+    'distance': 1000.0,
+    'origin_congestion': 0.5,
+    'dest_congestion': 0.5
+}
+
+# Latitude/longitude of the airports used for synthetic data
+AIRPORT_COORDINATES = {
+    'ATL': (33.6407, -84.4277), 'LAX': (33.9416, -118.4085), 'ORD': (41.9742, -87.9073),
+    'DFW': (32.8998, -97.0403), 'DEN': (39.8561, -104.6737), 'JFK': (40.6413, -73.7781),
+    'SFO': (37.6213, -122.3790), 'SEA': (47.4502, -122.3088), 'LAS': (36.0840, -115.1537),
+    'MCO': (28.4312, -81.3081), 'EWR': (40.6895, -74.1745), 'CLT': (35.2144, -80.9473),
+    'PHX': (33.4342, -112.0116), 'IAH': (29.9902, -95.3368), 'MIA': (25.7959, -80.2870),
+    'BOS': (42.3656, -71.0096), 'MSP': (44.8848, -93.2223), 'FLL': (26.0742, -80.1506),
+    'DTW': (42.2162, -83.3554), 'PHL': (39.8744, -75.2424)
+}
+
+EARTH_RADIUS_MILES = 3958.8
+
+# Congestion is aggregated per departure hour; the extra column holds the
+# all-hours mean used when the hour is unknown
+HOURS = 24
+
+def great_circle_miles(lat1, lon1, lat2, lon2):
+    """Haversine distance in statute miles (inputs in degrees, broadcastable)"""
+    lat1, lon1, lat2, lon2 = map(np.radians, (lat1, lon1, lat2, lon2))
+    a = np.sin((lat2 - lat1) / 2) ** 2 + np.cos(lat1) * np.cos(lat2) * np.sin((lon2 - lon1) / 2) ** 2
+    return 2 * EARTH_RADIUS_MILES * np.arcsin(np.sqrt(a))
+
+class RouteFeatureStore:
+    """Per-airport and per-route aggregates in arrays indexed by encoder codes
+
+    Origin arrays are indexed by origin_airport codes and destination arrays
+    by dest_airport codes, so encoded rows look up their features with plain
+    array indexing. Sums and counts are stored rather than means, so update()
+    folds new rows in without rereading old data. The fill tables are
+    rebuilt from them after each update. Every fill table has one extra
+    trailing row (and route column) holding the fallback value, so code -1
+    (a category unseen by the encoder) indexes the fallback directly.
+    """
+    ARRAY_NAMES = (
+        'origin_flights', 'origin_delays', 'dest_flights', 'dest_delays',
+        'route_flights', 'route_delays', 'route_distance_sum',
+        'origin_congestion_sum', 'origin_congestion_count',
+        'dest_congestion_sum', 'dest_congestion_count'
+    )
+    # Prefix for the arrays stored in a model bundle
+    BUNDLE_PREFIX = 'route_store_'
+
+    def __init__(self, origin_airports, dest_airports, arrays=None):
+        self.origin_airports = [str(airport) for airport in origin_airports]
+        self.dest_airports = [str(airport) for airport in dest_airports]
+        n_origin, n_dest = len(self.origin_airports), len(self.dest_airports)
+        if arrays is None:
+            arrays = {
+                'origin_flights': np.zeros(n_origin, dtype=np.int64),
+                'origin_delays': np.zeros(n_origin, dtype=np.int64),
+                'dest_flights': np.zeros(n_dest, dtype=np.int64),
+                'dest_delays': np.zeros(n_dest, dtype=np.int64),
+                'route_flights': np.zeros((n_origin, n_dest), dtype=np.int64),
+                'route_delays': np.zeros((n_origin, n_dest), dtype=np.int64),
+                'route_distance_sum': np.zeros((n_origin, n_dest)),
+                'origin_congestion_sum': np.zeros((n_origin, HOURS)),
+                'origin_congestion_count': np.zeros((n_origin, HOURS), dtype=np.int64),
+                'dest_congestion_sum': np.zeros((n_dest, HOURS)),
+                'dest_congestion_count': np.zeros((n_dest, HOURS), dtype=np.int64)
+            }
+        for name in self.ARRAY_NAMES:
+            setattr(self, name, arrays[name])
+
+        # Great-circle distances where both airports have known coordinates
+        origin_coords = self._coordinates(self.origin_airports)
+        dest_coords = self._coordinates(self.dest_airports)
+        self.great_circle = great_circle_miles(
+            origin_coords[:, None, 0], origin_coords[:, None, 1],
+            dest_coords[None, :, 0], dest_coords[None, :, 1]
+        )
+        self._build_tables()
+
+    @staticmethod
+    def _coordinates(airports):
+        return np.array([AIRPORT_COORDINATES.get(airport, (np.nan, np.nan)) for airport in airports])
+
+    @classmethod
+    def from_training_data(cls, df_processed, category_lookups, target_column='is_delayed'):
+        """Build a store from an encoded training frame"""
+        store = cls(category_lookups['origin_airport'], category_lookups['dest_airport'])
+        store.update(df_processed, target_column)
+        return store
+
+    def update(self, df_processed, target_column='is_delayed'):
+        """Fold encoded rows into the aggregates and refresh the fill tables
+
+        Rows with an unseen airport (code -1) or a missing value are skipped
+        for the aggregates they cannot contribute to.
+        """
+        self._ensure_writable()
+        n_origin, n_dest = len(self.origin_airports), len(self.dest_airports)
+        origin = df_processed['origin_airport'].to_numpy(np.int64)
+        dest = df_processed['dest_airport'].to_numpy(np.int64)
+        hour = df_processed['departure_hour'].to_numpy(np.int64) % HOURS
+        delayed = df_processed[target_column].to_numpy(np.int64)
+        known_origin, known_dest = origin >= 0, dest >= 0
+
+        self.origin_flights += np.bincount(origin[known_origin], minlength=n_origin)
+        self.origin_delays += np.bincount(origin[known_origin], weights=delayed[known_origin],
+                                          minlength=n_origin).astype(np.int64)
+        self.dest_flights += np.bincount(dest[known_dest], minlength=n_dest)
+        self.dest_delays += np.bincount(dest[known_dest], weights=delayed[known_dest],
+                                        minlength=n_dest).astype(np.int64)
+
+        known_route = known_origin & known_dest
+        route = origin[known_route] * n_dest + dest[known_route]
+        size = n_origin * n_dest
+        self.route_flights += np.bincount(route, minlength=size).reshape(n_origin, n_dest)
+        self.route_delays += np.bincount(route, weights=delayed[known_route],
+                                         minlength=size).astype(np.int64).reshape(n_origin, n_dest)
+        distance = df_processed['distance'].to_numpy(np.float64)[known_route]
+        has_distance = np.isfinite(distance)
+        self.route_distance_sum += np.bincount(route[has_distance], weights=distance[has_distance],
+                                               minlength=size).reshape(n_origin, n_dest)
+
+        for side, codes, known, n_airports in (('origin', origin, known_origin, n_origin),
+                                               ('dest', dest, known_dest, n_dest)):
+            congestion = df_processed[f'{side}_congestion'].to_numpy(np.float64)
+            rows = known & np.isfinite(congestion)
+            cell = codes[rows] * HOURS + hour[rows]
+            getattr(self, f'{side}_congestion_sum')[...] += np.bincount(
+                cell, weights=congestion[rows], minlength=n_airports * HOURS).reshape(n_airports, HOURS)
+            getattr(self, f'{side}_congestion_count')[...] += np.bincount(
+                cell, minlength=n_airports * HOURS).reshape(n_airports, HOURS)
+
+        self._build_tables()
+        return self
+
+    def _ensure_writable(self):
+        # Arrays memory-mapped read-only from a bundle are copied on first update
+        for name in self.ARRAY_NAMES:
+            array = getattr(self, name)
+            if not array.flags.writeable:
+                setattr(self, name, np.array(array))
+
+    def _build_tables(self):
+        """Precompute the O(1) fill tables from the sums and counts"""
+        n_origin, n_dest = len(self.origin_airports), len(self.dest_airports)
+
+        # Distance: great circle, then the route's historical mean, then the
+        # overall mean, then the default
+        route_flights = self.route_flights
+        flown = route_flights > 0
+        total_flights = route_flights.sum()
+        fallback = (self.route_distance_sum.sum() / total_flights if total_flights
+                    else ROUTE_FEATURE_DEFAULTS['distance'])
+        historical = np.divide(self.route_distance_sum, route_flights,
+                               out=np.full((n_origin, n_dest), fallback), where=flown)
+        distance_table = np.full((n_origin + 1, n_dest + 1), fallback)
+        distance_table[:n_origin, :n_dest] = np.where(np.isfinite(self.great_circle), self.great_circle, historical)
+        self.distance_table = distance_table
+
+        # Congestion: the (airport, hour) mean, then the airport's all-hours
+        # mean, then the mean for that hour across airports, then the default
+        for side, n_airports in (('origin', n_origin), ('dest', n_dest)):
+            sums = getattr(self, f'{side}_congestion_sum')
+            counts = getattr(self, f'{side}_congestion_count')
+            default = ROUTE_FEATURE_DEFAULTS[f'{side}_congestion']
+            total = counts.sum()
+            overall = sums.sum() / total if total else default
+            hour_counts = counts.sum(axis=0)
+            by_hour = np.divide(sums.sum(axis=0), hour_counts,
+                                out=np.full(HOURS, overall), where=hour_counts > 0)
+            airport_counts = counts.sum(axis=1)
+            by_airport = np.divide(sums.sum(axis=1), airport_counts,
+                                   out=np.full(n_airports, overall), where=airport_counts > 0)
+
+            table = np.empty((n_airports + 1, HOURS + 1))
+            table[:n_airports, :HOURS] = by_airport[:, None]
+            np.divide(sums, counts, out=table[:n_airports, :HOURS], where=counts > 0)
+            table[:n_airports, HOURS] = by_airport
+            table[n_airports, :HOURS] = by_hour
+            table[n_airports, HOURS] = overall
+            setattr(self, f'{side}_congestion_table', table)
+
+    def fill(self, df):
+        """Fill missing route features in an encoded frame, in place"""
+        n_rows = len(df)
+        origin = df['origin_airport'].to_numpy(np.int64) if 'origin_airport' in df.columns else np.full(n_rows, -1)
+        dest = df['dest_airport'].to_numpy(np.int64) if 'dest_airport' in df.columns else np.full(n_rows, -1)
+        if 'departure_hour' in df.columns:
+            hour = pd.to_numeric(df['departure_hour'], errors='coerce').to_numpy(np.float64)
+            hour = np.where(np.isfinite(hour), np.nan_to_num(hour) % HOURS, HOURS).astype(np.int64)
+        else:
+            hour = np.full(n_rows, HOURS)
+
+        lookups = {
+            'distance': lambda rows: self.distance_table[origin[rows], dest[rows]],
+            'origin_congestion': lambda rows: self.origin_congestion_table[origin[rows], hour[rows]],
+            'dest_congestion': lambda rows: self.dest_congestion_table[dest[rows], hour[rows]]
+        }
+        for col, lookup in lookups.items():
+            _fill_column(df, col, lookup)
+        return df
+
+    def lookup(self, origin_code, dest_code, hour=None):
+        """Route feature values for one flight, by encoder codes"""
+        hour = HOURS if hour is None else int(hour) % HOURS
+        return {
+            'distance': float(self.distance_table[origin_code, dest_code]),
+            'origin_congestion': float(self.origin_congestion_table[origin_code, hour]),
+            'dest_congestion': float(self.dest_congestion_table[dest_code, hour])
+        }
+
+    def route_history(self, origin_code, dest_code):
+        """Historical delay rates and flight counts for one route"""
+        def rate(delays, flights):
+            return round(float(delays) / float(flights), 4) if flights else None
+
+        history = {'route_flights': 0, 'route_delay_rate': None,
+                   'origin_delay_rate': None, 'dest_delay_rate': None}
+        if origin_code >= 0:
+            history['origin_delay_rate'] = rate(self.origin_delays[origin_code], self.origin_flights[origin_code])
+        if dest_code >= 0:
+            history['dest_delay_rate'] = rate(self.dest_delays[dest_code], self.dest_flights[dest_code])
+        if origin_code >= 0 and dest_code >= 0:
+            flights = int(self.route_flights[origin_code, dest_code])
+            history['route_flights'] = flights
+            history['route_delay_rate'] = rate(self.route_delays[origin_code, dest_code], flights)
+        history['distance'] = round(float(self.distance_table[origin_code, dest_code]), 1)
+        return history
+
+    def to_arrays(self):
+        """Aggregate arrays keyed by bundle array name"""
+        return {self.BUNDLE_PREFIX + name: getattr(self, name) for name in self.ARRAY_NAMES}
+
+    @classmethod
+    def from_arrays(cls, arrays, category_lookups):
+        """Rebuild from bundle arrays (which may be memory-mapped), or None if absent"""
+        if cls.BUNDLE_PREFIX + cls.ARRAY_NAMES[0] not in arrays:
+            return None
+        return cls(
+            category_lookups['origin_airport'], category_lookups['dest_airport'],
+            arrays={name: arrays[cls.BUNDLE_PREFIX + name] for name in cls.ARRAY_NAMES}
+        )
+
+def fill_route_defaults(df):
+    """Fill missing route features with the fixed defaults (no store)"""
+    for col, default in ROUTE_FEATURE_DEFAULTS.items():
+        _fill_column(df, col, lambda rows, default=default: default)
+    return df
+
+def _fill_column(df, col, lookup):
+    if col not in df.columns:
+        df[col] = lookup(np.ones(len(df), dtype=bool))
+        return
+    values = df[col]
+    missing = values.isna().to_numpy()
+    if missing.any():
+        values = pd.to_numeric(values, errors='coerce').to_numpy(np.float64, copy=True)
+        values[missing] = lookup(missing)
+        df[col] = values
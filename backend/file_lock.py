@@ -0,0 +1,58 @@
+import os
+import time
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+class FileLock:
+    """Exclusive advisory lock on a file, shared across processes
+
+    Used as a context manager. The lock file is created if needed and left in
+    place afterwards; only the lock itself is released.
+    """
+    def __init__(self, path, poll_interval=0.1):
+        self.path = path
+        self.poll_interval = poll_interval
+        self._fd = None
+
+    def acquire(self, timeout=None):
+        """Block until the lock is held, or raise TimeoutError"""
+        fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o644)
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            try:
+                if fcntl is not None:
+                    fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                else:
+                    msvcrt.locking(fd, msvcrt.LK_NBLCK, 1)
+                break
+            except OSError:
+                if deadline is not None and time.monotonic() >= deadline:
+                    os.close(fd)
+                    raise TimeoutError(f"Timed out waiting for lock {self.path}")
+                time.sleep(self.poll_interval)
+        self._fd = fd
+
+    def release(self):
+        """Release the lock if held"""
+        if self._fd is None:
+            return
+        try:
+            if fcntl is not None:
+                fcntl.flock(self._fd, fcntl.LOCK_UN)
+            else:
+                os.lseek(self._fd, 0, os.SEEK_SET)
+                msvcrt.locking(self._fd, msvcrt.LK_UNLCK, 1)
+        finally:
+            os.close(self._fd)
+            self._fd = None
+
+    def __enter__(self):
+        self.acquire()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.release()
@@ -1,256 +1,1304 @@
 import pandas as pd
 import numpy as np
-from sklearn.model_selection import train_test_split
-from sklearn.ensemble import RandomForestClassifier
-from sklearn.preprocessing import LabelEncoder, StandardScaler
-from sklearn.metrics import classification_report, confusion_matrix, accuracy_score
 import joblib
+import copy
 import json
+import os
+import hashlib
+import threading
+import time
+from contextlib import contextmanager
 from datetime import datetime, timedelta
+import model_bundle
+from compiled_forest import CompactForest, CompiledForest, forest_from_arrays
+from feature_store import ROUTE_FEATURES, ROUTE_FEATURE_DEFAULTS, RouteFeatureStore, fill_route_defaults
+from drift_monitor import build_reference
+from metrics import REGISTRY, stage_timer
 import warnings
 warnings.filterwarnings('ignore')
 
+# Categorical features that are label encoded before training/prediction
+CATEGORICAL_COLUMNS = ['airline', 'origin_airport', 'dest_airport']
+
+# Defaults for optional weather fields in prediction requests
+FEATURE_DEFAULTS = {
+    'temperature': 70,
+    'wind_speed': 10,
+    'visibility': 10,
+    'precipitation': 0
+}
+
+# Numeric features a what-if sweep (predict_scenarios) can vary
+SCENARIO_FIELDS = ('departure_hour', 'month', 'day_of_week') + tuple(FEATURE_DEFAULTS)
+
+# Risk levels by 0-100 risk score: below 30, below 60, and the rest
+RISK_LEVELS = np.array(['Low', 'Medium', 'High'], dtype=object)
+RISK_LEVEL_THRESHOLDS = [30, 60]
+
+# Inference engines for scoring the trained forest
+INFERENCE_ENGINES = ('sklearn', 'compiled')
+
+# Airlines and airports (major US airports) used for synthetic data
+AIRLINES = np.array(['AA', 'DL', 'UA', 'SW', 'JB', 'AS', 'NK', 'F9', 'G4', 'B6'])
+AIRPORTS = np.array(['ATL', 'LAX', 'ORD', 'DFW', 'DEN', 'JFK', 'SFO', 'SEA', 'LAS', 'MCO',
+                     'EWR', 'CLT', 'PHX', 'IAH', 'MIA', 'BOS', 'MSP', 'FLL', 'DTW', 'PHL'])
+DEPARTURE_HOURS = np.arange(6, 23)
+
+# scikit-learn (and the scipy stack behind it), parallel_training and
+# dataset_loader are only imported by the training and evaluation methods
+# and when a deferred bundle artifact is first needed, so serving a compiled
+# bundle never loads them. import_report.py checks this.
+
+@contextmanager
+def _phase(timings, name):
+    """Record the wall-clock seconds spent in a training phase"""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - start
+        timings[name] = round(timings.get(name, 0) + elapsed, 4)
+        REGISTRY.observe('flight_delay_training_phase_seconds', elapsed, phase=name)
+
+def _is_hashable(value):
+    """Whether value can be looked up in a category Index"""
+    try:
+        hash(value)
+    except TypeError:
+        return False
+    return True
+
 class FlightDelayPredictor:
-    def __init__(self):
-        self.model = None
-        self.label_encoders = {}
-        self.scaler = StandardScaler()
+    def __init__(self, inference_engine='sklearn', prediction_cache=None, drift_monitor=None):
+        if inference_engine not in INFERENCE_ENGINES:
+            raise ValueError(f"inference_engine must be one of {INFERENCE_ENGINES}")
+        self.inference_engine = inference_engine
+        self.prediction_cache = prediction_cache
+        self.drift_monitor = drift_monitor
+        self.drift_reference = None
+        self._deferred_bundle = None
+        self._deferred_lock = threading.Lock()
+        self._model = None
+        self._label_encoders = {}
+        self._scaler = None
+        self.compiled_model = None
+        self.category_lookups = {}
+        self.feature_store = None
         self.feature_columns = []
+        self.training_data_hash = None
+        self.metrics = {}
+        self.manifest = None
+        self.model_generation = 0
+        self.tree_generations = []
+        self.training_timings = {}
+        # Bumped whenever the served model changes, in place or by loading;
+        # the inference worker pool re-forks when it moves
+        self.model_revision = 0
+    
+    def _deferred_artifact(name):
+        """Attribute backed by a bundle artifact that is unpickled on first use"""
+        private_name = '_' + name
+        
+        def get(self):
+            if self._deferred_bundle is not None:
+                self._load_deferred_bundle()
+            return getattr(self, private_name)
         
-    def generate_synthetic_data(self, n_samples=10000):
+        def set(self, value):
+            # Materialize the rest of a deferred bundle first so it cannot
+            # later overwrite what is assigned here
+            if self._deferred_bundle is not None:
+                self._load_deferred_bundle()
+            setattr(self, private_name, value)
+        
+        return property(get, set)
+    
+    model = _deferred_artifact('model')
+    label_encoders = _deferred_artifact('label_encoders')
+    scaler = _deferred_artifact('scaler')
+    del _deferred_artifact
+    
+    @property
+    def has_model(self):
+        """Whether a model is trained or loaded, without loading deferred artifacts"""
+        return self._model is not None or self._deferred_bundle is not None
+    
+    def generate_synthetic_data(self, n_samples=10000, random_state=42):
         """Generate synthetic flight data for training"""
-        np.random.seed(42)
-        
-        # Airlines
-        airlines = ['AA', 'DL', 'UA', 'SW', 'JB', 'AS', 'NK', 'F9', 'G4', 'B6']
-        
-        # Airports (major US airports)
-        airports = ['ATL', 'LAX', 'ORD', 'DFW', 'DEN', 'JFK', 'SFO', 'SEA', 'LAS', 'MCO',
-                   'EWR', 'CLT', 'PHX', 'IAH', 'MIA', 'BOS', 'MSP', 'FLL', 'DTW', 'PHL']
-        
-        # Generate synthetic data
-        data = []
-        for _ in range(n_samples):
-            # Basic flight info
-            airline = np.random.choice(airlines)
-            origin = np.random.choice(airports)
-            dest = np.random.choice(airports)
-            while dest == origin:  # Ensure different airports
-                dest = np.random.choice(airports)
-            
-            # Time features
-            month = np.random.randint(1, 13)
-            day_of_week = np.random.randint(1, 8)
-            hour = np.random.choice([6, 7, 8, 9, 10, 11, 12, 13, 14, 15, 16, 17, 18, 19, 20, 21, 22])
-            
-            # Weather features (simplified)
-            temperature = np.random.normal(65, 20)  # Fahrenheit
-            wind_speed = np.random.exponential(10)  # mph
-            visibility = np.random.normal(10, 2)  # miles
-            precipitation = np.random.exponential(0.1)  # inches
-            
-            # Airport congestion (synthetic)
-            origin_congestion = np.random.uniform(0.1, 0.9)
-            dest_congestion = np.random.uniform(0.1, 0.9)
-            
-            # Distance (simplified based on airport pairs)
-            distance = np.random.uniform(200, 3000)
-            
-            # Calculate delay probability based on features
-            delay_prob = 0.1  # Base probability
-            
-            # Airline effect
-            if airline in ['NK', 'F9', 'G4']:  # Budget airlines tend to have more delays
-                delay_prob += 0.15
-            elif airline in ['DL', 'AA']:  # Premium airlines tend to be more punctual
-                delay_prob -= 0.05
-                
-            # Time effects
-            if hour in [7, 8, 17, 18, 19]:  # Rush hours
-                delay_prob += 0.2
-            if day_of_week in [1, 7]:  # Monday and Sunday
-                delay_prob += 0.1
-            if month in [6, 7, 12]:  # Summer and December (holiday season)
-                delay_prob += 0.15
-                
-            # Weather effects
-            if wind_speed > 25:
-                delay_prob += 0.3
-            if visibility < 5:
-                delay_prob += 0.25
-            if precipitation > 0.5:
-                delay_prob += 0.2
-            if temperature < 20 or temperature > 95:
-                delay_prob += 0.1
-                
-            # Congestion effects
-            delay_prob += origin_congestion * 0.2
-            delay_prob += dest_congestion * 0.2
-            
-            # Distance effect
-            if distance > 2000:
-                delay_prob += 0.05
-                
-            # Cap probability
-            delay_prob = min(delay_prob, 0.85)
-            
-            # Determine if delayed (>15 minutes)
-            is_delayed = np.random.random() < delay_prob
-            
-            data.append({
-                'airline': airline,
-                'origin_airport': origin,
-                'dest_airport': dest,
-                'month': month,
-                'day_of_week': day_of_week,
-                'departure_hour': hour,
-                'distance': distance,
-                'temperature': temperature,
-                'wind_speed': wind_speed,
-                'visibility': visibility,
-                'precipitation': precipitation,
-                'origin_congestion': origin_congestion,
-                'dest_congestion': dest_congestion,
-                'is_delayed': int(is_delayed)
-            })
-        
-        return pd.DataFrame(data)
-    
-    def preprocess_data(self, df):
-        """Preprocess the data for training"""
+        rng = np.random.default_rng(random_state)
+        return self._synthetic_chunk(rng, n_samples)
+    
+    def iter_synthetic_data(self, n_samples, chunk_size=1000000, random_state=42):
+        """Yield synthetic flight data in DataFrames of at most chunk_size rows
+        
+        Large corpora can be produced chunk by chunk without ever holding the
+        full dataset in memory. Row indexes continue across chunks.
+        """
+        rng = np.random.default_rng(random_state)
+        for offset in range(0, n_samples, chunk_size):
+            chunk = self._synthetic_chunk(rng, min(chunk_size, n_samples - offset))
+            chunk.index += offset
+            yield chunk
+    
+    def write_synthetic_data(self, output_dir, n_samples, chunk_size=1000000,
+                             file_format='parquet', random_state=42):
+        """Write synthetic flight data as Parquet or CSV shards
+        
+        Each chunk becomes one part-NNNNN file in output_dir. Returns the list
+        of written paths.
+        """
+        if file_format not in ('parquet', 'csv'):
+            raise ValueError("file_format must be 'parquet' or 'csv'")
+        
+        os.makedirs(output_dir, exist_ok=True)
+        paths = []
+        for part, chunk in enumerate(self.iter_synthetic_data(n_samples, chunk_size, random_state)):
+            path = os.path.join(output_dir, f'part-{part:05d}.{file_format}')
+            if file_format == 'parquet':
+                chunk.to_parquet(path, index=False)
+            else:
+                chunk.to_csv(path, index=False)
+            paths.append(path)
+        return paths
+    
+    def _synthetic_chunk(self, rng, n_samples):
+        """Draw n_samples synthetic flights with array operations"""
+        n_airports = len(AIRPORTS)
+        
+        # Basic flight info; the destination is offset from the origin so the
+        # two airports always differ
+        airline = rng.choice(AIRLINES, n_samples)
+        origin_idx = rng.integers(0, n_airports, n_samples)
+        dest_idx = (origin_idx + rng.integers(1, n_airports, n_samples)) % n_airports
+        
+        # Time features
+        month = rng.integers(1, 13, n_samples)
+        day_of_week = rng.integers(1, 8, n_samples)
+        hour = rng.choice(DEPARTURE_HOURS, n_samples)
+        
+        # Weather features (simplified)
+        temperature = rng.normal(65, 20, n_samples)  # Fahrenheit
+        wind_speed = rng.exponential(10, n_samples)  # mph
+        visibility = rng.normal(10, 2, n_samples)  # miles
+        precipitation = rng.exponential(0.1, n_samples)  # inches
+        
+        # Airport congestion (synthetic)
+        origin_congestion = rng.uniform(0.1, 0.9, n_samples)
+        dest_congestion = rng.uniform(0.1, 0.9, n_samples)
+        
+        # Distance (simplified based on airport pairs)
+        distance = rng.uniform(200, 3000, n_samples)
+        
+        # Calculate delay probability based on features
+        delay_prob = np.full(n_samples, 0.1)  # Base probability
+        
+        # Airline effect: budget airlines tend to have more delays, premium
+        # airlines tend to be more punctual
+        delay_prob += np.where(np.isin(airline, ['NK', 'F9', 'G4']), 0.15, 0)
+        delay_prob -= np.where(np.isin(airline, ['DL', 'AA']), 0.05, 0)
+        
+        # Time effects
+        delay_prob += np.where(np.isin(hour, [7, 8, 17, 18, 19]), 0.2, 0)  # Rush hours
+        delay_prob += np.where(np.isin(day_of_week, [1, 7]), 0.1, 0)  # Monday and Sunday
+        delay_prob += np.where(np.isin(month, [6, 7, 12]), 0.15, 0)  # Summer and December
+        
+        # Weather effects
+        delay_prob += np.where(wind_speed > 25, 0.3, 0)
+        delay_prob += np.where(visibility < 5, 0.25, 0)
+        delay_prob += np.where(precipitation > 0.5, 0.2, 0)
+        delay_prob += np.where((temperature < 20) | (temperature > 95), 0.1, 0)
+        
+        # Congestion effects
+        delay_prob += origin_congestion * 0.2
+        delay_prob += dest_congestion * 0.2
+        
+        # Distance effect
+        delay_prob += np.where(distance > 2000, 0.05, 0)
+        
+        # Cap probability
+        delay_prob = np.minimum(delay_prob, 0.85)
+        
+        # Determine if delayed (>15 minutes)
+        is_delayed = (rng.random(n_samples) < delay_prob).astype(int)
+        
+        return pd.DataFrame({
+            'airline': airline,
+            'origin_airport': AIRPORTS[origin_idx],
+            'dest_airport': AIRPORTS[dest_idx],
+            'month': month,
+            'day_of_week': day_of_week,
+            'departure_hour': hour,
+            'distance': distance,
+            'temperature': temperature,
+            'wind_speed': wind_speed,
+            'visibility': visibility,
+            'precipitation': precipitation,
+            'origin_congestion': origin_congestion,
+            'dest_congestion': dest_congestion,
+            'is_delayed': is_delayed
+        })
+    
+    def preprocess_data(self, df, copy=True):
+        """Preprocess the data for training
+        
+        With copy=False the categorical columns are encoded in place, which
+        avoids duplicating large frames the caller owns.
+        """
         # Create a copy to avoid modifying original data
-        df_processed = df.copy()
+        df_processed = df.copy() if copy else df
         
         # Encode categorical variables
-        categorical_columns = ['airline', 'origin_airport', 'dest_airport']
-        
-        for col in categorical_columns:
-            if col not in self.label_encoders:
+        for col in CATEGORICAL_COLUMNS:
+            if col not in self.category_lookups and col not in self.label_encoders:
+                from sklearn.preprocessing import LabelEncoder
                 self.label_encoders[col] = LabelEncoder()
                 df_processed[col] = self.label_encoders[col].fit_transform(df_processed[col])
+                self.category_lookups[col] = pd.Index(self.label_encoders[col].classes_)
             else:
-                # Handle unseen categories
-                df_processed[col] = df_processed[col].map(
-                    lambda x: self.label_encoders[col].transform([x])[0] 
-                    if x in self.label_encoders[col].classes_ else -1
-                )
+                # Encode the whole column through the lookup table; unseen
+                # categories come back as -1
+                if col not in self.category_lookups:
+                    self.category_lookups[col] = pd.Index(self.label_encoders[col].classes_)
+                lookup = self.category_lookups[col]
+                values = df_processed[col]
+                if isinstance(values.dtype, pd.CategoricalDtype):
+                    # Only look up the distinct categories, then expand by code
+                    mapping = np.append(lookup.get_indexer(values.cat.categories), -1)
+                    df_processed[col] = mapping[values.cat.codes.to_numpy()]
+                else:
+                    df_processed[col] = lookup.get_indexer(values)
+        
+        # Fill route features the caller left out: from the feature store
+        # when there is one, otherwise with fixed defaults
+        if any(col not in df_processed.columns or df_processed[col].isna().any() for col in ROUTE_FEATURES):
+            if self.feature_store is not None:
+                self.feature_store.fill(df_processed)
+            else:
+                fill_route_defaults(df_processed)
         
         return df_processed
     
-    def train_model(self, df):
-        """Train the delay prediction model"""
-        print("Preprocessing data...")
-        df_processed = self.preprocess_data(df)
+    def _build_category_lookups(self):
+        """Build the category -> code lookup tables from the fitted encoders
+        
+        LabelEncoder codes are positions in the sorted classes_, so a hashed
+        pandas Index over classes_ gives the same codes via get_indexer.
+        """
+        self.category_lookups = {
+            col: pd.Index(encoder.classes_)
+            for col, encoder in self.label_encoders.items()
+        }
+    
+    def train_model(self, df, n_workers=None, max_worker_memory_mb=None, verbose=True):
+        """Train the delay prediction model
         
-        # Separate features and target
-        X = df_processed.drop('is_delayed', axis=1)
-        y = df_processed['is_delayed']
+        By default the forest is fitted in-process with joblib threads. With
+        n_workers set, tree building is spread over a process pool instead
+        (see parallel_training.fit_forest_parallel). Wall-clock time for each
+        phase is recorded in training_timings and saved in the manifest.
+        """
+        from sklearn.ensemble import RandomForestClassifier
+        from sklearn.model_selection import train_test_split
+        from sklearn.preprocessing import StandardScaler
+        from parallel_training import FOREST_PARAMS, fit_forest_parallel
         
-        self.feature_columns = X.columns.tolist()
+        timings = {}
+        
+        with _phase(timings, 'preprocess'):
+            print("Preprocessing data...")
+            self.training_data_hash = self._hash_training_data(df)
+            df_processed = self.preprocess_data(df)
+            self.feature_store = RouteFeatureStore.from_training_data(df_processed, self.category_lookups)
+            
+            # Separate features and target
+            X = df_processed.drop('is_delayed', axis=1)
+            y = df_processed['is_delayed']
+            
+            self.feature_columns = X.columns.tolist()
         
         # Split the data
-        X_train, X_test, y_train, y_test = train_test_split(
-            X, y, test_size=0.2, random_state=42, stratify=y
-        )
+        with _phase(timings, 'split'):
+            X_train, X_test, y_train, y_test = train_test_split(
+                X, y, test_size=0.2, random_state=42, stratify=y
+            )
         
         # Scale numerical features
-        X_train_scaled = self.scaler.fit_transform(X_train)
-        X_test_scaled = self.scaler.transform(X_test)
+        with _phase(timings, 'scale'):
+            self.scaler = StandardScaler()
+            X_train_scaled = self.scaler.fit_transform(X_train)
+            X_test_scaled = self.scaler.transform(X_test)
         
         # Train Random Forest model
-        print("Training Random Forest model...")
-        self.model = RandomForestClassifier(
-            n_estimators=100,
-            max_depth=15,
-            min_samples_split=10,
-            min_samples_leaf=5,
-            random_state=42,
-            n_jobs=-1
-        )
-        
-        self.model.fit(X_train_scaled, y_train)
+        with _phase(timings, 'fit'):
+            print("Training Random Forest model...")
+            if n_workers is None:
+                self.model = RandomForestClassifier(
+                    n_estimators=100,
+                    random_state=42,
+                    n_jobs=-1,
+                    **FOREST_PARAMS
+                )
+                self.model.fit(X_train_scaled, y_train)
+            else:
+                self.model = fit_forest_parallel(
+                    X_train_scaled, y_train, n_estimators=100, n_workers=n_workers,
+                    max_worker_memory_mb=max_worker_memory_mb, random_state=42
+                )
+        self.model_generation = 0
+        self.tree_generations = [0] * len(self.model.estimators_)
         
         # Evaluate model
-        y_pred = self.model.predict(X_test_scaled)
-        y_pred_proba = self.model.predict_proba(X_test_scaled)[:, 1]
+        with _phase(timings, 'evaluate'):
+            self.metrics, self.drift_reference = self._evaluate(
+                self.model, X_test_scaled, y_test, n_train_samples=len(X_train), verbose=verbose
+            )
         
-        print(f"Model Accuracy: {accuracy_score(y_test, y_pred):.3f}")
-        print("\nClassification Report:")
-        print(classification_report(y_test, y_pred))
+        self.training_timings = timings
+        self._model_changed()
         
-        # Feature importance
-        feature_importance = pd.DataFrame({
-            'feature': self.feature_columns,
-            'importance': self.model.feature_importances_
-        }).sort_values('importance', ascending=False)
+        if verbose:
+            # Feature importance
+            feature_importance = pd.DataFrame({
+                'feature': self.feature_columns,
+                'importance': self.model.feature_importances_
+            }).sort_values('importance', ascending=False)
+            
+            print("\nTop 10 Most Important Features:")
+            print(feature_importance.head(10))
         
-        print("\nTop 10 Most Important Features:")
-        print(feature_importance.head(10))
+        return self.model
+    
+    def update_model(self, df, n_estimators=20, max_tree_age=None, n_partitions=None,
+                     n_workers=None, max_worker_memory_mb=None, verbose=True):
+        """Warm-start retraining: add trees fitted on new data to the forest
+        
+        The existing trees, encoders and scaler are kept; the new rows are
+        encoded and scaled with them so old and new trees see the same
+        feature space. The new trees are fitted on n_partitions shuffled
+        partitions of df across a process pool. With max_tree_age set, trees
+        from generations at least that many updates old are pruned afterwards.
         
+        The grown forest is a new estimator that replaces the current one only
+        once everything has succeeded, so a failed update changes nothing.
+        """
+        if self.model is None:
+            raise ValueError("Model not trained yet. Call train_model() first.")
+        if max_tree_age is not None and max_tree_age < 1:
+            raise ValueError("max_tree_age must be at least 1, or every tree would be pruned")
+        
+        from sklearn.model_selection import train_test_split
+        from parallel_training import fit_forest_parallel, merge_forests
+        
+        timings = {}
+        
+        with _phase(timings, 'preprocess'):
+            print("Preprocessing new data...")
+            new_data_hash = self._hash_training_data(df)
+            df_processed = self.preprocess_data(df)
+            if self.feature_store is None:
+                feature_store = RouteFeatureStore.from_training_data(df_processed, self.category_lookups)
+            else:
+                feature_store = copy.deepcopy(self.feature_store)
+                feature_store.update(df_processed)
+            X = df_processed[self.feature_columns]
+            y = df_processed['is_delayed']
+        
+        with _phase(timings, 'split'):
+            X_train, X_test, y_train, y_test = train_test_split(
+                X, y, test_size=0.2, random_state=42, stratify=y
+            )
+        
+        # The scaler is not refitted: existing tree thresholds depend on it
+        with _phase(timings, 'scale'):
+            X_train_scaled = self.scaler.transform(X_train)
+            X_test_scaled = self.scaler.transform(X_test)
+        
+        with _phase(timings, 'fit'):
+            print(f"Training {n_estimators} additional trees...")
+            generation = self.model_generation + 1
+            new_trees = fit_forest_parallel(
+                X_train_scaled, y_train, n_estimators=n_estimators, n_workers=n_workers,
+                max_worker_memory_mb=max_worker_memory_mb,
+                n_partitions=n_partitions or n_workers or 1, random_state=generation
+            )
+            model = merge_forests([self.model, new_trees])
+            tree_generations = list(self.tree_generations) + [generation] * len(new_trees.estimators_)
+            if max_tree_age is not None:
+                tree_generations = self._prune_trees(model, tree_generations, generation, max_tree_age)
+        
+        with _phase(timings, 'evaluate'):
+            metrics, drift_reference = self._evaluate(
+                model, X_test_scaled, y_test, n_train_samples=len(X_train), verbose=verbose
+            )
+        
+        self.model = model
+        self.tree_generations = tree_generations
+        self.model_generation = generation
+        self.feature_store = feature_store
+        self.metrics, self.drift_reference = metrics, drift_reference
+        self.training_data_hash = hashlib.sha256(
+            f'{self.training_data_hash}{new_data_hash}'.encode()
+        ).hexdigest()
+        self.training_timings = timings
+        self._model_changed()
         return self.model
     
+    def train_from_dataset(self, path, memory_budget_mb=1024, n_estimators=100, test_fraction=0.2,
+                           max_test_rows=200000, n_workers=None, max_worker_memory_mb=None,
+                           verbose=True):
+        """Train from partitioned Parquet/CSV files within a fixed memory budget
+        
+        The dataset is read twice with column projection and compact dtypes.
+        The first pass collects the categories, the scaling statistics and the
+        rows per block. The second pass encodes and scales blocks of rows
+        sized to memory_budget_mb, and fits each block's share of the trees
+        before moving on. When there are more blocks than n_estimators,
+        neighbouring blocks are fitted together so that every row is used;
+        such fits hold several blocks at once. A random test_fraction of each
+        block, capped at max_test_rows overall, is held out for evaluation.
+        """
+        from sklearn.preprocessing import LabelEncoder, StandardScaler
+        from dataset_loader import (FEATURE_COLUMNS, TARGET_COLUMN, dataset_fingerprint,
+                                    iter_dataset_blocks, list_dataset_files)
+        from parallel_training import allocate_trees, fit_forest_parallel, merge_forests
+        
+        timings = {}
+        files = list_dataset_files(path)
+        columns = FEATURE_COLUMNS + [TARGET_COLUMN]
+        numeric_columns = [col for col in FEATURE_COLUMNS if col not in CATEGORICAL_COLUMNS]
+        
+        # A block is held as float64 while scaling plus its float32 copy,
+        # with the same again for pandas intermediates
+        block_rows = max(1000, int(memory_budget_mb * 1024 * 1024 / (len(columns) * 12 * 2)))
+        
+        with _phase(timings, 'preprocess'):
+            print(f"Scanning {len(files)} dataset files...")
+            category_counts = {col: pd.Series(dtype='int64') for col in CATEGORICAL_COLUMNS}
+            numeric_scaler = StandardScaler()
+            block_sizes = []
+            for block in iter_dataset_blocks(files, columns, block_rows):
+                block = block.dropna()
+                for col in CATEGORICAL_COLUMNS:
+                    counts = block[col].value_counts()
+                    counts.index = counts.index.astype(object)
+                    category_counts[col] = category_counts[col].add(counts, fill_value=0)
+                numeric_scaler.partial_fit(block[numeric_columns].to_numpy(np.float64))
+                block_sizes.append(len(block))
+            n_rows = sum(block_sizes)
+            if n_rows == 0:
+                raise ValueError(f"No complete rows found in {path}")
+            
+            self.label_encoders = {}
+            for col, counts in category_counts.items():
+                self.label_encoders[col] = LabelEncoder().fit(counts[counts > 0].index.to_numpy())
+            self._build_category_lookups()
+            self.feature_store = RouteFeatureStore(self.category_lookups['origin_airport'],
+                                                   self.category_lookups['dest_airport'])
+            self.feature_columns = list(FEATURE_COLUMNS)
+            self.scaler = self._assemble_scaler(category_counts, numeric_scaler, n_rows)
+        
+        # Each group of blocks gets trees in proportion to its share of the
+        # rows; a short last block is fitted with the block before it
+        groups, group_trees = allocate_trees(block_sizes, n_estimators, min_group_rows=block_rows // 2)
+        
+        print(f"Training on {n_rows} rows in blocks of up to {block_rows} rows...")
+        rng = np.random.default_rng(42)
+        mean, scale = self.scaler.mean_, self.scaler.scale_
+        forests, test_X, test_y, train_X, train_y = [], [], [], [], []
+        n_test = n_train = 0
+        for block_number, block in enumerate(iter_dataset_blocks(files, columns, block_rows)):
+            block = self.preprocess_data(block.dropna(), copy=False)
+            self.feature_store.update(block, TARGET_COLUMN)
+            
+            with _phase(timings, 'split'):
+                test_mask = rng.random(len(block)) < test_fraction
+                if n_test + test_mask.sum() > max_test_rows:
+                    test_mask[np.flatnonzero(test_mask)[max_test_rows - n_test:]] = False
+                y = block[TARGET_COLUMN].to_numpy()
+            
+            # Same arithmetic as StandardScaler.transform, done in place
+            with _phase(timings, 'scale'):
+                X = block[FEATURE_COLUMNS].to_numpy(np.float64)
+                del block
+                X -= mean
+                X /= scale
+                X = X.astype(np.float32)
+            
+            if test_mask.any():
+                test_X.append(X[test_mask])
+                test_y.append(y[test_mask])
+                n_test += int(test_mask.sum())
+            train_X.append(X[~test_mask])
+            train_y.append(y[~test_mask])
+            del X
+            
+            group = groups[block_number]
+            if block_number + 1 < len(groups) and groups[block_number + 1] == group:
+                continue
+            X_train, y_train = np.concatenate(train_X), np.concatenate(train_y)
+            train_X, train_y = [], []
+            n_trees = group_trees[group]
+            with _phase(timings, 'fit'):
+                forests.append(fit_forest_parallel(
+                    X_train, y_train, n_estimators=n_trees, n_workers=n_workers,
+                    max_worker_memory_mb=max_worker_memory_mb, random_state=block_number
+                ))
+            n_train += len(y_train)
+            first_block = groups.index(group)
+            blocks = f"block {block_number}" if first_block == block_number else f"blocks {first_block}-{block_number}"
+            print(f"  {blocks}: {len(y_train)} rows, {n_trees} trees")
+            del X_train, y_train
+        
+        self.model = merge_forests(forests)
+        self.model_generation = 0
+        self.tree_generations = [0] * len(self.model.estimators_)
+        
+        with _phase(timings, 'evaluate'):
+            self.metrics, self.drift_reference = self._evaluate(
+                self.model, np.concatenate(test_X), np.concatenate(test_y), n_train_samples=n_train, verbose=verbose
+            )
+        
+        self.training_data_hash = dataset_fingerprint(files)
+        self.training_timings = timings
+        self._model_changed()
+        return self.model
+    
+    def _assemble_scaler(self, category_counts, numeric_scaler, n_rows):
+        """Build the fitted StandardScaler from first-pass statistics
+        
+        Means and variances of the categorical codes follow from the category
+        counts; numeric columns come from the incrementally fitted scaler.
+        """
+        from sklearn.preprocessing import StandardScaler
+        from dataset_loader import FEATURE_COLUMNS
+        
+        numeric_columns = [col for col in FEATURE_COLUMNS if col not in CATEGORICAL_COLUMNS]
+        mean = np.empty(len(FEATURE_COLUMNS))
+        var = np.empty(len(FEATURE_COLUMNS))
+        for i, col in enumerate(FEATURE_COLUMNS):
+            if col in CATEGORICAL_COLUMNS:
+                counts = category_counts[col].reindex(self.label_encoders[col].classes_).to_numpy(float)
+                codes = np.arange(len(counts))
+                mean[i] = (counts * codes).sum() / counts.sum()
+                var[i] = (counts * (codes - mean[i]) ** 2).sum() / counts.sum()
+            else:
+                j = numeric_columns.index(col)
+                mean[i] = numeric_scaler.mean_[j]
+                var[i] = numeric_scaler.var_[j]
+        
+        scaler = StandardScaler().fit(pd.DataFrame(np.zeros((2, len(FEATURE_COLUMNS))), columns=FEATURE_COLUMNS))
+        scale = np.sqrt(var)
+        scale[scale < 10 * np.finfo(scale.dtype).eps] = 1.0
+        scaler.mean_, scaler.var_, scaler.scale_ = mean, var, scale
+        scaler.n_samples_seen_ = n_rows
+        return scaler
+    
+    @staticmethod
+    def _prune_trees(forest, tree_generations, model_generation, max_tree_age):
+        """Drop trees of a forest not yet serving that are max_tree_age or more generations old
+        
+        Returns the generations of the kept trees.
+        """
+        keep = [
+            i for i, generation in enumerate(tree_generations)
+            if model_generation - generation < max_tree_age
+        ]
+        if not keep:
+            raise ValueError("max_tree_age would prune every tree in the forest")
+        if len(keep) == len(tree_generations):
+            return tree_generations
+        print(f"Pruning {len(tree_generations) - len(keep)} trees older than {max_tree_age} generations")
+        forest.estimators_ = [forest.estimators_[i] for i in keep]
+        forest.n_estimators = len(keep)
+        return [tree_generations[i] for i in keep]
+    
+    def _evaluate(self, model, X_test_scaled, y_test, n_train_samples, verbose=True):
+        """Score the held-out set; returns (metrics, drift_reference)"""
+        from sklearn.metrics import accuracy_score, classification_report
+        
+        y_pred = model.predict(X_test_scaled)
+        report = classification_report(y_test, y_pred, output_dict=True)
+        metrics = {
+            'accuracy': float(accuracy_score(y_test, y_pred)),
+            'precision': float(report['1']['precision']),
+            'recall': float(report['1']['recall']),
+            'f1': float(report['1']['f1-score']),
+            'n_train_samples': int(n_train_samples),
+            'n_test_samples': int(len(y_test))
+        }
+        # Held-out feature and score distributions, the baseline for drift monitoring
+        drift_reference = build_reference(X_test_scaled, model.predict_proba(X_test_scaled)[:, 1])
+        
+        print(f"Model Accuracy: {metrics['accuracy']:.3f}")
+        if verbose:
+            print("\nClassification Report:")
+            print(classification_report(y_test, y_pred))
+        return metrics, drift_reference
+    
+    def _model_changed(self):
+        """Reset state derived from the previous model"""
+        self.model_revision += 1
+        self.compiled_model = None
+        self.manifest = None
+        if self.prediction_cache is not None:
+            self.prediction_cache.clear()
+        self.reset_drift_monitor()
+    
     def predict_delay_risk(self, flight_data):
-        """Predict delay risk for a single flight"""
-        if self.model is None:
+        """Predict delay risk for a single flight
+        
+        With a prediction_cache configured, dict inputs are looked up in the
+        cache before running the model. The model always scores the flight as
+        given; only the cache key is bucketed.
+        """
+        if not self.has_model:
             raise ValueError("Model not trained yet. Call train_model() first.")
         
+        if isinstance(flight_data, dict):
+            error = self._category_error(flight_data)
+            if error is not None:
+                raise ValueError(error)
+            flight_data = self._fill_route_features(flight_data)
+        
+        cache = self.prediction_cache
+        cache_key = None
+        if isinstance(flight_data, dict) and cache is not None:
+            cache_key, cached = self._cache_lookup(cache, flight_data)
+            if cached is not None:
+                return cached
+        
+        result = self._predict_single(flight_data)
+        if cache_key is not None:
+            cache.set(cache_key, result)
+        return result
+    
+    def _predict_single(self, flight_data):
+        """Score one flight without the cache; the single-row fast path"""
         # Convert to DataFrame if it's a dictionary
         if isinstance(flight_data, dict):
             flight_data = pd.DataFrame([flight_data])
         
         # Preprocess the data
-        flight_processed = self.preprocess_data(flight_data)
-        
-        # Ensure all required columns are present
-        for col in self.feature_columns:
-            if col not in flight_processed.columns:
-                flight_processed[col] = 0
-        
-        # Reorder columns to match training data
-        flight_processed = flight_processed[self.feature_columns]
+        with stage_timer('preprocess'):
+            flight_processed = self.preprocess_data(flight_data)
+            
+            # Ensure all required columns are present
+            for col in self.feature_columns:
+                if col not in flight_processed.columns:
+                    flight_processed[col] = 0
+            
+            # Reorder columns to match training data
+            flight_processed = flight_processed[self.feature_columns]
         
         # Scale the data
-        flight_scaled = self.scaler.transform(flight_processed)
+        with stage_timer('scale'):
+            flight_scaled = self._scale(flight_processed)
         
         # Predict probability
-        delay_probability = self.model.predict_proba(flight_scaled)[0, 1]
+        with stage_timer('predict_proba'):
+            delay_probability = self._predict_proba(flight_scaled)[0, 1]
+        self._observe(flight_scaled, [delay_probability])
         
         # Convert to risk score (0-100)
         risk_score = int(delay_probability * 100)
         
-        # Determine risk level
-        if risk_score < 30:
-            risk_level = "Low"
-        elif risk_score < 60:
-            risk_level = "Medium"
-        else:
-            risk_level = "High"
-        
         return {
-            'delay_probability': delay_probability,
+            'delay_probability': float(delay_probability),
             'risk_score': risk_score,
-            'risk_level': risk_level
+            'risk_level': self._risk_level(risk_score)
         }
     
+    def predict_delay_risk_many(self, flights):
+        """Predict delay risk for a list of flight dicts, as predict_delay_risk would
+        
+        Every flight is looked up in the prediction cache first. A single
+        miss is scored on the single-row path, which is several times faster
+        than a one-row batch; several misses are scored together with
+        predict_delay_risk_batch. Misses are added to the cache. Flights with
+        unusable categorical values get an {'error': ...} entry, as in
+        predict_delay_risk_batch.
+        """
+        if not self.has_model:
+            raise ValueError("Model not trained yet. Call train_model() first.")
+        
+        results = [None] * len(flights)
+        for i, flight in enumerate(flights):
+            error = self._category_error(flight)
+            if error is not None:
+                results[i] = {'error': error}
+        flights = [flight if result else self._fill_route_features(flight)
+                   for flight, result in zip(flights, results)]
+        cache_keys = [None] * len(flights)
+        cache = self.prediction_cache
+        if cache is not None:
+            for i, flight in enumerate(flights):
+                if results[i] is None:
+                    cache_keys[i], results[i] = self._cache_lookup(cache, flight)
+        
+        misses = [i for i, result in enumerate(results) if result is None]
+        if len(misses) == 1:
+            results[misses[0]] = self._predict_single(flights[misses[0]])
+        elif misses:
+            scored = self.predict_delay_risk_batch([flights[i] for i in misses])
+            for i, result in zip(misses, scored):
+                results[i] = result
+        
+        if cache is not None:
+            for i in misses:
+                if 'error' not in results[i]:
+                    cache.set(cache_keys[i], results[i])
+        return results
+    
+    def _cache_lookup(self, cache, flight_data):
+        """(cache_key, cached result or None) for a flight dict with route features filled
+        
+        Hits are fed to the drift monitor like scored flights, so cached
+        traffic is not missing from the drift statistics.
+        """
+        cache_key = cache.make_key(self, flight_data)
+        with stage_timer('cache_lookup'):
+            cached = cache.get(cache_key)
+        if cached is not None and self.drift_monitor is not None:
+            self._observe(self._scale(self._feature_row(flight_data)), [cached['delay_probability']])
+        return cache_key, cached
+    
+    def _feature_row(self, flight_data):
+        """Unscaled model input for one flight dict, encoded as preprocess_data does"""
+        row = np.empty((1, len(self.feature_columns)))
+        for i, col in enumerate(self.feature_columns):
+            value = flight_data.get(col, 0)
+            if col in CATEGORICAL_COLUMNS:
+                value = self.category_code(self.category_lookups[col], value)
+            row[0, i] = np.nan if value is None else value
+        return row
+    
+    def predict_delay_risk_batch(self, flights):
+        """Predict delay risk for many flights in one vectorized pass
+        
+        Accepts a list of dicts, a DataFrame or a structured NumPy array and
+        returns one result per input row, in order. Rows that fail validation
+        get an {'error': ...} entry instead of a prediction.
+        """
+        return self.risk_results(*self.predict_delay_probabilities(flights))
+    
+    @classmethod
+    def risk_results(cls, delay_probabilities, errors):
+        """predict_delay_risk_batch results from predict_delay_probabilities output"""
+        risk_scores = cls.risk_scores(delay_probabilities)
+        risk_levels = cls.risk_levels(risk_scores)
+        
+        results = []
+        for delay_probability, risk_score, risk_level, error in zip(
+                delay_probabilities.tolist(), risk_scores.tolist(), risk_levels.tolist(), errors):
+            if error is not None:
+                results.append({'error': error})
+            else:
+                results.append({
+                    'delay_probability': delay_probability,
+                    'risk_score': risk_score,
+                    'risk_level': risk_level
+                })
+        return results
+    
+    def predict_delay_probabilities(self, flights, observe=True):
+        """Columnar form of predict_delay_risk_batch
+        
+        Returns (delay_probabilities, errors): a float array with NaN for the
+        rows that failed validation, and one error message or None per row.
+        With observe=False the rows are not fed to the drift monitor.
+        """
+        delay_probabilities, errors, flights_scaled = self.score_rows(flights)
+        if observe and flights_scaled is not None:
+            self._observe(flights_scaled, delay_probabilities[~np.isnan(delay_probabilities)])
+        return delay_probabilities, errors
+    
+    def score_rows(self, flights):
+        """predict_delay_probabilities without the drift monitor
+        
+        Returns (delay_probabilities, errors, flights_scaled), where
+        flights_scaled holds the scaled model input of the valid rows, or
+        None when no row is valid. Callers that score elsewhere, like the
+        inference worker pool, pass it to the drift monitor themselves.
+        """
+        if not self.has_model:
+            raise ValueError("Model not trained yet. Call train_model() first.")
+        
+        with stage_timer('validate'):
+            flights_df, errors = self._batch_frame(flights)
+            n_rows = len(flights_df)
+            
+            # Validate every column at once and remember the first error per row
+            def flag(mask, message):
+                for i in np.flatnonzero(mask):
+                    if errors[i] is None:
+                        errors[i] = message
+            
+            for col in CATEGORICAL_COLUMNS:
+                if col not in flights_df.columns:
+                    flag(np.ones(n_rows, dtype=bool), f'Missing required field: {col}')
+                else:
+                    flag(flights_df[col].isna().to_numpy(), f'Missing required field: {col}')
+                    if flights_df[col].dtype == object:
+                        # Lists and dicts cannot be looked up in the encoder
+                        flag(~flights_df[col].map(_is_hashable).to_numpy(dtype=bool),
+                             f'Invalid value for field: {col}')
+            
+            features = pd.DataFrame(index=flights_df.index)
+            for col in self.feature_columns:
+                if col in CATEGORICAL_COLUMNS:
+                    features[col] = flights_df[col] if col in flights_df.columns else None
+                elif col in flights_df.columns:
+                    values = pd.to_numeric(flights_df[col], errors='coerce').astype(float)
+                    invalid = ~np.isfinite(values.to_numpy())
+                    if col in ROUTE_FEATURES:
+                        # Missing route features are filled during preprocessing
+                        invalid &= flights_df[col].notna().to_numpy()
+                    flag(invalid, f'Invalid value for field: {col}')
+                    features[col] = values
+                elif col not in ROUTE_FEATURES:
+                    # Missing columns default to 0, as in predict_delay_risk
+                    features[col] = 0.0
+        
+        valid = np.array([error is None for error in errors], dtype=bool)
+        delay_probabilities = np.full(n_rows, np.nan)
+        if not valid.any():
+            return delay_probabilities, errors, None
+        
+        # Encode, scale and score all valid rows together
+        with stage_timer('preprocess'):
+            valid_features = self.preprocess_data(features[valid])[self.feature_columns]
+        with stage_timer('scale'):
+            flights_scaled = self._scale(valid_features)
+        with stage_timer('predict_proba'):
+            delay_probabilities[valid] = self._predict_proba(flights_scaled)[:, 1]
+        
+        return delay_probabilities, errors, flights_scaled
+    
+    def predict_scenarios(self, flight_data, grid):
+        """Delay probabilities for every combination of grid values
+        
+        flight_data is one flight, as for predict_delay_risk. grid maps
+        SCENARIO_FIELDS to lists of values. The flight is encoded once, and
+        the Cartesian product of the grid is written into one feature matrix
+        and scored in a single pass. Returns an array of delay probabilities
+        with one axis per grid field, in grid order.
+        
+        Congestion the flight leaves out is looked up per departure hour, so
+        sweeping departure_hour also sweeps the hourly congestion.
+        """
+        if not self.has_model:
+            raise ValueError("Model not trained yet. Call train_model() first.")
+        
+        unknown = [field for field in grid if field not in SCENARIO_FIELDS]
+        if unknown:
+            raise ValueError(f"Cannot vary {', '.join(unknown)}; choose from {', '.join(SCENARIO_FIELDS)}")
+        axes = {}
+        for field, values in grid.items():
+            try:
+                values = np.asarray(values, dtype=np.float64)
+            except (TypeError, ValueError):
+                values = None
+            if values is None or values.ndim != 1 or values.size == 0 or not np.isfinite(values).all():
+                raise ValueError(f"Values for {field} must be a non-empty list of numbers")
+            axes[field] = values
+        
+        with stage_timer('preprocess'):
+            missing_route = [col for col in ROUTE_FEATURES if flight_data.get(col) is None]
+            base = self.preprocess_data(pd.DataFrame([self._fill_route_features(flight_data)]))
+            base_row = base.reindex(columns=self.feature_columns, fill_value=0).to_numpy(dtype=np.float64)[0]
+            
+            shape = tuple(len(values) for values in axes.values())
+            X = np.tile(base_row, (int(np.prod(shape)), 1))
+            for field, values in zip(axes, np.meshgrid(*axes.values(), indexing='ij')):
+                X[:, self.feature_columns.index(field)] = values.ravel()
+            
+            hourly = [col for col in ('origin_congestion', 'dest_congestion') if col in missing_route]
+            if 'departure_hour' in axes and hourly and self.feature_store is not None:
+                origin_code, dest_code = self._airport_codes(flight_data.get('origin_airport'),
+                                                             flight_data.get('dest_airport'))
+                hours = X[:, self.feature_columns.index('departure_hour')]
+                for hour in np.unique(axes['departure_hour']):
+                    values = self.feature_store.lookup(origin_code, dest_code, hour=hour)
+                    rows = hours == hour
+                    for col in hourly:
+                        X[rows, self.feature_columns.index(col)] = values[col]
+        
+        with stage_timer('scale'):
+            X_scaled = self._scale(X)
+        with stage_timer('predict_proba'):
+            return self._predict_proba(X_scaled)[:, 1].reshape(shape)
+    
+    def _observe(self, X_scaled, delay_probabilities):
+        """Feed scored rows to the drift monitor, if one is attached"""
+        if self.drift_monitor is None:
+            return
+        with stage_timer('drift_monitor'):
+            # Unseen categories are encoded as -1; scaling is deterministic, so
+            # they are exactly the entries equal to the scaled -1
+            columns = [self.feature_columns.index(col) for col in self.drift_monitor.categorical_columns]
+            unseen_value = self._scale(np.full((1, len(self.feature_columns)), -1.0))[0, columns]
+            unseen = X_scaled[:, columns] == unseen_value
+            self.drift_monitor.observe(X_scaled, unseen, delay_probabilities)
+    
+    def reset_drift_monitor(self):
+        """Point the drift monitor at the current model's training reference"""
+        if self.drift_monitor is not None:
+            self.drift_monitor.reset(self.feature_columns, CATEGORICAL_COLUMNS, self.drift_reference)
+    
+    def _fill_route_features(self, flight_data):
+        """Fill missing route features of a single flight dict with O(1) lookups"""
+        missing = [col for col in ROUTE_FEATURES if flight_data.get(col) is None]
+        if not missing:
+            return flight_data
+        if self.feature_store is None:
+            values = ROUTE_FEATURE_DEFAULTS
+        else:
+            values = self.feature_store.lookup(
+                *self._airport_codes(flight_data.get('origin_airport'), flight_data.get('dest_airport')),
+                hour=flight_data.get('departure_hour')
+            )
+        filled = dict(flight_data)
+        for col in missing:
+            filled[col] = values[col]
+        return filled
+    
+    def route_history(self, origin_airport, dest_airport):
+        """Historical delay rates and distance for a route, if a feature store is loaded"""
+        if self.feature_store is None:
+            return None
+        return self.feature_store.route_history(*self._airport_codes(origin_airport, dest_airport))
+    
+    def _airport_codes(self, origin_airport, dest_airport):
+        return [self.category_code(self.category_lookups[col], airport)
+                for col, airport in (('origin_airport', origin_airport), ('dest_airport', dest_airport))]
+    
+    @staticmethod
+    def category_code(lookup, value):
+        """Encoder code of value in a category lookup, or -1 if unseen or unhashable"""
+        if not _is_hashable(value):
+            return -1
+        return lookup.get_loc(value) if value in lookup else -1
+    
+    @staticmethod
+    def _category_error(flight_data):
+        """Validation error for a flight dict with an unhashable categorical value, or None"""
+        for col in CATEGORICAL_COLUMNS:
+            if not _is_hashable(flight_data.get(col)):
+                return f'Invalid value for field: {col}'
+        return None
+    
+    def _scale(self, X):
+        """StandardScaler.transform without scikit-learn's input validation
+        
+        Same arithmetic, so the scaled features are bit-for-bit identical. A
+        deferred bundle is scaled with the statistics from its manifest.
+        """
+        deferred = self._deferred_bundle
+        if deferred is not None:
+            mean, scale = deferred['scaler_mean'], deferred['scaler_scale']
+        else:
+            mean, scale = self.scaler.mean_, self.scaler.scale_
+        X = np.array(X, dtype=np.float64)
+        X -= mean
+        X /= scale
+        return X
+    
+    def _predict_proba(self, X_scaled):
+        """Score scaled features with the configured inference engine"""
+        if self.inference_engine == 'compiled':
+            if self.compiled_model is None:
+                self.compile_model()
+            return self.compiled_model.predict_proba(X_scaled)
+        return self.model.predict_proba(X_scaled)
+    
+    def compile_model(self, verify_rows=256):
+        """Flatten the trained forest into a CompiledForest
+        
+        The compiled forest is checked against scikit-learn on verify_rows
+        random standardized rows before it is used.
+        """
+        self.compiled_model = self._compile(verify_rows)
+        return self.compiled_model
+    
+    def _compile(self, verify_rows=256):
+        """compile_model without installing the result"""
+        if self.model is None:
+            raise ValueError("Model not trained yet. Call train_model() first.")
+        compiled = CompiledForest.from_sklearn(self.model)
+        if verify_rows:
+            rng = np.random.default_rng(0)
+            compiled.verify(self.model, rng.normal(size=(verify_rows, len(self.feature_columns))))
+        return compiled
+    
+    def export_compact(self, path, holdout=None, max_drift=1e-4, compress=0):
+        """Save a bundle that is served by a CompactForest
+        
+        The compact forest is scored against the full-precision forest on
+        holdout (a flights DataFrame; 2,000 synthetic flights by default).
+        A ValueError is raised if any probability moves by more than
+        max_drift. The size and drift report is returned and stored in the
+        bundle manifest under 'compact_forest'. The predictor itself keeps
+        serving its current forest.
+        """
+        reference = self.compiled_model
+        if reference is None or isinstance(reference, CompactForest):
+            reference = self._compile()
+        compact = CompactForest.from_compiled(reference)
+        
+        if holdout is None:
+            holdout = self.generate_synthetic_data(n_samples=2000, random_state=7)
+        X_holdout = self._scale(self.preprocess_data(holdout)[self.feature_columns])
+        drift = np.abs(compact.predict_proba(X_holdout)[:, 1] - reference.predict_proba(X_holdout)[:, 1])
+        report = {
+            'n_nodes': len(compact.threshold),
+            'n_leaf_values': len(compact.leaf_values),
+            'compiled_bytes': reference.nbytes,
+            'compact_bytes': compact.nbytes,
+            'size_reduction': round(1 - compact.nbytes / reference.nbytes, 4),
+            'holdout_rows': len(X_holdout),
+            'max_probability_drift': float(drift.max()),
+            'mean_probability_drift': float(drift.mean())
+        }
+        if report['max_probability_drift'] > max_drift:
+            raise ValueError(
+                f"Compact forest moves probabilities by up to {report['max_probability_drift']:.3g} "
+                f"(limit {max_drift:.3g})"
+            )
+        
+        manifest = dict(self.build_manifest())
+        manifest['compact_forest'] = report
+        self._write_bundle(path, compact, manifest, compress)
+        print(f"Compact forest: {report['compiled_bytes'] / 1e6:.1f}MB -> {report['compact_bytes'] / 1e6:.1f}MB "
+              f"({report['size_reduction']:.0%} smaller), max drift {report['max_probability_drift']:.2g}")
+        return report
+    
+    def _batch_frame(self, flights):
+        """Convert batch input to a DataFrame plus a per-row error list"""
+        if isinstance(flights, pd.DataFrame):
+            flights_df = flights.reset_index(drop=True)
+            return flights_df, [None] * len(flights_df)
+        
+        if isinstance(flights, np.ndarray):
+            if flights.dtype.names is None:
+                raise ValueError("Expected a structured NumPy array with named fields")
+            flights_df = pd.DataFrame.from_records(flights)
+            for col in flights.dtype.names:
+                if flights.dtype[col].kind == 'S':
+                    flights_df[col] = flights_df[col].str.decode('utf-8')
+            return flights_df, [None] * len(flights_df)
+        
+        records = list(flights)
+        errors = [None] * len(records)
+        for i, record in enumerate(records):
+            if not isinstance(record, dict):
+                errors[i] = 'Expected a flight object'
+                records[i] = {}
+        return pd.DataFrame.from_records(records, index=range(len(records))), errors
+    
+    @staticmethod
+    def risk_scores(delay_probabilities):
+        """0-100 risk scores for an array of probabilities (0 where NaN)"""
+        return (np.nan_to_num(delay_probabilities) * 100).astype(int)
+    
+    @staticmethod
+    def risk_levels(risk_scores):
+        """Vectorized _risk_level"""
+        return RISK_LEVELS[np.searchsorted(RISK_LEVEL_THRESHOLDS, risk_scores, side='right')]
+    
+    @staticmethod
+    def _risk_level(risk_score):
+        """Map a 0-100 risk score onto a risk level"""
+        if risk_score < 30:
+            return "Low"
+        elif risk_score < 60:
+            return "Medium"
+        return "High"
+    
     def save_model(self, filepath='flight_delay_model.pkl'):
         """Save the trained model and preprocessors"""
         model_data = {
             'model': self.model,
             'label_encoders': self.label_encoders,
+            'category_lookups': self.category_lookups,
             'scaler': self.scaler,
-            'feature_columns': self.feature_columns
+            'feature_columns': self.feature_columns,
+            'feature_store': self.feature_store,
+            'drift_reference': self.drift_reference
         }
         joblib.dump(model_data, filepath)
         print(f"Model saved to {filepath}")
     
-    def load_model(self, filepath='flight_delay_model.pkl'):
-        """Load a trained model and preprocessors"""
-        model_data = joblib.load(filepath)
-        self.model = model_data['model']
-        self.label_encoders = model_data['label_encoders']
-        self.scaler = model_data['scaler']
+    def save_bundle(self, path='flight_delay_model', compress=0):
+        """Save the trained model as a versioned bundle directory
+        
+        The bundle keeps the forest in its own uncompressed artifact so it can
+        be memory-mapped on load, and records a manifest with the feature
+        schema, training data hash, library versions and metrics.
+        """
+        if self.model is None:
+            raise ValueError("Model not trained yet. Call train_model() first.")
+        
+        if self.compiled_model is None:
+            self.compile_model()
+        self.manifest = self._write_bundle(path, self.compiled_model, self.build_manifest(), compress)
+    
+    def _write_bundle(self, path, compiled, manifest, compress):
+        """Write a bundle serving compiled with manifest; returns the saved manifest"""
+        preprocessors = {
+            'label_encoders': self.label_encoders,
+            'category_lookups': self.category_lookups,
+            'scaler': self.scaler,
+            'feature_columns': self.feature_columns
+        }
+        arrays = compiled.to_arrays()
+        if self.feature_store is not None:
+            arrays.update(self.feature_store.to_arrays())
+        manifest = model_bundle.save_bundle(
+            path, self.model, preprocessors, manifest, compress=compress, arrays=arrays
+        )
+        print(f"Model bundle saved to {path}")
+        return manifest
+    
+    def build_manifest(self):
+        """Describe the trained model for the bundle header"""
+        if self.manifest is not None:
+            return self.manifest
+        
+        import sklearn
+        
+        created_at = datetime.now()
+        data_hash = self.training_data_hash or ''
+        feature_importance = sorted(
+            [
+                {'feature': feature, 'importance': float(importance)}
+                for feature, importance in zip(self.feature_columns, self.model.feature_importances_)
+            ],
+            key=lambda x: x['importance'],
+            reverse=True
+        )
+        return {
+            'model_version': f"{created_at:%Y%m%d%H%M%S}-{data_hash[:8] or 'unknown'}",
+            'created_at': created_at.isoformat(),
+            'model_type': 'Random Forest Classifier',
+            'sklearn_version': sklearn.__version__,
+            'numpy_version': np.__version__,
+            'n_estimators': len(self.model.estimators_),
+            'feature_columns': self.feature_columns,
+            'categories': {
+                col: [str(c) for c in encoder.classes_]
+                for col, encoder in self.label_encoders.items()
+            },
+            'scaler': {
+                'mean': [float(x) for x in self.scaler.mean_],
+                'scale': [float(x) for x in self.scaler.scale_]
+            },
+            'training_data_hash': self.training_data_hash,
+            'metrics': self.metrics,
+            'training_timings': self.training_timings,
+            'model_generation': self.model_generation,
+            'tree_generations': list(self.tree_generations),
+            'drift_reference': self.drift_reference,
+            'feature_importance': feature_importance
+        }
+    
+    @property
+    def model_version(self):
+        """Version string of the loaded model, if it came from a bundle"""
+        return self.manifest['model_version'] if self.manifest else None
+    
+    @staticmethod
+    def _hash_training_data(df):
+        """Content hash of a training DataFrame, independent of its index"""
+        row_hashes = pd.util.hash_pandas_object(df, index=False).to_numpy()
+        return hashlib.sha256(row_hashes.tobytes()).hexdigest()
+    
+    def load_model(self, filepath='flight_delay_model.pkl', mmap_mode='r'):
+        """Load a trained model and preprocessors
+        
+        filepath may be a legacy joblib pickle or a bundle directory written by
+        save_bundle; bundles are memory-mapped according to mmap_mode. A
+        bundle with compiled node arrays (full-precision or compact, see
+        export_compact) is served from those arrays and its manifest alone:
+        the scikit-learn model and preprocessors are only unpickled when
+        something reads model, label_encoders or scaler.
+        """
+        self.compiled_model = None
+        self._deferred_bundle = None
+        arrays = {}
+        if model_bundle.is_bundle(filepath):
+            manifest = model_bundle.read_manifest(filepath)
+            arrays = model_bundle.load_bundle_arrays(filepath, manifest, mmap_mode=mmap_mode)
+            if arrays:
+                # Compiled node arrays are shared between workers via mmap
+                self.compiled_model = forest_from_arrays(arrays)
+            if arrays and 'scaler' in manifest:
+                model, model_data = None, self._deferred_preprocessors(filepath, manifest, mmap_mode)
+            else:
+                model, model_data, manifest = model_bundle.load_bundle(filepath, mmap_mode=mmap_mode)
+            self.manifest = manifest
+            self.training_data_hash = manifest.get('training_data_hash')
+            self.metrics = manifest.get('metrics', {})
+            self.drift_reference = manifest.get('drift_reference')
+            self.training_timings = manifest.get('training_timings', {})
+            self.model_generation = manifest.get('model_generation', 0)
+            self.tree_generations = manifest.get('tree_generations', [0] * manifest['n_estimators'])
+        else:
+            model_data = joblib.load(filepath)
+            model = model_data['model']
+            self.manifest = None
+            self.drift_reference = model_data.get('drift_reference')
+            self.model_generation = 0
+            self.tree_generations = [0] * len(model.estimators_)
+        self._model = model
+        if self.prediction_cache is not None:
+            self.prediction_cache.clear()
+        self._label_encoders = model_data['label_encoders']
+        self.category_lookups = model_data.get('category_lookups', {})
+        if set(self.category_lookups) != set(self._label_encoders) and self._deferred_bundle is None:
+            self._build_category_lookups()
+        self._scaler = model_data['scaler']
         self.feature_columns = model_data['feature_columns']
+        self.feature_store = (RouteFeatureStore.from_arrays(arrays, self.category_lookups)
+                              if arrays else model_data.get('feature_store'))
+        self.reset_drift_monitor()
+        self.model_revision += 1
         print(f"Model loaded from {filepath}")
+    
+    def _deferred_preprocessors(self, filepath, manifest, mmap_mode):
+        """Inference state from a bundle manifest, deferring the joblib artifacts"""
+        self._deferred_bundle = {
+            'path': filepath,
+            'mmap_mode': mmap_mode,
+            'model_version': manifest['model_version'],
+            'scaler_mean': np.array(manifest['scaler']['mean']),
+            'scaler_scale': np.array(manifest['scaler']['scale'])
+        }
+        return {
+            'label_encoders': {},
+            'category_lookups': {
+                col: pd.Index(categories, dtype=object)
+                for col, categories in manifest['categories'].items()
+            },
+            'scaler': None,
+            'feature_columns': manifest['feature_columns']
+        }
+    
+    def _load_deferred_bundle(self):
+        """Unpickle the model and preprocessors of a deferred bundle"""
+        with self._deferred_lock:
+            deferred = self._deferred_bundle
+            if deferred is None:
+                return
+            model, model_data, manifest = model_bundle.load_bundle(deferred['path'], mmap_mode=deferred['mmap_mode'])
+            if manifest['model_version'] != deferred['model_version']:
+                raise RuntimeError(
+                    f"Model bundle at {deferred['path']} changed from version "
+                    f"{deferred['model_version']} to {manifest['model_version']} since it was loaded"
+                )
+            self._model = model
+            self._label_encoders = model_data['label_encoders']
+            self._scaler = model_data['scaler']
+            self._deferred_bundle = None
 
 def main():
     """Main function to train and test the model"""
@@ -269,7 +1317,7 @@ def main():
     predictor.train_model(train_data)
     
     # Save the model
-    predictor.save_model()
+    predictor.save_bundle()
     
     # Test with sample predictions
     print("\n" + "=" * 40)
@@ -0,0 +1,141 @@
+"""Import-time report and budget check for the inference entry point
+
+Starts a fresh interpreter with -X importtime and imports the serving
+entry point (delay_prediction_api by default). It waits for the model to
+load and scores one flight, then reports:
+
+- the import time and the time until the first prediction
+- peak RSS
+- the slowest top-level imports
+- any training-only modules that were loaded
+
+    python import_report.py --model flight_delay_model
+    python import_report.py --model flight_delay_model --budget-ms 1000 --json import_report.json
+
+The exit status is 1 if the import takes longer than --budget-ms or pulls
+in a training-only module. Pass a bundle written by save_bundle with
+--model; without one the API would train a model and load the training
+stack.
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+
+# Modules that only the training and evaluation code paths should load.
+# pyarrow is not listed: pandas imports parts of it whenever it is installed.
+TRAINING_ONLY_MODULES = (
+    'sklearn', 'scipy', 'parallel_training', 'dataset_loader',
+    'matplotlib', 'seaborn', 'plotly', 'xgboost'
+)
+
+DEFAULT_BUDGET_MS = 1000
+
+_CHILD_SCRIPT = """
+import importlib, json, sys, time
+start = time.perf_counter()
+module = importlib.import_module(sys.argv[1])
+imported = time.perf_counter()
+loader = getattr(module, 'model_loader', None)
+if loader is not None and not loader.wait(timeout=float(sys.argv[2])):
+    raise SystemExit(f'Model did not load: {loader.status()}')
+predictor = getattr(module, 'predictor', None)
+if predictor is not None:
+    predictor.predict_delay_risk_batch([json.loads(sys.argv[3])])
+ready = time.perf_counter()
+try:
+    import resource
+    peak_rss_kb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+except ImportError:
+    peak_rss_kb = None
+sys.stdout.write(json.dumps({
+    'import_ms': 1000 * (imported - start),
+    'ready_ms': 1000 * (ready - start),
+    'peak_rss_kb': peak_rss_kb,
+    'modules': sorted(sys.modules)
+}))
+"""
+
+SAMPLE_FLIGHT = {
+    'airline': 'AA', 'origin_airport': 'JFK', 'dest_airport': 'LAX',
+    'month': 7, 'day_of_week': 1, 'departure_hour': 8, 'distance': 2500,
+    'temperature': 85, 'wind_speed': 15, 'visibility': 10, 'precipitation': 0,
+    'origin_congestion': 0.7, 'dest_congestion': 0.6
+}
+
+def parse_importtime(stderr):
+    """Top-level imports from -X importtime output as (cumulative_ms, module)"""
+    top_level = []
+    for line in stderr.splitlines():
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        _, cumulative, name = line[len('import time:'):].split('|')
+        # Nested imports are indented by two spaces per level
+        if name.startswith('  '):
+            continue
+        top_level.append((int(cumulative) / 1000, name.strip()))
+    return sorted(top_level, reverse=True)
+
+def import_report(module='delay_prediction_api', model_path=None, inference_engine='compiled',
+                  timeout=120, top=15):
+    """Import module in a fresh interpreter and describe what it cost"""
+    env = dict(os.environ)
+    if model_path is not None:
+        env['FLIGHT_DELAY_MODEL_PATH'] = model_path
+    env['FLIGHT_DELAY_INFERENCE_ENGINE'] = inference_engine
+    completed = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', _CHILD_SCRIPT, module, str(timeout), json.dumps(SAMPLE_FLIGHT)],
+        cwd=os.path.dirname(os.path.abspath(__file__)), env=env,
+        capture_output=True, text=True, timeout=timeout + 60
+    )
+    if completed.returncode != 0:
+        errors = [line for line in completed.stderr.splitlines() if not line.startswith('import time:')]
+        raise RuntimeError(f"Importing {module} failed:\n" + '\n'.join(errors[-20:]))
+
+    result = json.loads(completed.stdout.strip().splitlines()[-1])
+    modules = result.pop('modules')
+    result['module'] = module
+    result['n_modules'] = len(modules)
+    result['training_only_modules'] = sorted({
+        name.split('.')[0] for name in modules if name.split('.')[0] in TRAINING_ONLY_MODULES
+    })
+    result['slowest_imports'] = [
+        {'module': name, 'cumulative_ms': round(ms, 1)}
+        for ms, name in parse_importtime(completed.stderr)[:top]
+    ]
+    return result
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--module', default='delay_prediction_api', help='entry point to import')
+    parser.add_argument('--model', help='model bundle to serve (sets FLIGHT_DELAY_MODEL_PATH)')
+    parser.add_argument('--engine', default='compiled', help='inference engine to serve with')
+    parser.add_argument('--budget-ms', type=float, default=DEFAULT_BUDGET_MS,
+                        help=f'import-time budget in milliseconds (default {DEFAULT_BUDGET_MS})')
+    parser.add_argument('--top', type=int, default=15, help='number of slowest imports to list')
+    parser.add_argument('--json', help='also write the report to this file')
+    args = parser.parse_args(argv)
+
+    report = import_report(args.module, args.model, args.engine, top=args.top)
+    report['budget_ms'] = args.budget_ms
+    report['within_budget'] = report['import_ms'] <= args.budget_ms and not report['training_only_modules']
+
+    print(f"Import time for {args.module}: {report['import_ms']:.0f}ms (budget {args.budget_ms:.0f}ms)")
+    print(f"Ready to serve after: {report['ready_ms']:.0f}ms")
+    if report['peak_rss_kb'] is not None:
+        print(f"Peak RSS: {report['peak_rss_kb'] / 1024:.1f}MB")
+    print(f"Modules loaded: {report['n_modules']}")
+    print("\nSlowest top-level imports:")
+    for entry in report['slowest_imports']:
+        print(f"  {entry['cumulative_ms']:9.1f}ms  {entry['module']}")
+    if report['training_only_modules']:
+        print(f"\nTraining-only modules loaded: {', '.join(report['training_only_modules'])}")
+
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(report, f, indent=2)
+    return 0 if report['within_budget'] else 1
+
+if __name__ == '__main__':
+    sys.exit(main())
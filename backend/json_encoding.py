@@ -0,0 +1,52 @@
+"""Fast JSON encoding for large API responses
+
+Uses orjson when it is installed. orjson serializes NumPy arrays and scalars
+natively and is several times faster than the json module. Without it, the
+standard library encoder is used with a hook for NumPy types. Either way,
+NaN and infinity are written as null, and non-ASCII text is written as UTF-8
+rather than \\u escapes.
+"""
+import json
+import math
+
+import numpy as np
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+def dumps(obj):
+    """Serialize obj to UTF-8 JSON bytes"""
+    if orjson is not None:
+        return orjson.dumps(obj, option=orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS)
+    try:
+        text = json.dumps(obj, default=_default, allow_nan=False, ensure_ascii=False, separators=(',', ':'))
+    except ValueError:
+        # json writes a non-finite float (including np.float64, a float
+        # subclass) as a bare NaN or Infinity token without consulting
+        # default, so replace them and encode again. Arrays are left to
+        # _default and only the Python floats around them are walked.
+        text = json.dumps(_finite_or_none(obj), default=_default, ensure_ascii=False, separators=(',', ':'))
+    return text.encode('utf-8')
+
+def _finite_or_none(obj):
+    if isinstance(obj, float):
+        return obj if math.isfinite(obj) else None
+    if isinstance(obj, dict):
+        return {key: _finite_or_none(value) for key, value in obj.items()}
+    if isinstance(obj, (list, tuple)):
+        return [_finite_or_none(value) for value in obj]
+    return obj
+
+def _default(obj):
+    if isinstance(obj, np.ndarray):
+        if obj.dtype.kind == 'f':
+            finite = np.isfinite(obj)
+            if not finite.all():
+                obj = np.where(finite, obj, None)
+        return obj.tolist()
+    if isinstance(obj, np.generic):
+        value = obj.item()
+        return None if isinstance(value, float) and not math.isfinite(value) else value
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
@@ -0,0 +1,152 @@
+import bisect
+import threading
+import time
+from contextlib import contextmanager
+
+# Latency buckets in seconds, from 50us to 10s
+LATENCY_BUCKETS = (
+    0.00005, 0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005,
+    0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0
+)
+
+class _Histogram:
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+class MetricsRegistry:
+    """Counters, histograms and gauges rendered in Prometheus text format
+
+    Metrics are keyed by name plus a sorted tuple of label pairs. Updates
+    take one lock and do a dict lookup and a bisect, so they are cheap
+    enough for the request path.
+    """
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._help = {}
+        self._types = {}
+        self._counters = {}
+        self._histograms = {}
+        self._histogram_buckets = {}
+        self._gauges = {}
+
+    def counter(self, name, help_text):
+        self._declare(name, 'counter', help_text)
+
+    def histogram(self, name, help_text, buckets=LATENCY_BUCKETS):
+        self._declare(name, 'histogram', help_text)
+        self._histogram_buckets[name] = tuple(buckets)
+
+    def gauge(self, name, help_text, callback):
+        """Register a gauge whose value(s) come from callback() at render time
+
+        callback returns a number, or a dict mapping label tuples of
+        (key, value) pairs to numbers.
+        """
+        self._declare(name, 'gauge', help_text)
+        self._gauges[name] = callback
+
+    def inc(self, name, amount=1, **labels):
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + amount
+
+    def observe(self, name, value, **labels):
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            histogram = self._histograms.get(key)
+            if histogram is None:
+                histogram = _Histogram(self._histogram_buckets.get(name, LATENCY_BUCKETS))
+                self._histograms[key] = histogram
+            histogram.observe(value)
+
+    @contextmanager
+    def timer(self, name, **labels):
+        """Observe the wall-clock seconds spent in the with-block"""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(name, time.perf_counter() - start, **labels)
+
+    def snapshot(self):
+        """Plain-dict view of all counters and histogram summaries"""
+        with self._lock:
+            counters = {
+                _series(name, labels): value
+                for (name, labels), value in self._counters.items()
+            }
+            histograms = {
+                _series(name, labels): {'count': h.count, 'sum': h.sum}
+                for (name, labels), h in self._histograms.items()
+            }
+        return {'counters': counters, 'histograms': histograms}
+
+    def render(self):
+        """Prometheus text exposition format"""
+        with self._lock:
+            counters = dict(self._counters)
+            histograms = {
+                key: (list(h.counts), h.sum, h.count, h.buckets)
+                for key, h in self._histograms.items()
+            }
+
+        lines = []
+        for name in sorted(self._types):
+            metric_type = self._types[name]
+            lines.append(f'# HELP {name} {self._help[name]}')
+            lines.append(f'# TYPE {name} {metric_type}')
+            if metric_type == 'counter':
+                for (series_name, labels), value in sorted(counters.items()):
+                    if series_name == name:
+                        lines.append(f'{_series(name, labels)} {value}')
+            elif metric_type == 'histogram':
+                for (series_name, labels), (counts, total, count, buckets) in sorted(histograms.items()):
+                    if series_name != name:
+                        continue
+                    cumulative = 0
+                    for bound, bucket_count in zip(buckets + (float('inf'),), counts):
+                        cumulative += bucket_count
+                        le = '+Inf' if bound == float('inf') else repr(bound)
+                        lines.append(f"{_series(name + '_bucket', labels + (('le', le),))} {cumulative}")
+                    lines.append(f'{_series(name + "_sum", labels)} {total}')
+                    lines.append(f'{_series(name + "_count", labels)} {count}')
+            else:
+                try:
+                    value = self._gauges[name]()
+                except Exception:
+                    continue
+                values = value if isinstance(value, dict) else {(): value}
+                for labels, gauge_value in sorted(values.items()):
+                    if gauge_value is not None:
+                        lines.append(f'{_series(name, labels)} {float(gauge_value)}')
+        return '\n'.join(lines) + '\n'
+
+    def _declare(self, name, metric_type, help_text):
+        self._types[name] = metric_type
+        self._help[name] = help_text
+
+def _series(name, labels):
+    if not labels:
+        return name
+    label_text = ','.join(f'{key}="{_escape(value)}"' for key, value in labels)
+    return f'{name}{{{label_text}}}'
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+# Process-wide registry used by the predictor and the API
+REGISTRY = MetricsRegistry()
+REGISTRY.histogram('flight_delay_stage_seconds', 'Time spent in each stage of the prediction path')
+REGISTRY.histogram('flight_delay_training_phase_seconds', 'Time spent in each model training phase')
+
+def stage_timer(stage):
+    """Time one stage of the prediction path"""
+    return REGISTRY.timer('flight_delay_stage_seconds', stage=stage)
@@ -0,0 +1,142 @@
+import asyncio
+import time
+
+class QueueFullError(Exception):
+    """Raised when the micro-batch queue is at capacity"""
+
+class BatcherClosedError(Exception):
+    """Raised to requests still waiting when the batcher is closed"""
+
+class MicroBatcher:
+    """Collect concurrent requests into micro-batches scored in one call
+
+    submit() queues one item and waits for its result. A single collector
+    task takes the first queued item, keeps gathering until max_batch_size
+    items are collected or max_wait_ms has passed since that item arrived,
+    then calls score_batch(items) in a worker thread and resolves each
+    caller's future with its result. score_batch must return one result per
+    item, in order. close() fails every request still waiting with
+    BatcherClosedError.
+    """
+    # Upper bounds of the batch size histogram buckets
+    BATCH_SIZE_BUCKETS = (1, 2, 4, 8, 16, 32, 64, 128, 256, 512)
+
+    def __init__(self, score_batch, max_batch_size=64, max_wait_ms=5, max_queue_size=10000):
+        self.score_batch = score_batch
+        self.max_batch_size = max_batch_size
+        self.max_wait_ms = max_wait_ms
+        self.max_queue_size = max_queue_size
+        self._queue = None
+        self._collector = None
+        self._in_flight = []
+        self._batches = 0
+        self._items = 0
+        self._rejected = 0
+        self._max_batch_size_seen = 0
+        self._total_wait = 0.0
+        self._max_wait = 0.0
+        self._total_score_time = 0.0
+        self._batch_size_counts = [0] * (len(self.BATCH_SIZE_BUCKETS) + 1)
+
+    async def submit(self, item):
+        """Queue one item for the next micro-batch and return its result"""
+        if self._collector is None or self._collector.done():
+            self._queue = asyncio.Queue()
+            self._collector = asyncio.get_running_loop().create_task(self._collect())
+        if self._queue.qsize() >= self.max_queue_size:
+            self._rejected += 1
+            raise QueueFullError("Prediction queue is full")
+
+        future = asyncio.get_running_loop().create_future()
+        self._queue.put_nowait((item, future, time.perf_counter()))
+        return await future
+
+    async def close(self):
+        """Stop the collector task and fail the requests still waiting"""
+        if self._collector is not None:
+            self._collector.cancel()
+            try:
+                await self._collector
+            except asyncio.CancelledError:
+                pass
+            self._collector = None
+        futures = list(self._in_flight)
+        while self._queue is not None and not self._queue.empty():
+            futures.append(self._queue.get_nowait()[1])
+        self._in_flight = []
+        for future in futures:
+            if not future.done():
+                future.set_exception(BatcherClosedError("Prediction service is shutting down"))
+
+    def stats(self):
+        """Queue depth, batch size and wait time counters"""
+        return {
+            'queue_depth': self._queue.qsize() if self._queue is not None else 0,
+            'max_batch_size': self.max_batch_size,
+            'max_wait_ms': self.max_wait_ms,
+            'max_queue_size': self.max_queue_size,
+            'batches': self._batches,
+            'items': self._items,
+            'rejected': self._rejected,
+            'mean_batch_size': self._items / self._batches if self._batches else 0.0,
+            'largest_batch_size': self._max_batch_size_seen,
+            'mean_wait_ms': 1000 * self._total_wait / self._items if self._items else 0.0,
+            'max_wait_ms_seen': 1000 * self._max_wait,
+            'mean_score_ms': 1000 * self._total_score_time / self._batches if self._batches else 0.0,
+            'batch_size_histogram': {
+                (f'le_{bound}' if i < len(self.BATCH_SIZE_BUCKETS) else 'inf'): count
+                for i, (bound, count) in enumerate(zip(self.BATCH_SIZE_BUCKETS + (None,), self._batch_size_counts))
+            }
+        }
+
+    async def _collect(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = [await self._queue.get()]
+            deadline = batch[0][2] + self.max_wait_ms / 1000
+            while len(batch) < self.max_batch_size:
+                timeout = deadline - time.perf_counter()
+                if timeout <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(self._queue.get(), timeout))
+                except asyncio.TimeoutError:
+                    break
+            # Drain anything already queued without waiting further
+            while len(batch) < self.max_batch_size and not self._queue.empty():
+                batch.append(self._queue.get_nowait())
+
+            started = time.perf_counter()
+            items = [item for item, _, _ in batch]
+            self._in_flight = [future for _, future, _ in batch]
+            try:
+                results = await loop.run_in_executor(None, self.score_batch, items)
+                error = None
+            except Exception as e:
+                results, error = None, e
+            finished = time.perf_counter()
+            self._in_flight = []
+
+            self._record(batch, started, finished)
+            for i, (_, future, _) in enumerate(batch):
+                if future.done():
+                    continue
+                if error is not None:
+                    future.set_exception(error)
+                else:
+                    future.set_result(results[i])
+
+    def _record(self, batch, started, finished):
+        self._batches += 1
+        self._items += len(batch)
+        self._max_batch_size_seen = max(self._max_batch_size_seen, len(batch))
+        self._total_score_time += finished - started
+        for _, _, queued_at in batch:
+            wait = started - queued_at
+            self._total_wait += wait
+            self._max_wait = max(self._max_wait, wait)
+        bucket = next(
+            (i for i, bound in enumerate(self.BATCH_SIZE_BUCKETS) if len(batch) <= bound),
+            len(self.BATCH_SIZE_BUCKETS)
+        )
+        self._batch_size_counts[bucket] += 1
@@ -0,0 +1,125 @@
+import json
+import os
+import shutil
+from datetime import datetime
+
+import joblib
+import numpy as np
+
+# Bundle layout: a directory holding a small JSON manifest (the header) next
+# to the joblib artifacts. The manifest can be read without unpickling any of
+# the artifacts, and the model artifact is written uncompressed by default so
+# its NumPy arrays can be memory-mapped.
+BUNDLE_FORMAT = 'flight-delay-model-bundle'
+BUNDLE_FORMAT_VERSION = 1
+MANIFEST_FILE = 'manifest.json'
+PREPROCESSORS_FILE = 'preprocessors.joblib'
+MODEL_FILE = 'model.joblib'
+ARRAYS_DIR = 'arrays'
+
+# Models saved before bundles existed are single joblib pickles, by default
+# flight_delay_model.pkl next to where the bundle now goes
+LEGACY_SUFFIX = '.pkl'
+
+def resolve_model_path(path):
+    """path, or the legacy pickle <path>.pkl when only that exists"""
+    legacy_path = os.path.normpath(path) + LEGACY_SUFFIX
+    if not os.path.exists(path) and os.path.isfile(legacy_path):
+        return legacy_path
+    return path
+
+def bundle_path(path):
+    """Bundle directory for path, dropping a legacy .pkl suffix"""
+    path = os.path.normpath(path)
+    return path[:-len(LEGACY_SUFFIX)] if path.endswith(LEGACY_SUFFIX) else path
+
+def is_bundle(path):
+    """Return True if path is a model bundle directory"""
+    return os.path.isfile(os.path.join(path, MANIFEST_FILE))
+
+def read_manifest(path):
+    """Read the bundle manifest without loading any model artifacts"""
+    with open(os.path.join(path, MANIFEST_FILE)) as f:
+        manifest = json.load(f)
+
+    if manifest.get('format') != BUNDLE_FORMAT:
+        raise ValueError(f"{path} is not a flight delay model bundle")
+    if manifest.get('format_version', 0) > BUNDLE_FORMAT_VERSION:
+        raise ValueError(
+            f"Model bundle format version {manifest['format_version']} is newer "
+            f"than the supported version {BUNDLE_FORMAT_VERSION}"
+        )
+    return manifest
+
+def save_bundle(path, model, preprocessors, manifest, compress=0, arrays=None):
+    """Write a model bundle directory
+
+    The bundle is assembled in a temporary sibling directory and renamed into
+    place, so readers never see a half-written bundle. compress is passed to
+    joblib for the model artifact; compressed artifacts cannot be
+    memory-mapped on load. arrays (name -> ndarray) are stored as plain .npy
+    files that load_bundle_arrays can memory-map.
+    """
+    path = os.path.normpath(path)
+    tmp_path = f'{path}.tmp-{os.getpid()}'
+    old_path = f'{path}.old-{os.getpid()}'
+
+    shutil.rmtree(tmp_path, ignore_errors=True)
+    os.makedirs(tmp_path)
+    try:
+        joblib.dump(preprocessors, os.path.join(tmp_path, PREPROCESSORS_FILE))
+        joblib.dump(model, os.path.join(tmp_path, MODEL_FILE), compress=compress)
+
+        if arrays:
+            os.makedirs(os.path.join(tmp_path, ARRAYS_DIR))
+            for name, array in arrays.items():
+                np.save(os.path.join(tmp_path, ARRAYS_DIR, f'{name}.npy'), np.asarray(array))
+
+        manifest = dict(manifest)
+        manifest['arrays'] = sorted(arrays) if arrays else []
+        manifest['format'] = BUNDLE_FORMAT
+        manifest['format_version'] = BUNDLE_FORMAT_VERSION
+        manifest['model_compressed'] = bool(compress)
+        manifest.setdefault('created_at', datetime.now().isoformat())
+        with open(os.path.join(tmp_path, MANIFEST_FILE), 'w') as f:
+            json.dump(manifest, f, indent=2)
+
+        if os.path.exists(path):
+            os.rename(path, old_path)
+        os.rename(tmp_path, path)
+    finally:
+        shutil.rmtree(tmp_path, ignore_errors=True)
+        if os.path.isdir(old_path):
+            shutil.rmtree(old_path, ignore_errors=True)
+        elif os.path.exists(old_path):
+            # A file (e.g. a legacy pickle) saved over with a bundle
+            os.remove(old_path)
+
+    return manifest
+
+def load_bundle(path, mmap_mode='r'):
+    """Load a model bundle, returning (model, preprocessors, manifest)
+
+    With mmap_mode set, large NumPy arrays in an uncompressed model artifact
+    are memory-mapped instead of read into private memory.
+    """
+    manifest = read_manifest(path)
+    if manifest.get('model_compressed'):
+        mmap_mode = None
+
+    preprocessors = joblib.load(os.path.join(path, PREPROCESSORS_FILE))
+    model = joblib.load(os.path.join(path, MODEL_FILE), mmap_mode=mmap_mode)
+    return model, preprocessors, manifest
+
+def load_bundle_arrays(path, manifest=None, mmap_mode='r'):
+    """Load the .npy arrays saved with a bundle, memory-mapped by default
+
+    Memory-mapped arrays are backed by the page cache, so worker processes
+    that map the same bundle share one physical copy.
+    """
+    if manifest is None:
+        manifest = read_manifest(path)
+    return {
+        name: np.load(os.path.join(path, ARRAYS_DIR, f'{name}.npy'), mmap_mode=mmap_mode)
+        for name in manifest.get('arrays', [])
+    }
@@ -0,0 +1,90 @@
+import os
+import threading
+import traceback
+from datetime import datetime
+
+import model_bundle
+from file_lock import FileLock
+
+class BackgroundModelLoader:
+    """Load or train the predictor's model off the request path
+
+    The work runs in a daemon thread so the web app can start serving (and
+    answering health checks) immediately. Training is guarded by a file lock
+    next to the model path, so when several worker processes start at once
+    only one of them trains; the others wait and then load its bundle.
+    """
+    def __init__(self, predictor, model_path, n_samples=10000):
+        self.predictor = predictor
+        self.model_path = model_path
+        self.n_samples = n_samples
+        self.state = 'starting'
+        self.error = None
+        self.started_at = None
+        self.ready_at = None
+        self._ready = threading.Event()
+        self._thread = None
+
+    @property
+    def ready(self):
+        return self._ready.is_set()
+
+    def start(self):
+        """Start loading in the background; returns immediately"""
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self.state = 'starting'
+        self.error = None
+        self.started_at = datetime.now()
+        self._thread = threading.Thread(target=self._run, name='model-loader', daemon=True)
+        self._thread.start()
+
+    def wait(self, timeout=None):
+        """Block until the model is ready; returns False on timeout"""
+        return self._ready.wait(timeout)
+
+    def status(self):
+        """Loader state for health checks"""
+        return {
+            'state': self.state,
+            'ready': self.ready,
+            'error': self.error,
+            'started_at': self.started_at.isoformat() if self.started_at else None,
+            'ready_at': self.ready_at.isoformat() if self.ready_at else None
+        }
+
+    def _run(self):
+        try:
+            # Fast path: an existing model needs no lock
+            if not (os.path.exists(self.model_path) and self._try_load()):
+                with FileLock(self.model_path.rstrip('/\\') + '.lock'):
+                    # Another worker may have trained while we waited
+                    if not (os.path.exists(self.model_path) and self._try_load()):
+                        self._train()
+            self.state = 'ready'
+            self.ready_at = datetime.now()
+            self._ready.set()
+        except Exception as e:
+            traceback.print_exc()
+            self.state = 'failed'
+            self.error = str(e)
+
+    def _try_load(self):
+        self.state = 'loading'
+        try:
+            self.predictor.load_model(self.model_path)
+            print("Loaded existing model")
+            return True
+        except Exception as e:
+            print(f"Error loading model: {e}")
+            return False
+
+    def _train(self):
+        self.state = 'training'
+        print("Training new model...")
+        train_data = self.predictor.generate_synthetic_data(n_samples=self.n_samples)
+        self.predictor.train_model(train_data)
+        # Never save a bundle under a legacy pickle's name; later starts
+        # find the bundle first
+        self.model_path = model_bundle.bundle_path(self.model_path)
+        self.predictor.save_bundle(self.model_path)
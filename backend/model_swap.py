@@ -0,0 +1,237 @@
+import os
+import threading
+import time
+import traceback
+from contextlib import contextmanager
+from datetime import datetime
+
+import numpy as np
+
+import model_bundle
+from flight_delay_predictor import FlightDelayPredictor, FEATURE_DEFAULTS
+
+# Flights a new model must score before it goes live. They also warm the
+# compiled arrays and the feature store. The last flight uses an airline and
+# route the model has never seen, and none of them carry route features.
+SMOKE_FLIGHTS = [
+    dict(airline='AA', origin_airport='JFK', dest_airport='LAX', month=7, day_of_week=1,
+         departure_hour=8, **FEATURE_DEFAULTS),
+    dict(airline='DL', origin_airport='ATL', dest_airport='ORD', month=12, day_of_week=5,
+         departure_hour=18, temperature=20, wind_speed=30, visibility=2, precipitation=1.5),
+    dict(airline='ZZ', origin_airport='XXX', dest_airport='YYY', month=3, day_of_week=3,
+         departure_hour=12, **FEATURE_DEFAULTS)
+]
+
+class ModelSwapper:
+    """Replace the serving model without downtime
+
+    Each request leases the active predictor with acquire()/release() or
+    lease() and keeps it until it finishes, so a swap never changes the
+    model under a running request.
+
+    reload() runs in a background thread:
+    1. load the bundle into a fresh FlightDelayPredictor
+    2. validate the new predictor on SMOKE_FLIGHTS, which also warms it
+    3. replace the active reference under a lock and call
+       on_swap(new, old, path)
+
+    The prediction cache and drift monitor move to the new model and are
+    reset. The replaced predictor is retired: it keeps serving the requests
+    that already hold it. When the last of those finishes, on_retire is
+    called and the swapper drops its reference, so the model can be freed.
+    Leases are keyed by the predictor object rather than its id(), which a
+    freed model could pass on to a new one.
+
+    watch() polls model_path and reloads when the bundle's model version
+    changes, or when a legacy pickle's mtime changes. save_bundle renames
+    bundles into place atomically, so a half-written bundle is never
+    loaded. A failed reload leaves the active model untouched.
+    """
+    def __init__(self, predictor, model_path, on_swap=None, on_retire=None, smoke_flights=SMOKE_FLIGHTS):
+        self.model_path = model_path
+        self.on_swap = on_swap
+        self.on_retire = on_retire
+        self.smoke_flights = smoke_flights
+        self.state = 'idle'
+        self.error = None
+        self.swaps = 0
+        self.last_swap = None
+        self.watch_interval = None
+        self._active = predictor
+        self._leases = {}
+        self._retired = {}
+        self._lock = threading.Lock()
+        self._reload_thread = None
+        self._watched_signature = None
+
+    def current(self):
+        """The active predictor (do not hold on to it across requests)"""
+        return self._active
+
+    def acquire(self):
+        """Lease the active predictor; pair with release()"""
+        with self._lock:
+            predictor = self._active
+            self._leases[predictor] = self._leases.get(predictor, 0) + 1
+        return predictor
+
+    def release(self, predictor):
+        with self._lock:
+            self._leases[predictor] -= 1
+            if self._leases[predictor]:
+                return
+            del self._leases[predictor]
+            retired = self._retired.pop(predictor, None)
+        if retired is not None:
+            self._retire(retired['predictor'])
+
+    @contextmanager
+    def lease(self):
+        predictor = self.acquire()
+        try:
+            yield predictor
+        finally:
+            self.release(predictor)
+
+    def reload(self, path=None, wait=False):
+        """Load, validate, warm and activate the model at path (default model_path)
+
+        Returns False if a reload is already running. With wait=True this
+        blocks until the new model is active or the reload has failed; see
+        status() for the outcome.
+        """
+        with self._lock:
+            if self._reload_thread is not None and self._reload_thread.is_alive():
+                return False
+            self.state = 'loading'
+            self.error = None
+            thread = threading.Thread(target=self._reload, args=(path or self.model_path,),
+                                      name='model-reload', daemon=True)
+            self._reload_thread = thread
+            thread.start()
+        if wait:
+            thread.join()
+        return True
+
+    def validate(self, candidate):
+        """Raise ValueError unless candidate scores the smoke flights sensibly"""
+        if not candidate.has_model or not candidate.feature_columns:
+            raise ValueError("The loaded file holds no trained model")
+        results = candidate.predict_delay_risk_batch(self.smoke_flights)
+        errors = [result['error'] for result in results if 'error' in result]
+        if errors:
+            raise ValueError(f"Smoke batch failed: {errors[0]}")
+        probabilities = np.array([result['delay_probability'] for result in results])
+        if not np.all((probabilities >= 0) & (probabilities <= 1)):
+            raise ValueError(f"Smoke batch returned invalid probabilities: {probabilities.tolist()}")
+        # Warm the single-flight path as well
+        candidate.predict_delay_risk(dict(self.smoke_flights[0]))
+
+    def _reload(self, path):
+        start = time.perf_counter()
+        try:
+            candidate = FlightDelayPredictor(inference_engine=self._active.inference_engine)
+            candidate.load_model(path)
+            self.state = 'validating'
+            self.validate(candidate)
+            self._swap(candidate, path, time.perf_counter() - start)
+            self.state = 'idle'
+        except Exception as e:
+            traceback.print_exc()
+            self.error = f'{type(e).__name__}: {e}'
+            self.state = 'failed'
+
+    def _swap(self, candidate, path, load_seconds):
+        with self._lock:
+            old = self._active
+            # Detach the cache and monitor from the old model before they are
+            # reset, so its draining requests cannot fill them with old scores
+            candidate.prediction_cache, old.prediction_cache = old.prediction_cache, None
+            candidate.drift_monitor, old.drift_monitor = old.drift_monitor, None
+            self._active = candidate
+            drained = not self._leases.get(old)
+            if not drained:
+                self._retired[old] = {'predictor': old, 'retired_at': datetime.now()}
+            self.swaps += 1
+            self.last_swap = {
+                'model_version': candidate.model_version,
+                'previous_version': old.model_version,
+                'model_path': path,
+                'load_seconds': round(load_seconds, 3),
+                'swapped_at': datetime.now().isoformat()
+            }
+        # Entries and windows of the old model are of no further use
+        if candidate.prediction_cache is not None:
+            candidate.prediction_cache.clear()
+        candidate.reset_drift_monitor()
+        print(f"Swapped model {old.model_version} -> {candidate.model_version}")
+        if self.on_swap is not None:
+            self.on_swap(candidate, old, path)
+        if drained:
+            self._retire(old)
+
+    def _retire(self, predictor):
+        if self.on_retire is not None:
+            self.on_retire(predictor)
+        print(f"Retired model {predictor.model_version}")
+
+    def watch(self, interval=5.0):
+        """Poll model_path every interval seconds and reload when it changes"""
+        self.watch_interval = interval
+        # Start from the file that is being served, so an unchanged legacy
+        # pickle is not reloaded on the first poll
+        try:
+            self._watched_signature = self._signature()
+        except (OSError, ValueError):
+            self._watched_signature = None
+        threading.Thread(target=self._watch, args=(interval,), name='model-watch', daemon=True).start()
+
+    def _watch(self, interval):
+        while True:
+            time.sleep(interval)
+            if not self._active.has_model:
+                continue  # The first model is still loading or training
+            try:
+                signature = self._signature()
+            except (OSError, ValueError):
+                continue  # Missing or mid-rename; try again next time
+            if signature == self._watched_signature:
+                continue
+            self._watched_signature = signature
+            mtime, version = signature
+            if version is not None and version == self._active.model_version:
+                continue
+            print(f"Model at {self.model_path} changed; reloading")
+            self.reload(wait=True)
+
+    def _signature(self):
+        if model_bundle.is_bundle(self.model_path):
+            manifest_path = os.path.join(self.model_path, model_bundle.MANIFEST_FILE)
+            return os.path.getmtime(manifest_path), model_bundle.read_manifest(self.model_path)['model_version']
+        return os.path.getmtime(self.model_path), None
+
+    def status(self):
+        """Swap state for /api/model-info and the admin endpoint"""
+        with self._lock:
+            active = self._active
+            draining = [
+                {
+                    'model_version': entry['predictor'].model_version,
+                    'in_flight': self._leases.get(retired, 0),
+                    'retired_at': entry['retired_at'].isoformat()
+                }
+                for retired, entry in self._retired.items()
+            ]
+            in_flight = self._leases.get(active, 0)
+        return {
+            'model_version': active.model_version,
+            'state': self.state,
+            'error': self.error,
+            'in_flight': in_flight,
+            'swaps': self.swaps,
+            'last_swap': self.last_swap,
+            'draining': draining,
+            'watching': self.watch_interval is not None,
+            'watch_interval': self.watch_interval,
+            'model_path': self.model_path
+        }
@@ -0,0 +1,130 @@
+import copy
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+from sklearn.ensemble import RandomForestClassifier
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+# Hyperparameters shared by every tree in the delay model
+FOREST_PARAMS = {
+    'max_depth': 15,
+    'min_samples_split': 10,
+    'min_samples_leaf': 5
+}
+
+def fit_forest_parallel(X, y, n_estimators, n_workers=None, max_worker_memory_mb=None,
+                        n_partitions=1, random_state=42, forest_params=None):
+    """Fit n_estimators trees across a process pool and merge them into one forest
+
+    With n_partitions > 1 the rows are shuffled and split into that many
+    partitions, and each partition gets its own share of the trees. Each
+    worker process builds its trees single-threaded; max_worker_memory_mb caps
+    a worker's address space where the platform supports it.
+    """
+    params = dict(FOREST_PARAMS if forest_params is None else forest_params)
+    X = np.ascontiguousarray(X, dtype=np.float32)
+    y = np.asarray(y)
+
+    if n_workers is None:
+        n_workers = os.cpu_count() or 1
+    rng = np.random.default_rng(random_state)
+    if n_partitions > 1:
+        partitions = np.array_split(rng.permutation(len(X)), n_partitions)
+    else:
+        partitions = [None]
+
+    # One task per (partition, share of trees); never more tasks than trees
+    n_tasks = min(n_estimators, max(n_workers, len(partitions)))
+    tree_counts = [len(s) for s in np.array_split(np.arange(n_estimators), n_tasks)]
+    seeds = rng.integers(0, 2 ** 31 - 1, n_tasks)
+    tasks = []
+    for i, (n_trees, seed) in enumerate(zip(tree_counts, seeds)):
+        rows = partitions[i % len(partitions)]
+        X_part = X if rows is None else X[rows]
+        y_part = y if rows is None else y[rows]
+        if len(np.unique(y_part)) < 2:
+            raise ValueError("Every training partition must contain both delayed and on-time flights")
+        tasks.append((X_part, y_part, n_trees, int(seed), params))
+
+    if n_workers <= 1 or n_tasks == 1:
+        forests = [_fit_trees(*task) for task in tasks]
+    else:
+        with ProcessPoolExecutor(max_workers=min(n_workers, n_tasks), initializer=_limit_memory,
+                                 initargs=(max_worker_memory_mb,)) as pool:
+            forests = list(pool.map(_fit_trees, *zip(*tasks)))
+
+    return merge_forests(forests)
+
+def allocate_trees(block_sizes, n_estimators, min_group_rows=1):
+    """Group consecutive blocks of rows and split n_estimators between the groups
+
+    Returns (groups, tree_counts): the group number of each block and the
+    number of trees each group gets. When there are more blocks than trees,
+    every ceil(n_blocks / n_estimators) neighbouring blocks form one group so
+    that each group gets at least one tree. Groups with fewer than
+    min_group_rows rows (a short last block, say) join the previous group.
+    Trees are shared in proportion to group rows by largest remainder, so
+    tree_counts always adds up to n_estimators.
+    """
+    block_sizes = np.asarray(block_sizes, dtype=np.int64)
+    if n_estimators < 1:
+        raise ValueError("n_estimators must be at least 1")
+    if block_sizes.sum() == 0:
+        raise ValueError("Cannot allocate trees to blocks without rows")
+
+    blocks_per_group = -(-len(block_sizes) // n_estimators)
+    groups = np.arange(len(block_sizes)) // blocks_per_group
+    group_rows = np.bincount(groups, weights=block_sizes).astype(np.int64)
+
+    # Merge small groups into their predecessor (the first into its successor)
+    merged_rows, merged_ids = [], []
+    for rows in group_rows:
+        if merged_rows and (rows < min_group_rows or merged_rows[-1] < min_group_rows):
+            merged_rows[-1] += rows
+        else:
+            merged_rows.append(rows)
+        merged_ids.append(len(merged_rows) - 1)
+    groups = np.asarray(merged_ids)[groups]
+    group_rows = np.asarray(merged_rows)
+
+    # One tree per group, the rest by largest remainder of each group's share
+    tree_counts = np.ones(len(group_rows), dtype=np.int64)
+    spare = n_estimators - len(group_rows)
+    shares = spare * group_rows / group_rows.sum()
+    tree_counts += np.floor(shares).astype(np.int64)
+    remainder = n_estimators - tree_counts.sum()
+    tree_counts[np.argsort(-(shares - np.floor(shares)), kind='stable')[:remainder]] += 1
+    return groups.tolist(), tree_counts.tolist()
+
+def merge_forests(forests):
+    """Combine fitted forests over the same classes and features into a new one
+
+    The inputs are left untouched, so a forest that is serving can be merged
+    with new trees and replaced afterwards.
+    """
+    first = forests[0]
+    for forest in forests[1:]:
+        if not np.array_equal(forest.classes_, first.classes_):
+            raise ValueError("Cannot merge forests trained on different classes")
+        if forest.n_features_in_ != first.n_features_in_:
+            raise ValueError("Cannot merge forests trained on different features")
+    merged = copy.copy(first)
+    merged.estimators_ = [tree for forest in forests for tree in forest.estimators_]
+    merged.n_estimators = len(merged.estimators_)
+    return merged
+
+def _fit_trees(X, y, n_trees, seed, params):
+    forest = RandomForestClassifier(n_estimators=n_trees, random_state=seed, n_jobs=1, **params)
+    forest.fit(X, y)
+    return forest
+
+def _limit_memory(max_worker_memory_mb):
+    if max_worker_memory_mb is None or resource is None:
+        return
+    limit = int(max_worker_memory_mb) * 1024 * 1024
+    resource.setrlimit(resource.RLIMIT_AS, (limit, limit))
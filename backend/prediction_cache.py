@@ -0,0 +1,165 @@
+import json
+import threading
+import time
+from collections import OrderedDict
+
+# Continuous fields that are part of every cache key
+CONTINUOUS_FIELDS = (
+    'distance', 'temperature', 'wind_speed', 'visibility', 'precipitation',
+    'origin_congestion', 'dest_congestion'
+)
+
+# Opt-in bucket widths for the continuous fields. Only the cache key is
+# bucketed, so a hit returns the prediction for another flight in the same
+# bucket: a higher hit rate in exchange for results that can differ slightly
+# from an uncached prediction. Without buckets, keys use the exact values.
+COARSE_BUCKETS = {
+    'distance': 25,
+    'temperature': 1.0,
+    'wind_speed': 1.0,
+    'visibility': 0.5,
+    'precipitation': 0.05,
+    'origin_congestion': 0.05,
+    'dest_congestion': 0.05
+}
+
+# Integer-valued time fields that are used in the key as-is
+TIME_FIELDS = ('month', 'day_of_week', 'departure_hour')
+
+class RedisCacheBackend:
+    """Shared cache backend on Redis, so several workers can share hits
+
+    Requires the optional redis package.
+    """
+    def __init__(self, url, prefix='flight-delay:'):
+        import redis
+        self.client = redis.Redis.from_url(url)
+        self.prefix = prefix
+
+    def get(self, key):
+        value = self.client.get(self.prefix + key)
+        return json.loads(value) if value is not None else None
+
+    def set(self, key, value, ttl):
+        self.client.set(self.prefix + key, json.dumps(value), ex=max(1, int(ttl)))
+
+class PredictionCache:
+    """LRU/TTL cache of prediction results keyed on flight data
+
+    Keys are built from the categorical codes, the time fields, the
+    continuous fields (bucketed when buckets are given, e.g. COARSE_BUCKETS)
+    and the model version, so loading a new model makes
+    old entries unreachable; the local entries are dropped as soon as a new
+    version is seen. An optional shared backend (e.g. RedisCacheBackend) is
+    consulted on local misses.
+    """
+    def __init__(self, max_size=10000, ttl=300, buckets=None, shared_backend=None):
+        self.max_size = max_size
+        self.ttl = ttl
+        self.buckets = dict(buckets or {})
+        self.shared_backend = shared_backend
+        self.model_version = None
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._counters = dict.fromkeys(
+            ['hits', 'misses', 'shared_hits', 'evictions', 'expirations', 'invalidations'], 0
+        )
+
+    def normalize(self, prediction_data):
+        """Snap continuous fields onto their bucket grid"""
+        normalized = dict(prediction_data)
+        for field, width in self.buckets.items():
+            value = normalized.get(field)
+            if width and isinstance(value, (int, float)) and not isinstance(value, bool):
+                normalized[field] = round(round(value / width) * width, 6)
+        return normalized
+
+    def make_key(self, predictor, prediction_data):
+        """Cache key for prediction data; continuous fields are bucketed here"""
+        if self.buckets:
+            prediction_data = self.normalize(prediction_data)
+        parts = [predictor.model_version or f'id{id(predictor.model)}']
+        for col, lookup in predictor.category_lookups.items():
+            value = prediction_data.get(col)
+            parts.append(predictor.category_code(lookup, value))
+        for field in TIME_FIELDS + CONTINUOUS_FIELDS:
+            parts.append(prediction_data.get(field))
+        return '|'.join(map(str, parts))
+
+    def get(self, key):
+        """Return a copy of the cached result, or None"""
+        version = key.split('|', 1)[0]
+        now = time.monotonic()
+        with self._lock:
+            if version != self.model_version:
+                self._invalidate(version)
+            entry = self._entries.get(key)
+            if entry is not None:
+                expires_at, value = entry
+                if expires_at > now:
+                    self._entries.move_to_end(key)
+                    self._counters['hits'] += 1
+                    return dict(value)
+                del self._entries[key]
+                self._counters['expirations'] += 1
+
+        if self.shared_backend is not None:
+            try:
+                value = self.shared_backend.get(key)
+            except Exception:
+                value = None
+            if value is not None:
+                self._store(key, value)
+                with self._lock:
+                    self._counters['shared_hits'] += 1
+                return dict(value)
+
+        with self._lock:
+            self._counters['misses'] += 1
+        return None
+
+    def set(self, key, value):
+        """Cache a result locally and in the shared backend"""
+        value = dict(value)
+        self._store(key, value)
+        if self.shared_backend is not None:
+            try:
+                self.shared_backend.set(key, value, self.ttl)
+            except Exception:
+                pass
+
+    def clear(self):
+        """Drop all local entries"""
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        """Hit/miss/eviction counters and current size"""
+        with self._lock:
+            stats = dict(self._counters)
+            stats['size'] = len(self._entries)
+        lookups = stats['hits'] + stats['shared_hits'] + stats['misses']
+        stats['hit_rate'] = (stats['hits'] + stats['shared_hits']) / lookups if lookups else 0.0
+        stats['max_size'] = self.max_size
+        stats['ttl'] = self.ttl
+        stats['model_version'] = self.model_version
+        stats['shared_backend'] = type(self.shared_backend).__name__ if self.shared_backend else None
+        return stats
+
+    def _store(self, key, value):
+        version = key.split('|', 1)[0]
+        with self._lock:
+            if version != self.model_version:
+                self._invalidate(version)
+            self._entries[key] = (time.monotonic() + self.ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+                self._counters['evictions'] += 1
+
+    def _invalidate(self, version):
+        # Caller holds the lock
+        if self.model_version is not None:
+            self._counters['invalidations'] += 1
+        self._entries.clear()
+        self.model_version = version
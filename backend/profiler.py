@@ -0,0 +1,93 @@
+import heapq
+import os
+import sys
+import threading
+import time
+from collections import Counter
+
+class SlowRequestProfiler:
+    """Opt-in sampling profiler that keeps the slowest requests' stacks
+
+    A single background thread samples the Python stack of every thread that
+    is currently inside a request, every interval seconds. When a request
+    finishes, its samples are kept if it is among the top_n slowest seen so
+    far. Profiles are exported in the collapsed-stack format understood by
+    flamegraph.pl and speedscope ("frame;frame;frame count" per line, with
+    file.py:function frames).
+    """
+    def __init__(self, top_n=10, interval=0.005):
+        self.top_n = top_n
+        self.interval = interval
+        self._active = {}
+        self._slowest = []
+        self._sequence = 0
+        self._lock = threading.Lock()
+        self._thread = None
+        self._stop = threading.Event()
+
+    def start(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._sample_loop, name='request-profiler', daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+
+    def begin(self):
+        """Start collecting samples for the current thread's request"""
+        with self._lock:
+            self._active[threading.get_ident()] = Counter()
+
+    def end(self, label, duration):
+        """Finish the current thread's request and keep it if it was slow"""
+        with self._lock:
+            samples = self._active.pop(threading.get_ident(), None)
+            if not samples:
+                return
+            self._sequence += 1
+            entry = (duration, self._sequence, label, samples)
+            if len(self._slowest) < self.top_n:
+                heapq.heappush(self._slowest, entry)
+            elif duration > self._slowest[0][0]:
+                heapq.heapreplace(self._slowest, entry)
+
+    def profiles(self):
+        """Slowest requests first, as (label, duration, collapsed stack text)"""
+        with self._lock:
+            slowest = sorted(self._slowest, reverse=True)
+        return [
+            (label, duration, '\n'.join(f'{stack} {count}' for stack, count in samples.most_common()))
+            for duration, _, label, samples in slowest
+        ]
+
+    def collapsed(self):
+        """Stacks of all kept profiles merged into one collapsed-stack document
+
+        The document holds nothing but stack lines, so flamegraph tools can
+        read it as is; which requests were kept, and how long they took, is
+        reported by profiles().
+        """
+        merged = Counter()
+        with self._lock:
+            for _, _, _, samples in self._slowest:
+                merged.update(samples)
+        return ''.join(f'{stack} {count}\n' for stack, count in merged.most_common())
+
+    def _sample_loop(self):
+        while not self._stop.wait(self.interval):
+            frames = sys._current_frames()
+            with self._lock:
+                for thread_id, samples in self._active.items():
+                    frame = frames.get(thread_id)
+                    if frame is not None:
+                        samples[_collapse(frame)] += 1
+
+def _collapse(frame):
+    names = []
+    while frame is not None:
+        code = frame.f_code
+        # Frames must not contain the separators of the collapsed format
+        name = f'{os.path.basename(code.co_filename)}:{code.co_name}'
+        names.append(name.replace(' ', '_').replace(';', '_'))
+        frame = frame.f_back
+    return ';'.join(reversed(names))
@@ -0,0 +1,147 @@
+import gc
+import multiprocessing
+import os
+import threading
+
+import numpy as np
+
+# Predictor used inside pool workers, set by the worker initializer. With
+# the fork start method it is the parent's predictor, handed over through
+# the pool rather than a parent global so that pools of two models (during a
+# hot-swap) never fork each other's; the model is shared copy-on-write.
+# Otherwise each worker loads (and memory-maps) the bundle once.
+_worker_predictor = None
+
+# gc.freeze() is process-wide, so the heap is only unfrozen once every pool
+# that forked from it has closed
+_frozen_pools = 0
+_freeze_lock = threading.Lock()
+
+class InferenceWorkerPool:
+    """Pre-forked process pool that scores large batches in parallel
+
+    The parent loads the model first and the workers are forked afterwards,
+    so the forest is shared copy-on-write and the compiled node arrays of a
+    memory-mapped bundle are shared through the page cache. Batches smaller
+    than min_rows_per_worker * 2 are scored in the calling process; larger
+    ones are split into contiguous chunks, one per worker, and the results
+    are concatenated back in input order.
+    """
+    def __init__(self, predictor, n_workers=None, min_rows_per_worker=2000,
+                 start_method='fork', model_path=None):
+        self.predictor = predictor
+        self.n_workers = n_workers or os.cpu_count() or 1
+        self.min_rows_per_worker = min_rows_per_worker
+        self.start_method = start_method
+        self.model_path = model_path
+        self._pool = None
+        self._model_token = None
+        self._lock = threading.Lock()
+
+    def start(self):
+        """Fork the workers; the predictor's model must already be loaded"""
+        if not self.predictor.has_model:
+            raise ValueError("Load the model before starting the worker pool")
+        if self.start_method != 'fork' and self.model_path is None:
+            raise ValueError("model_path is required unless workers are forked")
+
+        self.close()
+        context = multiprocessing.get_context(self.start_method)
+        # Read before forking, so a concurrent model change triggers a re-fork
+        model_token = self._current_model_token()
+        if self.start_method == 'fork':
+            # Keep the garbage collector from touching (and so copying)
+            # inherited objects in the children
+            _freeze_heap()
+            initializer, initargs = _use_worker_predictor, (self.predictor,)
+        else:
+            initializer = _init_worker
+            initargs = (self.model_path, self.predictor.inference_engine)
+        self._pool = context.Pool(self.n_workers, initializer=initializer, initargs=initargs)
+        self._model_token = model_token
+        print(f"Started {self.n_workers} inference workers ({self.start_method})")
+
+    def close(self):
+        """Stop the workers"""
+        if self._pool is not None:
+            self._pool.terminate()
+            self._pool.join()
+            self._pool = None
+            if self.start_method == 'fork':
+                _unfreeze_heap()
+
+    def predict_delay_risk_batch(self, rows):
+        """Same contract as FlightDelayPredictor.predict_delay_risk_batch"""
+        return self.predictor.risk_results(*self.predict_delay_probabilities(rows))
+
+    def predict_delay_probabilities(self, rows, observe=True):
+        """Same contract as FlightDelayPredictor.predict_delay_probabilities
+
+        Workers score without a drift monitor; their scaled rows are sent back
+        and observed here, in the process that serves /api/drift.
+        """
+        observe = observe and self.predictor.drift_monitor is not None
+        chunk_results = self._map(rows, return_features=observe)
+        if chunk_results is None:
+            return self.predictor.predict_delay_probabilities(rows, observe=observe)
+        errors = []
+        for _, chunk_errors, _ in chunk_results:
+            errors.extend(chunk_errors)
+        probabilities = np.concatenate([chunk_probabilities for chunk_probabilities, _, _ in chunk_results])
+        if observe:
+            scaled = [features for _, _, features in chunk_results if features is not None]
+            if scaled:
+                self.predictor._observe(np.concatenate(scaled), probabilities[~np.isnan(probabilities)])
+        return probabilities, errors
+
+    def _map(self, rows, return_features):
+        """Score contiguous chunks of rows, one per worker, with score_rows
+
+        Returns the per-chunk (probabilities, errors, scaled features or
+        None) in order, or None if the batch is too small to split.
+        """
+        n_chunks = min(self.n_workers, len(rows) // self.min_rows_per_worker)
+        if n_chunks < 2:
+            return None
+
+        # Workers forked from an older model would serve stale predictions
+        with self._lock:
+            if self._pool is None or self._model_token != self._current_model_token():
+                self.start()
+            pool = self._pool
+
+        bounds = np.linspace(0, len(rows), n_chunks + 1).astype(int)
+        chunks = [(rows[start:end], return_features) for start, end in zip(bounds[:-1], bounds[1:])]
+        return pool.map(_score_chunk, chunks)
+
+    def _current_model_token(self):
+        return self.predictor.model_revision
+
+def _freeze_heap():
+    global _frozen_pools
+    with _freeze_lock:
+        _frozen_pools += 1
+        gc.freeze()
+
+def _unfreeze_heap():
+    global _frozen_pools
+    with _freeze_lock:
+        _frozen_pools -= 1
+        if not _frozen_pools:
+            gc.unfreeze()
+
+def _use_worker_predictor(predictor):
+    # Forked workers inherit the predictor; it is not pickled
+    global _worker_predictor
+    _worker_predictor = predictor
+
+def _init_worker(model_path, inference_engine):
+    global _worker_predictor
+    from flight_delay_predictor import FlightDelayPredictor
+    _worker_predictor = FlightDelayPredictor(inference_engine=inference_engine)
+    _worker_predictor.load_model(model_path, mmap_mode='r')
+
+def _score_chunk(task):
+    rows, return_features = task
+    probabilities, errors, features = _worker_predictor.score_rows(rows)
+    return probabilities, errors, features if return_features else None
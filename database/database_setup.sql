@@ -50,6 +50,27 @@ CREATE TABLE IF NOT EXISTS CancellationTbl (
     FOREIGN KEY (CancelFlightCode) REFERENCES FlightTbl(FlCode)
 );
 
+-- Create FlightDelayPredictionTbl (written by backend/schedule_scoring.py)
+CREATE TABLE IF NOT EXISTS FlightDelayPredictionTbl (
+    PredFlightCode VARCHAR(10) PRIMARY KEY,
+    PredProbability DOUBLE NOT NULL,
+    PredRiskScore INT NOT NULL,
+    PredRiskLevel VARCHAR(10) NOT NULL,
+    PredModelVersion VARCHAR(64) NOT NULL,
+    PredInputHash CHAR(16) NOT NULL,
+    PredScoredAt DATETIME NOT NULL,
+    FOREIGN KEY (PredFlightCode) REFERENCES FlightTbl(FlCode)
+);
+
+-- Create PredictionCheckpointTbl (resume point for schedule scoring runs)
+CREATE TABLE IF NOT EXISTS PredictionCheckpointTbl (
+    CkJob VARCHAR(50) PRIMARY KEY,
+    CkLastFlightCode VARCHAR(10),
+    CkModelVersion VARCHAR(64),
+    CkComplete BOOLEAN NOT NULL DEFAULT 0,
+    CkUpdatedAt DATETIME NOT NULL
+);
+
 -- Insert sample data for testing
 INSERT INTO FlightTbl (FlCode, FlSource, FlDest, FlDate, FlSeats) VALUES
 ('FA001', 'Delhi', 'Mumbai', '2024-01-15', 150),
@@ -75,6 +96,7 @@ CREATE INDEX idx_flight_code ON FlightTbl(FlCode);
 CREATE INDEX idx_passenger_id ON PassengerTbl(PassId);
 CREATE INDEX idx_booking_id ON BookingTbl(BookId);
 CREATE INDEX idx_cancellation_id ON CancellationTbl(CancelId);
+CREATE INDEX idx_flight_date ON FlightTbl(FlDate);
 
 -- Grant permissions (adjust as needed)
 GRANT ALL PRIVILEGES ON airlinedb.* TO 'root'@'localhost';
@@ -85,6 +107,7 @@ DESCRIBE FlightTbl;
 DESCRIBE PassengerTbl;
 DESCRIBE BookingTbl;
 DESCRIBE CancellationTbl;
+DESCRIBE FlightDelayPredictionTbl;
 
 -- Show sample data
 SELECT * FROM FlightTbl LIMIT 5;
@@ -0,0 +1,88 @@
+import contextlib
+import io
+import os
+import shutil
+import sys
+
+import pytest
+
+BACKEND_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'backend')
+sys.path.insert(0, BACKEND_DIR)
+
+from flight_delay_predictor import FlightDelayPredictor
+
+# A flight in the API request format
+SAMPLE_FLIGHT = {
+    'airline': 'AA',
+    'origin_airport': 'JFK',
+    'dest_airport': 'LAX',
+    'departure_time': '2024-07-15T08:30:00Z',
+    'distance': 2475,
+    'temperature': 84.3,
+    'wind_speed': 12.7,
+    'visibility': 9.2,
+    'precipitation': 0.03,
+    'origin_congestion': 0.71,
+    'dest_congestion': 0.58
+}
+
+@contextlib.contextmanager
+def quiet():
+    """Silence the predictor's progress output"""
+    with contextlib.redirect_stdout(io.StringIO()):
+        yield
+
+def load_predictor(path, **kwargs):
+    predictor = FlightDelayPredictor(**kwargs)
+    with quiet():
+        predictor.load_model(path)
+    return predictor
+
+@pytest.fixture(scope='session')
+def training_data():
+    return FlightDelayPredictor().generate_synthetic_data(n_samples=4000, random_state=1)
+
+@pytest.fixture(scope='session')
+def trained_predictor(training_data):
+    """A predictor trained in-process; tests must not modify it"""
+    predictor = FlightDelayPredictor()
+    with quiet():
+        predictor.train_model(training_data, verbose=False)
+    return predictor
+
+@pytest.fixture(scope='session')
+def bundle_path(trained_predictor, tmp_path_factory):
+    path = str(tmp_path_factory.mktemp('bundle') / 'flight_delay_model')
+    with quiet():
+        trained_predictor.save_bundle(path)
+    return path
+
+@pytest.fixture(scope='session')
+def feature_rows(trained_predictor):
+    """Flights as prediction data dicts, as the API passes them to the predictor"""
+    df = trained_predictor.generate_synthetic_data(n_samples=300, random_state=7)
+    return df[trained_predictor.feature_columns].to_dict('records')
+
+@pytest.fixture(scope='session')
+def api(bundle_path, tmp_path_factory):
+    """delay_prediction_api serving a copy of the bundle with the default settings
+
+    The module reads its configuration at import time, so it is imported
+    once per session. The model directory is private to the API so tests can
+    place bundles next to the served one.
+    """
+    model_dir = tmp_path_factory.mktemp('api_models')
+    model_path = str(model_dir / 'flight_delay_model')
+    shutil.copytree(bundle_path, model_path)
+    os.environ['FLIGHT_DELAY_MODEL_PATH'] = model_path
+    for name in ('FLIGHT_DELAY_CACHE_SIZE', 'FLIGHT_DELAY_CACHE_BUCKETING', 'FLIGHT_DELAY_WORKERS', 'FLIGHT_DELAY_ADMIN_TOKEN',
+                 'FLIGHT_DELAY_MODEL_WATCH_INTERVAL', 'FLIGHT_DELAY_DRIFT_WINDOW', 'FLIGHT_DELAY_MODEL_DIR'):
+        os.environ.pop(name, None)
+    with quiet():
+        import delay_prediction_api
+        assert delay_prediction_api.model_loader.wait(timeout=60)
+    return delay_prediction_api
+
+@pytest.fixture
+def client(api):
+    return api.app.test_client()
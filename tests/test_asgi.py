@@ -0,0 +1,117 @@
+import asyncio
+import contextlib
+import json
+import threading
+
+import pytest
+
+from conftest import SAMPLE_FLIGHT, load_predictor
+from metrics import REGISTRY
+from micro_batcher import BatcherClosedError, MicroBatcher
+from prediction_cache import PredictionCache
+
+@pytest.fixture(scope='module')
+def asgi_app(api):
+    import asgi_app
+    return asgi_app
+
+async def asgi_post(app, path, payload):
+    body = json.dumps(payload).encode()
+    scope = {'type': 'http', 'asgi': {'version': '3.0'}, 'http_version': '1.1', 'method': 'POST',
+             'scheme': 'http', 'path': path, 'raw_path': path.encode(), 'root_path': '',
+             'query_string': b'', 'headers': [(b'content-type', b'application/json')],
+             'server': ('test', 80), 'client': ('127.0.0.1', 0)}
+    messages = [{'type': 'http.request', 'body': body, 'more_body': False}]
+    response = {'body': b''}
+
+    async def receive():
+        return messages.pop() if messages else {'type': 'http.disconnect'}
+
+    async def send(message):
+        if message['type'] == 'http.response.start':
+            response['status'] = message['status']
+        else:
+            response['body'] += message.get('body', b'')
+
+    await app(scope, receive, send)
+    return response['status'], json.loads(response['body'])
+
+def post_concurrently(asgi_app, flights):
+    async def run():
+        try:
+            return await asyncio.gather(*(asgi_post(asgi_app.app, '/api/predict-delay', flight)
+                                          for flight in flights))
+        finally:
+            await asgi_app.batcher.close()
+    return asyncio.run(run())
+
+def test_micro_batches_match_the_flask_route(api, asgi_app, client, monkeypatch):
+    flights = [dict(SAMPLE_FLIGHT, temperature=50 + i * 0.37, airline=airline)
+               for i, airline in enumerate(['AA', 'DL', 'UA', 'ZZ', 'B6', 'AA'])]
+    cache = api.swapper.current().prediction_cache
+    with monkeypatch.context() as patch:
+        patch.setattr(api.swapper.current(), 'prediction_cache', None)
+        expected = [client.post('/api/predict-delay', json=flight).json for flight in flights]
+
+    hits = cache.stats()['hits']
+    batches = asgi_app.batcher.stats()['batches']
+    responses = post_concurrently(asgi_app, flights)
+    assert [status for status, _ in responses] == [200] * len(flights)
+    assert [body for _, body in responses] == expected
+    assert asgi_app.batcher.stats()['batches'] < batches + len(flights)
+    assert cache.stats()['hits'] == hits
+
+    # The second round is answered from the cache the batches filled
+    assert [body for _, body in post_concurrently(asgi_app, flights)] == expected
+    assert cache.stats()['hits'] == hits + len(flights)
+
+def test_invalid_request_is_a_client_error(asgi_app):
+    status, body = post_concurrently(asgi_app, [dict(SAMPLE_FLIGHT, temperature='warm')])[0]
+    assert status == 400 and body == {'error': 'Invalid value for field: temperature'}
+
+def test_many_matches_single_flight_scoring(bundle_path, feature_rows):
+    predictor = load_predictor(bundle_path, prediction_cache=PredictionCache())
+    uncached = load_predictor(bundle_path)
+    expected = [uncached.predict_delay_risk(row) for row in feature_rows[:40]]
+    assert predictor.predict_delay_risk_many(feature_rows[:1]) == expected[:1]
+    assert predictor.predict_delay_risk_many(feature_rows[:20]) == expected[:20]
+    assert predictor.predict_delay_risk_many(feature_rows[:40]) == expected
+    assert predictor.predict_delay_risk_many([]) == []
+    assert predictor.prediction_cache.stats()['hits'] == 1 + 20
+
+def test_context_comes_from_the_model_that_scored_the_batch(api, asgi_app, bundle_path, monkeypatch):
+    leased = load_predictor(bundle_path)
+    monkeypatch.setattr(leased, 'route_history', lambda origin, dest: {'from': 'leased model'})
+    monkeypatch.setattr(api.swapper, 'lease', lambda: contextlib.nullcontext(leased))
+    prediction_data, departure_time = api.build_prediction_data(SAMPLE_FLIGHT)
+    [result] = asgi_app.score_micro_batch([(prediction_data, SAMPLE_FLIGHT, departure_time)])
+    assert result['route_history'] == {'from': 'leased model'}
+    assert result['flight_info']['departure_time'] == SAMPLE_FLIGHT['departure_time']
+
+def test_parse_stage_is_timed(asgi_app):
+    def parse_count():
+        return REGISTRY.snapshot()['histograms'].get(
+            'flight_delay_stage_seconds{stage="parse_request"}', {'count': 0})['count']
+    before = parse_count()
+    post_concurrently(asgi_app, [SAMPLE_FLIGHT])
+    assert parse_count() == before + 1
+
+def test_close_fails_the_waiting_requests():
+    started, release = threading.Event(), threading.Event()
+
+    def score_batch(items):
+        started.set()
+        release.wait(5)
+        return items
+
+    async def run():
+        batcher = MicroBatcher(score_batch, max_batch_size=1, max_wait_ms=0)
+        requests = [asyncio.ensure_future(batcher.submit(i)) for i in range(3)]
+        while not started.is_set():
+            await asyncio.sleep(0.001)
+        await batcher.close()
+        release.set()
+        return await asyncio.gather(*requests, return_exceptions=True)
+
+    results = asyncio.run(asyncio.wait_for(run(), 5))
+    assert [type(result) for result in results] == [BatcherClosedError] * 3
@@ -0,0 +1,58 @@
+import numpy as np
+import pandas as pd
+
+from conftest import SAMPLE_FLIGHT
+
+def test_batch_matches_single_flight_scoring(trained_predictor, feature_rows):
+    batch = trained_predictor.predict_delay_risk_batch(feature_rows)
+    single = [trained_predictor.predict_delay_risk(row) for row in feature_rows]
+    assert batch == single
+
+def test_batch_accepts_dataframes_and_structured_arrays(trained_predictor, feature_rows):
+    expected = trained_predictor.predict_delay_risk_batch(feature_rows[:20])
+    df = pd.DataFrame(feature_rows[:20])
+    assert trained_predictor.predict_delay_risk_batch(df) == expected
+    assert trained_predictor.predict_delay_risk_batch(df.to_records(index=False)) == expected
+
+def test_invalid_rows_get_errors_in_place(trained_predictor, feature_rows):
+    rows = [dict(row) for row in feature_rows[:4]]
+    rows[1]['temperature'] = 'warm'
+    del rows[2]['airline']
+    rows.append('not a flight')
+    results = trained_predictor.predict_delay_risk_batch(rows)
+    assert results[1] == {'error': 'Invalid value for field: temperature'}
+    assert results[2] == {'error': 'Missing required field: airline'}
+    assert results[4] == {'error': 'Expected a flight object'}
+    valid = trained_predictor.predict_delay_risk_batch([rows[0], rows[3]])
+    assert [results[0], results[3]] == valid
+
+def test_probabilities_are_nan_for_invalid_rows(trained_predictor, feature_rows):
+    rows = [dict(feature_rows[0]), dict(feature_rows[1], wind_speed=float('inf'))]
+    probabilities, errors = trained_predictor.predict_delay_probabilities(rows)
+    assert 0 <= probabilities[0] <= 1 and np.isnan(probabilities[1])
+    assert errors == [None, 'Invalid value for field: wind_speed']
+
+def test_single_and_batch_endpoints_agree(client):
+    single = client.post('/api/predict-delay', json=SAMPLE_FLIGHT).json
+    batch = client.post('/api/batch-predict', json=[SAMPLE_FLIGHT, SAMPLE_FLIGHT]).json['predictions']
+    assert [row['delay_probability'] for row in batch] == [single['delay_probability']] * 2
+    assert batch[0]['risk_level'] == single['risk_level']
+
+def test_non_numeric_field_is_a_client_error(client):
+    flight = dict(SAMPLE_FLIGHT, temperature='warm')
+    response = client.post('/api/predict-delay', json=flight)
+    assert response.status_code == 400
+    assert response.json == {'error': 'Invalid value for field: temperature'}
+
+    batch = client.post('/api/batch-predict', json=[SAMPLE_FLIGHT, flight]).json['predictions']
+    assert 'delay_probability' in batch[0]
+    assert batch[1] == {'flight_index': 1, 'error': 'Invalid value for field: temperature'}
+
+def test_numeric_strings_are_accepted(client):
+    expected = client.post('/api/predict-delay', json=SAMPLE_FLIGHT).json['delay_probability']
+    flight = dict(SAMPLE_FLIGHT, distance=str(SAMPLE_FLIGHT['distance']))
+    assert client.post('/api/predict-delay', json=flight).json['delay_probability'] == expected
+
+def test_batch_endpoint_rejects_non_list_body(client):
+    response = client.post('/api/batch-predict', json={'flights': []})
+    assert response.status_code == 400
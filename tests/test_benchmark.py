@@ -0,0 +1,58 @@
+import json
+
+import pytest
+
+import benchmark
+from conftest import load_predictor, quiet
+from flight_delay_predictor import FlightDelayPredictor
+
+def results(**benchmarks):
+    return {'meta': {}, 'results': benchmarks}
+
+def test_summarize_reports_percentiles_and_throughput():
+    summary = benchmark.summarize([0.001] * 98 + [0.010, 0.020], items=1000)
+    assert summary['calls'] == 100
+    assert summary['p50_ms'] == pytest.approx(1.0)
+    assert summary['p99_ms'] > summary['p95_ms'] >= summary['p50_ms']
+    assert summary['mean_ms'] == pytest.approx(1.28)
+    assert summary['throughput_per_s'] == pytest.approx(1000 / 0.128, rel=1e-3)
+    assert benchmark.summarize([0.5, 0.5], wall_time=0.5)['throughput_per_s'] == 4.0
+
+def test_compare_flags_slower_latency_and_lower_throughput():
+    baseline = results(a={'p50_ms': 10, 'p95_ms': 20, 'p99_ms': 30, 'throughput_per_s': 100},
+                       b={'p50_ms': 10, 'p95_ms': 20, 'p99_ms': 30, 'throughput_per_s': 100},
+                       gone={'p50_ms': 1})
+    current = results(a={'p50_ms': 10.5, 'p95_ms': 25, 'p99_ms': 20, 'throughput_per_s': 95},
+                      b={'p50_ms': 10, 'p95_ms': 20, 'p99_ms': 30, 'throughput_per_s': 80})
+    regressions = benchmark.compare(baseline, current, threshold=0.10)
+    assert [(r['benchmark'], r['metric'], r['change']) for r in regressions] == [
+        ('a', 'p95_ms', 0.25), ('b', 'throughput_per_s', -0.2)]
+
+def test_compare_command_exit_status(tmp_path, capsys):
+    baseline, current = tmp_path / 'baseline.json', tmp_path / 'current.json'
+    baseline.write_text(json.dumps(results(a={'p50_ms': 10, 'throughput_per_s': 100})))
+    current.write_text(json.dumps(results(a={'p50_ms': 10.5, 'throughput_per_s': 100})))
+    assert benchmark.main(['compare', str(baseline), str(current)]) == 0
+    assert benchmark.main(['compare', str(baseline), str(current), '--threshold', '0.01']) == 1
+    assert 'REGRESSION a p50_ms' in capsys.readouterr().out
+
+def test_seed_sets_the_synthetic_inputs(bundle_path, monkeypatch, tmp_path):
+    seeds = []
+    generate = FlightDelayPredictor.generate_synthetic_data
+
+    def recording_generate(self, n_samples=10000, random_state=42):
+        seeds.append(random_state)
+        return generate(self, n_samples, random_state=random_state)
+
+    monkeypatch.setattr(FlightDelayPredictor, 'generate_synthetic_data', recording_generate)
+    runner = benchmark.BenchmarkRunner(batch_sizes=[10], repeat=1, single_calls=2, seed=3)
+    with quiet():
+        runner.bench_training(300)
+        runner.bench_prediction(load_predictor(bundle_path))
+    assert set(seeds) == {3, 4} and runner.meta()['seed'] == 3
+
+    runners = []
+    monkeypatch.setattr(benchmark.BenchmarkRunner, 'run', lambda self: runners.append(self) or {})
+    with quiet():
+        benchmark.main(['run', '--seed', '11', '--output', str(tmp_path / 'results.json')])
+    assert runners[0].seed == 11
@@ -0,0 +1,38 @@
+import numpy as np
+import pytest
+
+from compiled_forest import CompactForest, CompiledForest, forest_from_arrays
+from conftest import load_predictor, quiet
+
+def test_compact_forest_stays_close_to_the_compiled_forest(trained_predictor):
+    compiled = CompiledForest.from_sklearn(trained_predictor.model)
+    compact = CompactForest.from_compiled(compiled)
+    assert compact.nbytes < compiled.nbytes
+    rows = np.random.default_rng(0).normal(size=(500, len(trained_predictor.feature_columns)))
+    np.testing.assert_allclose(compact.predict_proba(rows), compiled.predict_proba(rows), rtol=0, atol=1e-4)
+    rebuilt = forest_from_arrays(compact.to_arrays())
+    assert type(rebuilt) is CompactForest
+    np.testing.assert_array_equal(rebuilt.predict_proba(rows), compact.predict_proba(rows))
+
+def test_export_compact_leaves_the_predictor_alone(bundle_path, feature_rows, tmp_path):
+    predictor = load_predictor(bundle_path, inference_engine='compiled')
+    compiled_model, manifest = predictor.compiled_model, predictor.manifest
+    with quiet():
+        report = predictor.export_compact(str(tmp_path / 'compact'))
+    assert predictor.compiled_model is compiled_model and predictor.manifest is manifest
+    assert 'compact_forest' not in manifest
+    assert report['max_probability_drift'] <= 1e-4 and report['compact_bytes'] < report['compiled_bytes']
+
+    compact = load_predictor(str(tmp_path / 'compact'), inference_engine='compiled')
+    assert isinstance(compact.compiled_model, CompactForest)
+    assert compact.manifest['compact_forest'] == report
+    assert compact.model_version == predictor.model_version
+    sklearn = load_predictor(bundle_path, inference_engine='sklearn')
+    compact_probabilities, _ = compact.predict_delay_probabilities(feature_rows)
+    expected, _ = sklearn.predict_delay_probabilities(feature_rows)
+    np.testing.assert_allclose(compact_probabilities, expected, rtol=0, atol=1e-4)
+
+def test_export_compact_enforces_the_drift_limit(bundle_path, tmp_path):
+    predictor = load_predictor(bundle_path, inference_engine='compiled')
+    with pytest.raises(ValueError, match='Compact forest moves probabilities'):
+        predictor.export_compact(str(tmp_path / 'compact'), max_drift=0)
@@ -0,0 +1,36 @@
+import numpy as np
+import pytest
+
+from compiled_forest import BLOCK_ROWS, CompiledForest, forest_from_arrays
+from conftest import load_predictor
+
+@pytest.fixture(scope='module')
+def scaled_rows(trained_predictor):
+    rng = np.random.default_rng(0)
+    return rng.normal(size=(BLOCK_ROWS + 37, len(trained_predictor.feature_columns)))
+
+def test_compiled_forest_matches_scikit_learn(trained_predictor, scaled_rows):
+    compiled = CompiledForest.from_sklearn(trained_predictor.model)
+    assert compiled.n_estimators == len(trained_predictor.model.estimators_)
+    np.testing.assert_allclose(compiled.predict_proba(scaled_rows),
+                               trained_predictor.model.predict_proba(scaled_rows), rtol=0, atol=1e-12)
+    assert compiled.predict_proba(scaled_rows[0]).shape == (1, 2)
+
+def test_verify_reports_a_mismatched_forest(trained_predictor, scaled_rows):
+    compiled = CompiledForest.from_sklearn(trained_predictor.model)
+    assert compiled.verify(trained_predictor.model, scaled_rows) <= 1e-9
+    compiled.value = compiled.value[:, ::-1].copy()
+    with pytest.raises(ValueError):
+        compiled.verify(trained_predictor.model, scaled_rows)
+
+def test_arrays_round_trip(trained_predictor, scaled_rows):
+    compiled = CompiledForest.from_sklearn(trained_predictor.model)
+    rebuilt = forest_from_arrays(compiled.to_arrays())
+    assert type(rebuilt) is CompiledForest
+    np.testing.assert_array_equal(rebuilt.predict_proba(scaled_rows), compiled.predict_proba(scaled_rows))
+
+def test_engines_give_the_same_predictions(bundle_path, feature_rows):
+    compiled = load_predictor(bundle_path, inference_engine='compiled')
+    sklearn = load_predictor(bundle_path, inference_engine='sklearn')
+    assert compiled.predict_delay_risk_batch(feature_rows) == sklearn.predict_delay_risk_batch(feature_rows)
+    assert compiled.predict_delay_risk(feature_rows[0]) == sklearn.predict_delay_risk(feature_rows[0])
@@ -0,0 +1,49 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from conftest import quiet
+from dataset_loader import iter_dataset_blocks, list_dataset_files
+from flight_delay_predictor import FlightDelayPredictor
+from parallel_training import allocate_trees
+
+# memory_budget_mb giving blocks of 1560 rows
+SMALL_BUDGET_MB = 0.5
+BLOCK_ROWS = 1560
+
+@pytest.fixture(scope='module')
+def dataset(tmp_path_factory):
+    """12000 flights in CSV shards of 5000, 5000 and 2000 rows; 150 rows have a missing value"""
+    path = tmp_path_factory.mktemp('dataset')
+    predictor = FlightDelayPredictor()
+    paths = predictor.write_synthetic_data(str(path), 12000, chunk_size=5000, file_format='csv',
+                                           random_state=3)
+    rng = np.random.default_rng(0)
+    for f in paths:
+        df = pd.read_csv(f)
+        df.loc[rng.choice(len(df), 50, replace=False), 'temperature'] = np.nan
+        df.to_csv(f, index=False)
+    return str(path), 12000 - 150
+
+def test_blocks_never_exceed_block_rows(dataset):
+    path, _ = dataset
+    sizes = [len(block) for block in iter_dataset_blocks(list_dataset_files(path), block_rows=BLOCK_ROWS)]
+    assert sizes == [BLOCK_ROWS] * 7 + [12000 - 7 * BLOCK_ROWS]
+
+@pytest.mark.parametrize('n_estimators', [3, 5, 10])
+def test_every_row_and_tree_is_used(dataset, n_estimators):
+    path, complete_rows = dataset
+    predictor = FlightDelayPredictor()
+    with quiet():
+        predictor.train_from_dataset(path, memory_budget_mb=SMALL_BUDGET_MB, n_estimators=n_estimators,
+                                     n_workers=1, verbose=False)
+    assert len(predictor.model.estimators_) == n_estimators
+    assert predictor.metrics['n_train_samples'] + predictor.metrics['n_test_samples'] == complete_rows
+
+def test_tree_allocation_adds_up_and_gives_every_group_a_tree():
+    for sizes, n_estimators in [([1000] * 39 + [10], 4), ([1000] * 5 + [10], 100), ([700, 0, 900], 2)]:
+        groups, tree_counts = allocate_trees(sizes, n_estimators, min_group_rows=500)
+        assert sum(tree_counts) == n_estimators and min(tree_counts) >= 1
+        assert len(groups) == len(sizes) and groups == sorted(groups)
+        assert sorted(set(groups)) == list(range(len(tree_counts)))
+    assert allocate_trees([1000] * 5 + [10], 100, min_group_rows=500) == ([0, 1, 2, 3, 4, 4], [20] * 5)
@@ -0,0 +1,99 @@
+import numpy as np
+import pytest
+
+from conftest import SAMPLE_FLIGHT, load_predictor
+from drift_monitor import DriftMonitor, population_stability_index
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1_000_000.0
+
+    def __call__(self):
+        return self.now
+
+@pytest.fixture
+def clock():
+    return FakeClock()
+
+@pytest.fixture
+def monitored(bundle_path, clock):
+    monitor = DriftMonitor(window_seconds=600, n_buckets=6, min_rows=100, min_outcomes=100,
+                           cooldown_seconds=300, clock=clock)
+    return load_predictor(bundle_path, drift_monitor=monitor)
+
+def test_psi():
+    assert population_stability_index([0.5, 0.5], [0.5, 0.5]) == 0
+    assert population_stability_index([0.5, 0.5], [0.9, 0.1]) > 0.25
+    assert np.isfinite(population_stability_index([0.5, 0.5, 0], [0.4, 0.4, 0.2]))
+
+def test_in_distribution_traffic_is_stable(monitored, feature_rows):
+    monitored.predict_delay_probabilities(feature_rows)
+    summary = monitored.drift_monitor.summary()
+    assert summary['rows'] == len(feature_rows) and summary['has_reference']
+    assert max(stats['psi'] for stats in summary['features'].values()) < 0.1
+    assert summary['scores']['psi'] < 0.1
+    assert summary['features']['airline']['unseen_rate'] == 0
+    assert summary['alerts'] == []
+
+def test_shifted_features_and_unseen_categories_alert(monitored, feature_rows):
+    rows = [dict(row, temperature=row['temperature'] + 40, airline='ZZ') for row in feature_rows]
+    monitored.predict_delay_probabilities(rows)
+    summary = monitored.drift_monitor.summary()
+    assert summary['features']['temperature']['psi'] > 0.25
+    assert summary['features']['wind_speed']['psi'] < 0.1
+    assert summary['features']['airline']['unseen_rate'] == 1
+    checks = {(alert['check'], alert.get('feature')) for alert in summary['alerts']}
+    assert {('feature_psi', 'temperature'), ('unseen_rate', 'airline')} <= checks
+
+def test_calibration(clock):
+    monitor = DriftMonitor(min_outcomes=100, clock=clock)
+    rng = np.random.default_rng(0)
+    probabilities = rng.uniform(size=20000)
+    monitor.observe_outcomes(probabilities, rng.uniform(size=20000) < probabilities)
+    calibration = monitor.summary()['calibration']
+    assert calibration['outcomes'] == 20000
+    assert calibration['expected_calibration_error'] < 0.02
+    assert calibration['brier_score'] == pytest.approx(1 / 6, abs=0.01)
+
+    monitor.observe_outcomes(np.full(20000, 0.9), np.zeros(20000))
+    summary = monitor.summary()
+    assert summary['calibration']['expected_calibration_error'] > 0.3
+    assert [alert['check'] for alert in summary['alerts']] == ['calibration_error']
+
+def test_window_expiry(monitored, feature_rows, clock):
+    monitor = monitored.drift_monitor
+    monitored.predict_delay_probabilities(feature_rows[:100])
+    clock.now += 300
+    monitored.predict_delay_probabilities(feature_rows[100:150])
+    assert monitor.summary()['rows'] == 150
+    clock.now += 400
+    assert monitor.summary()['rows'] == 50
+    clock.now += 600
+    assert monitor.summary()['rows'] == 0
+    monitored.reset_drift_monitor()
+    assert monitor.summary()['rows'] == 0
+
+def test_hooks_run_on_a_new_slice_with_a_cooldown(monitored, feature_rows, clock):
+    calls = []
+    monitored.drift_monitor.add_hook(calls.append)
+    shifted = [dict(row, airline='ZZ') for row in feature_rows]
+    monitored.predict_delay_probabilities(shifted)
+    assert len(calls) == 1 and 'unseen_rate' in [alert['check'] for alert in calls[0]]
+    clock.now += 100
+    monitored.predict_delay_probabilities(shifted)
+    assert len(calls) == 1
+    clock.now += 300
+    monitored.predict_delay_probabilities(shifted)
+    assert len(calls) == 2
+    assert monitored.drift_monitor.summary()['last_alert']['time'] == clock.now
+
+def test_drift_endpoints(client):
+    client.post('/api/predict-delay', json=SAMPLE_FLIGHT)
+    summary = client.get('/api/drift').json
+    assert summary['enabled'] and summary['rows'] >= 1
+
+    outcomes = [dict(SAMPLE_FLIGHT, delayed=True), dict(SAMPLE_FLIGHT, delayed='yes'), dict(SAMPLE_FLIGHT)]
+    body = client.post('/api/outcomes', json=outcomes).json
+    assert body['accepted'] == 1
+    assert [error['flight_index'] for error in body['errors']] == [1, 2]
+    assert client.get('/api/drift').json['rows'] == summary['rows']
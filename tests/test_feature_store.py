@@ -0,0 +1,50 @@
+import pytest
+
+from conftest import SAMPLE_FLIGHT, load_predictor
+from feature_store import ROUTE_FEATURE_DEFAULTS, ROUTE_FEATURES
+from prediction_cache import PredictionCache
+
+def test_missing_route_features_are_filled_from_the_store(trained_predictor, feature_rows):
+    row = dict(feature_rows[0])
+    without_route = {col: value for col, value in row.items() if col not in ROUTE_FEATURES}
+    filled = trained_predictor._fill_route_features(without_route)
+    origin, dest = trained_predictor._airport_codes(row['origin_airport'], row['dest_airport'])
+    expected = trained_predictor.feature_store.lookup(origin, dest, hour=row['departure_hour'])
+    assert {col: filled[col] for col in ROUTE_FEATURES} == expected
+    assert trained_predictor.predict_delay_risk(without_route) == trained_predictor.predict_delay_risk(filled)
+    assert trained_predictor.predict_delay_risk_batch([without_route]) == [trained_predictor.predict_delay_risk(filled)]
+
+def test_route_history_and_unseen_airports(trained_predictor):
+    history = trained_predictor.route_history('JFK', 'LAX')
+    assert history['route_flights'] > 0 and 0 <= history['route_delay_rate'] <= 1
+    unseen = trained_predictor.route_history('XXX', 'LAX')
+    assert unseen['route_flights'] == 0 and unseen['origin_delay_rate'] is None
+    assert unseen['dest_delay_rate'] == history['dest_delay_rate']
+
+def test_defaults_without_a_feature_store(bundle_path, feature_rows):
+    predictor = load_predictor(bundle_path)
+    predictor.feature_store = None
+    row = {col: value for col, value in feature_rows[0].items() if col not in ROUTE_FEATURES}
+    filled = predictor._fill_route_features(row)
+    assert {col: filled[col] for col in ROUTE_FEATURES} == ROUTE_FEATURE_DEFAULTS
+    assert predictor.route_history('JFK', 'LAX') is None
+
+def test_unhashable_airports_are_invalid_not_type_errors(bundle_path, feature_rows):
+    predictor = load_predictor(bundle_path, prediction_cache=PredictionCache())
+    bad = dict(feature_rows[0], origin_airport=['JFK'])
+    with pytest.raises(ValueError, match='Invalid value for field: origin_airport'):
+        predictor.predict_delay_risk(bad)
+    error = {'error': 'Invalid value for field: origin_airport'}
+    assert predictor.predict_delay_risk_batch([feature_rows[1], bad])[1] == error
+    assert predictor.predict_delay_risk_many([feature_rows[1], bad, feature_rows[2]])[1] == error
+    assert predictor.route_history({'code': 'JFK'}, 'LAX')['route_flights'] == 0
+
+def test_api_rejects_non_string_codes(client):
+    flight = dict(SAMPLE_FLIGHT, origin_airport=['JFK'])
+    response = client.post('/api/predict-delay', json=flight)
+    assert response.status_code == 400
+    assert response.json == {'error': 'Invalid value for field: origin_airport'}
+
+    batch = client.post('/api/batch-predict', json=[SAMPLE_FLIGHT, dict(SAMPLE_FLIGHT, airline=7)]).json['predictions']
+    assert 'delay_probability' in batch[0]
+    assert batch[1] == {'flight_index': 1, 'error': 'Invalid value for field: airline'}
@@ -0,0 +1,18 @@
+from import_report import import_report, parse_importtime
+
+def test_parse_importtime_keeps_top_level_imports():
+    stderr = '\n'.join([
+        'import time: self [us] | cumulative | imported package',
+        'import time:       100 |        100 |   _io',
+        'import time:      2000 |       5000 | numpy',
+        'import time:       300 |        300 |     numpy.core',
+        'import time:       700 |       1200 | json',
+        'unrelated line'
+    ])
+    assert parse_importtime(stderr) == [(5.0, 'numpy'), (1.2, 'json')]
+
+def test_serving_a_compiled_bundle_skips_the_training_stack(bundle_path):
+    report = import_report(model_path=bundle_path, inference_engine='compiled', timeout=60)
+    assert report['training_only_modules'] == []
+    assert report['ready_ms'] >= report['import_ms'] > 0
+    assert report['slowest_imports']
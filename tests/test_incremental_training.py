@@ -0,0 +1,81 @@
+import multiprocessing
+
+import numpy as np
+import pytest
+
+from conftest import load_predictor, quiet
+from parallel_training import fit_forest_parallel, merge_forests
+from worker_pool import InferenceWorkerPool
+
+@pytest.fixture
+def predictor(bundle_path):
+    return load_predictor(bundle_path)
+
+def update(predictor, random_state, **kwargs):
+    df = predictor.generate_synthetic_data(n_samples=1500, random_state=random_state)
+    with quiet():
+        predictor.update_model(df, n_estimators=10, n_workers=1, verbose=False, **kwargs)
+
+def test_update_adds_a_generation_of_trees(predictor, feature_rows):
+    old_model = predictor.model
+    n_trees = len(old_model.estimators_)
+    version = predictor.model_version
+    update(predictor, random_state=11)
+    assert len(predictor.model.estimators_) == n_trees + 10
+    assert predictor.model is not old_model and len(old_model.estimators_) == n_trees
+    assert predictor.model_generation == 1
+    assert predictor.tree_generations == [0] * n_trees + [1] * 10
+    assert version is not None and predictor.model_version is None
+    results = predictor.predict_delay_risk_batch(feature_rows[:20])
+    assert all(0 <= result['delay_probability'] <= 1 for result in results)
+
+def test_old_generations_are_pruned(predictor):
+    update(predictor, random_state=11)
+    update(predictor, random_state=12, max_tree_age=2)
+    assert predictor.tree_generations == [1] * 10 + [2] * 10
+    assert len(predictor.model.estimators_) == predictor.model.n_estimators == 20
+
+def test_rejected_update_leaves_the_predictor_unchanged(predictor, feature_rows):
+    state = (predictor.model, len(predictor.model.estimators_), predictor.model_generation,
+             list(predictor.tree_generations), predictor.manifest, predictor.compiled_model,
+             predictor.feature_store, predictor.metrics)
+    expected = predictor.predict_delay_risk_batch(feature_rows)
+    with pytest.raises(ValueError):
+        update(predictor, random_state=11, max_tree_age=0)
+    assert (predictor.model, len(predictor.model.estimators_), predictor.model_generation,
+            list(predictor.tree_generations), predictor.manifest, predictor.compiled_model,
+            predictor.feature_store, predictor.metrics) == state
+    assert predictor.predict_delay_risk_batch(feature_rows) == expected
+
+@pytest.mark.skipif('fork' not in multiprocessing.get_all_start_methods(),
+                    reason='the worker pool forks its workers')
+def test_worker_pool_serves_the_updated_trees(bundle_path, feature_rows):
+    predictor = load_predictor(bundle_path)
+    predictor.manifest = None  # An unsaved model: no version to compare
+    pool = InferenceWorkerPool(predictor, n_workers=2, min_rows_per_worker=50)
+    try:
+        with quiet():
+            before, _ = pool.predict_delay_probabilities(feature_rows)
+            update(predictor, random_state=11)
+            after, _ = pool.predict_delay_probabilities(feature_rows)
+        expected, _ = predictor.predict_delay_probabilities(feature_rows)
+        np.testing.assert_array_equal(after, expected)
+        assert not np.array_equal(after, before)
+    finally:
+        pool.close()
+
+def test_parallel_fit_builds_the_requested_trees():
+    rng = np.random.default_rng(0)
+    X = rng.normal(size=(600, 4))
+    y = (X[:, 0] + rng.normal(scale=0.5, size=600) > 0).astype(int)
+    forest = fit_forest_parallel(X, y, n_estimators=7, n_workers=1, n_partitions=3)
+    assert len(forest.estimators_) == forest.n_estimators == 7
+    assert forest.predict_proba(X).shape == (600, 2)
+
+def test_merge_rejects_forests_over_different_features():
+    rng = np.random.default_rng(0)
+    y = np.arange(100) % 2
+    a = fit_forest_parallel(rng.normal(size=(100, 3)), y, n_estimators=2, n_workers=1)
+    b = fit_forest_parallel(rng.normal(size=(100, 4)), y, n_estimators=2, n_workers=1)
+    with pytest.raises(ValueError):
+        merge_forests([a, b])
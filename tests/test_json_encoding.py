@@ -0,0 +1,72 @@
+import json
+
+import numpy as np
+import pytest
+
+import json_encoding
+from conftest import SAMPLE_FLIGHT
+
+@pytest.fixture(params=['orjson', 'json'])
+def encoder(request, monkeypatch):
+    if request.param == 'orjson':
+        pytest.importorskip('orjson')
+    else:
+        monkeypatch.setattr(json_encoding, 'orjson', None)
+    return json_encoding.dumps
+
+def test_numpy_values_and_nan(encoder):
+    payload = {
+        'probabilities': np.array([0.25, np.nan, 1.0]),
+        'scores': np.array([25, 0, 100]),
+        'count': np.int64(3),
+        'mean': np.float64(np.nan),
+        'nested': [(1.5, float('nan'))],
+        'levels': ['Low', None, 'High'],
+        'route': 'São Paulo → Zürich'
+    }
+    encoded = encoder(payload)
+    assert isinstance(encoded, bytes)
+    assert 'São Paulo → Zürich'.encode('utf-8') in encoded
+    assert json.loads(encoded) == {
+        'probabilities': [0.25, None, 1.0], 'scores': [25, 0, 100], 'count': 3, 'mean': None, 'nested': [[1.5, None]],
+        'levels': ['Low', None, 'High'], 'route': 'São Paulo → Zürich'
+    }
+
+def test_infinity_is_written_as_null(encoder):
+    payload = {
+        'probabilities': np.array([np.inf, 0.5, -np.inf]),
+        'max': np.float64(np.inf),
+        'min': np.float32(-np.inf),
+        'nested': [(float('inf'), 2.5)]
+    }
+    encoded = encoder(payload)
+    assert b'Infinity' not in encoded
+    assert json.loads(encoded) == {'probabilities': [None, 0.5, None], 'max': None, 'min': None,
+                                   'nested': [[None, 2.5]]}
+
+def test_unsupported_types_raise(encoder):
+    with pytest.raises(TypeError):
+        encoder({'value': object()})
+
+def test_columnar_batches_match_rows(client):
+    flights = [SAMPLE_FLIGHT, dict(SAMPLE_FLIGHT, airline='DL', temperature=40.0),
+               dict(SAMPLE_FLIGHT, temperature='warm'), {'airline': 'AA'}]
+    rows = client.post('/api/batch-predict', json=flights).json['predictions']
+    response = client.post('/api/batch-predict?format=columnar', json=flights)
+    assert response.mimetype == 'application/vnd.flight-delay.columnar+json'
+    columnar = json.loads(response.data)
+    assert columnar['count'] == len(flights)
+    for i, row in enumerate(rows):
+        if 'error' in row:
+            assert columnar['delay_probability'][i] is None and columnar['risk_level'][i] is None
+        else:
+            assert columnar['delay_probability'][i] == row['delay_probability']
+            assert columnar['risk_score'][i] == row['risk_score']
+            assert columnar['risk_level'][i] == row['risk_level']
+    assert columnar['errors'] == [{'flight_index': row['flight_index'], 'error': row['error']}
+                                  for row in rows if 'error' in row]
+
+    accepted = client.post('/api/batch-predict', json=flights,
+                           headers={'Accept': 'application/vnd.flight-delay.columnar+json'})
+    assert json.loads(accepted.data) == columnar
+    assert client.post('/api/batch-predict?format=xml', json=flights).status_code == 400
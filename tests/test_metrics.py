@@ -0,0 +1,68 @@
+import re
+import time
+
+import pytest
+
+from conftest import SAMPLE_FLIGHT
+from metrics import REGISTRY, MetricsRegistry, stage_timer
+from profiler import SlowRequestProfiler
+
+STACK_LINE = re.compile(r'^[^ #][^ ]* \d+$')
+
+def test_registry_renders_prometheus_text():
+    registry = MetricsRegistry()
+    registry.counter('requests_total', 'Requests')
+    registry.histogram('latency_seconds', 'Latency', buckets=(0.1, 1.0))
+    registry.gauge('ready', 'Readiness', lambda: 1)
+    registry.inc('requests_total', endpoint='predict', status=200)
+    registry.inc('requests_total', endpoint='predict', status=200)
+    registry.observe('latency_seconds', 0.5, endpoint='predict')
+    text = registry.render()
+    assert 'requests_total{endpoint="predict",status="200"} 2' in text
+    assert 'latency_seconds_bucket{endpoint="predict",le="0.1"} 0' in text
+    assert 'latency_seconds_bucket{endpoint="predict",le="1.0"} 1' in text
+    assert 'latency_seconds_bucket{endpoint="predict",le="+Inf"} 1' in text
+    assert 'latency_seconds_count{endpoint="predict"} 1' in text
+    assert 'ready 1.0' in text
+
+def test_stage_timer_observes_the_stage():
+    before = REGISTRY.snapshot()['histograms'].get('flight_delay_stage_seconds{stage="test_stage"}', {'count': 0})
+    with stage_timer('test_stage'):
+        time.sleep(0.001)
+    after = REGISTRY.snapshot()['histograms']['flight_delay_stage_seconds{stage="test_stage"}']
+    assert after['count'] == before['count'] + 1 and after['sum'] >= 0.001
+
+def test_prediction_stages_reach_the_metrics_endpoint(client):
+    client.post('/api/predict-delay', json=SAMPLE_FLIGHT)
+    text = client.get('/api/metrics').get_data(as_text=True)
+    assert 'flight_delay_stage_seconds_count{stage="parse_request"}' in text
+    assert client.get('/api/metrics/profiles').status_code == 404
+
+def slow_handler(profiler, label, duration):
+    profiler.begin()
+    time.sleep(0.03)
+    profiler.end(label, duration)
+
+@pytest.fixture
+def profiler():
+    profiler = SlowRequestProfiler(top_n=2, interval=0.001)
+    profiler.start()
+    yield profiler
+    profiler.stop()
+
+def test_profiler_keeps_the_slowest_requests(profiler):
+    for label, duration in (('GET /a', 0.01), ('GET /b', 0.05), ('GET /c', 0.03)):
+        slow_handler(profiler, label, duration)
+    assert [(label, duration) for label, duration, _ in profiler.profiles()] == [('GET /b', 0.05), ('GET /c', 0.03)]
+
+def test_collapsed_output_is_plain_stack_lines(profiler):
+    slow_handler(profiler, 'GET /a', 0.03)
+    slow_handler(profiler, 'GET /b', 0.03)
+    lines = profiler.collapsed().splitlines()
+    assert lines and all(STACK_LINE.match(line) for line in lines)
+    frames = lines[0].rsplit(' ', 1)[0].split(';')
+    assert 'test_metrics.py:slow_handler' in frames
+    assert all(re.fullmatch(r'[^:;]+:[^:;]+', frame) for frame in frames)
+    per_request = sum(int(line.rsplit(' ', 1)[1]) for _, _, stacks in profiler.profiles()
+                      for line in stacks.splitlines())
+    assert sum(int(line.rsplit(' ', 1)[1]) for line in lines) == per_request
@@ -0,0 +1,54 @@
+import json
+import os
+
+import pytest
+
+import model_bundle
+from conftest import load_predictor, quiet
+
+def test_bundle_round_trip_predicts_identically(trained_predictor, bundle_path, feature_rows):
+    loaded = load_predictor(bundle_path)
+    assert loaded.predict_delay_risk_batch(feature_rows) == trained_predictor.predict_delay_risk_batch(feature_rows)
+
+def test_manifest_describes_the_model(trained_predictor, bundle_path):
+    manifest = model_bundle.read_manifest(bundle_path)
+    assert manifest['format'] == model_bundle.BUNDLE_FORMAT
+    assert manifest['feature_columns'] == trained_predictor.feature_columns
+    assert manifest['n_estimators'] == len(trained_predictor.model.estimators_)
+    assert load_predictor(bundle_path).model_version == manifest['model_version']
+
+def test_bundle_with_compiled_arrays_loads_the_forest_lazily(bundle_path):
+    predictor = load_predictor(bundle_path, inference_engine='compiled')
+    assert predictor._deferred_bundle is not None and predictor.has_model
+    assert predictor.model is not None
+    assert predictor._deferred_bundle is None
+
+def test_foreign_manifest_is_rejected(tmp_path):
+    with open(tmp_path / model_bundle.MANIFEST_FILE, 'w') as f:
+        json.dump({'format': 'something-else'}, f)
+    with pytest.raises(ValueError):
+        model_bundle.read_manifest(str(tmp_path))
+
+def test_legacy_pickle_is_used_when_no_bundle_exists(trained_predictor, feature_rows, tmp_path):
+    path = str(tmp_path / 'flight_delay_model')
+    assert model_bundle.resolve_model_path(path) == path
+    with quiet():
+        trained_predictor.save_model(path + '.pkl')
+    resolved = model_bundle.resolve_model_path(path)
+    assert resolved == path + '.pkl'
+    legacy = load_predictor(resolved)
+    assert legacy.predict_delay_risk_batch(feature_rows[:50]) == trained_predictor.predict_delay_risk_batch(feature_rows[:50])
+
+    with quiet():
+        legacy.save_bundle(path)
+    assert model_bundle.resolve_model_path(path) == path
+    assert model_bundle.resolve_model_path(path + os.sep) == path + os.sep
+
+def test_saving_over_a_file_replaces_it(trained_predictor, tmp_path):
+    path = tmp_path / 'flight_delay_model'
+    path.write_text('not a model')
+    with quiet():
+        trained_predictor.save_bundle(str(path))
+    assert model_bundle.is_bundle(str(path))
+    assert sorted(os.listdir(tmp_path)) == ['flight_delay_model']
+    assert model_bundle.bundle_path(str(path) + '.pkl') == str(path)
@@ -0,0 +1,70 @@
+import contextlib
+import io
+import threading
+
+import model_bundle
+from conftest import SAMPLE_FLIGHT, quiet
+from flight_delay_predictor import FlightDelayPredictor
+from model_loader import BackgroundModelLoader
+
+def run_loader(path, n_samples=500):
+    loader = BackgroundModelLoader(FlightDelayPredictor(), path, n_samples=n_samples)
+    with quiet():
+        loader.start()
+        assert loader.wait(timeout=60)
+    return loader
+
+def test_missing_model_is_trained_and_saved(tmp_path):
+    path = str(tmp_path / 'flight_delay_model')
+    loader = run_loader(path)
+    assert model_bundle.is_bundle(path)
+    status = loader.status()
+    assert status['state'] == 'ready' and status['ready'] and status['error'] is None
+    assert status['started_at'] <= status['ready_at']
+
+def test_existing_model_is_loaded(bundle_path):
+    loader = run_loader(bundle_path)
+    assert loader.predictor.model_version == model_bundle.read_manifest(bundle_path)['model_version']
+
+def test_unreadable_model_is_retrained(tmp_path):
+    path = tmp_path / 'flight_delay_model'
+    path.write_text('not a model')
+    run_loader(str(path))
+    assert model_bundle.is_bundle(str(path))
+
+def test_unreadable_legacy_pickle_is_retrained_into_a_bundle(tmp_path):
+    (tmp_path / 'flight_delay_model.pkl').write_text('not a model')
+    path = model_bundle.resolve_model_path(str(tmp_path / 'flight_delay_model'))
+    loader = run_loader(path)
+    assert loader.model_path == str(tmp_path / 'flight_delay_model')
+    assert model_bundle.is_bundle(loader.model_path)
+    assert (tmp_path / 'flight_delay_model.pkl').is_file()
+    assert model_bundle.resolve_model_path(str(tmp_path / 'flight_delay_model')) == loader.model_path
+
+def test_training_failure_is_reported(tmp_path):
+    predictor = FlightDelayPredictor()
+    def fail(*args, **kwargs):
+        raise RuntimeError('out of memory')
+    predictor.train_model = fail
+    loader = BackgroundModelLoader(predictor, str(tmp_path / 'flight_delay_model'), n_samples=500)
+    with quiet(), contextlib.redirect_stderr(io.StringIO()):
+        loader.start()
+        loader._thread.join(timeout=60)
+    assert not loader.ready
+    assert loader.status()['state'] == 'failed'
+    assert loader.status()['error'] == 'out of memory'
+
+def test_endpoints_answer_503_until_ready(api, client, monkeypatch):
+    monkeypatch.setattr(api.model_loader, '_ready', threading.Event())
+    monkeypatch.setattr(api.model_loader, 'state', 'training')
+    response = client.post('/api/predict-delay', json=SAMPLE_FLIGHT)
+    assert response.status_code == 503
+    assert response.headers['Retry-After'] == str(api.RETRY_AFTER_SECONDS)
+    assert response.json['model_state'] == 'training'
+    assert client.get('/api/ready').status_code == 503
+    health = client.get('/api/health')
+    assert health.status_code == 200 and health.json['ready'] is False
+
+def test_endpoints_serve_once_ready(client):
+    assert client.get('/api/ready').status_code == 200
+    assert client.post('/api/predict-delay', json=SAMPLE_FLIGHT).status_code == 200
@@ -0,0 +1,102 @@
+import os
+import shutil
+import time
+
+import pytest
+
+from conftest import load_predictor, quiet
+from drift_monitor import DriftMonitor
+from model_swap import ModelSwapper
+from prediction_cache import PredictionCache
+
+@pytest.fixture
+def swapper(bundle_path, feature_rows):
+    predictor = load_predictor(bundle_path, prediction_cache=PredictionCache(), drift_monitor=DriftMonitor())
+    predictor.predict_delay_risk(feature_rows[0])
+    retired = []
+    swapper = ModelSwapper(predictor, bundle_path, on_retire=retired.append)
+    swapper.retired = retired
+    return swapper
+
+def reload(swapper, path=None):
+    with quiet():
+        assert swapper.reload(path, wait=True)
+    assert swapper.status()['state'] == 'idle', swapper.status()['error']
+
+def test_swap_moves_and_resets_the_cache_and_monitor(swapper, feature_rows):
+    old = swapper.current()
+    cache, monitor = old.prediction_cache, old.drift_monitor
+    assert cache.stats()['size'] == 1 and monitor.summary()['rows'] == 1
+    reload(swapper)
+    new = swapper.current()
+    assert new is not old and swapper.retired == [old]
+    assert new.prediction_cache is cache and new.drift_monitor is monitor
+    assert old.prediction_cache is None and old.drift_monitor is None
+    assert cache.stats()['size'] == 0 and monitor.summary()['rows'] == 0
+    assert swapper.status()['last_swap']['model_version'] == new.model_version
+
+def test_leased_models_drain_before_they_are_retired(swapper, feature_rows):
+    with swapper.lease() as old:
+        leased_again = swapper.acquire()
+        reload(swapper)
+        # Detached at the swap, while requests still hold the old model
+        assert old.prediction_cache is None and old.drift_monitor is None
+        assert old.predict_delay_risk(feature_rows[1])['delay_probability'] >= 0
+        assert swapper.current().prediction_cache.stats()['size'] == 0
+        status = swapper.status()
+        assert status['in_flight'] == 0
+        assert [entry['in_flight'] for entry in status['draining']] == [2]
+        swapper.release(leased_again)
+        assert swapper.retired == []
+    assert swapper.retired == [old] and swapper.status()['draining'] == []
+
+def test_failed_reload_keeps_the_active_model(swapper, tmp_path):
+    active = swapper.current()
+    (tmp_path / 'broken.pkl').write_bytes(b'not a model')
+    with quiet():
+        swapper.reload(str(tmp_path / 'broken.pkl'), wait=True)
+    assert swapper.status()['state'] == 'failed' and swapper.current() is active
+
+def wait_for(condition, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while not condition() and time.monotonic() < deadline:
+        time.sleep(0.02)
+    return condition()
+
+def test_watch_does_not_reload_an_unchanged_pickle(trained_predictor, tmp_path):
+    path = str(tmp_path / 'flight_delay_model.pkl')
+    with quiet():
+        trained_predictor.save_model(path)
+    swapper = ModelSwapper(load_predictor(path), path)
+    with quiet():
+        swapper.watch(0.02)
+        time.sleep(0.2)
+        assert swapper.swaps == 0
+        mtime = os.path.getmtime(path) + 10
+        os.utime(path, (mtime, mtime))
+        assert wait_for(lambda: swapper.swaps == 1 and swapper.state == 'idle')
+        time.sleep(0.1)
+    assert swapper.swaps == 1
+
+def test_reload_endpoint_only_loads_from_the_model_directory(api, client, tmp_path):
+    assert client.post('/api/admin/reload-model', json={'model_path': '/etc'}).status_code == 403
+    outside = tmp_path / 'outside'
+    shutil.copytree(api.model_path, outside)
+    link = os.path.join(api.model_dir, 'linked_model')
+    os.symlink(outside, link)
+    try:
+        assert client.post('/api/admin/reload-model', json={'model_path': link}).status_code == 403
+        assert client.post('/api/admin/reload-model', json={'model_path': 7}).status_code == 400
+        missing = os.path.join(api.model_dir, 'missing')
+        assert client.post('/api/admin/reload-model', json={'model_path': missing}).status_code == 400
+    finally:
+        os.unlink(link)
+
+    copy = os.path.join(api.model_dir, 'model_copy')
+    shutil.copytree(api.model_path, copy)
+    swaps = api.swapper.swaps
+    with quiet():
+        response = client.post('/api/admin/reload-model?wait=true', json={'model_path': copy})
+    assert response.status_code == 200 and response.json['swaps'] == swaps + 1
+    assert response.json['last_swap']['model_path'] == copy
+    assert api.batch_scorer(api.swapper.current()) is api.swapper.current()
@@ -0,0 +1,86 @@
+import time
+
+import numpy as np
+import pandas as pd
+
+from conftest import SAMPLE_FLIGHT, load_predictor
+from drift_monitor import DriftMonitor
+from prediction_cache import COARSE_BUCKETS, PredictionCache
+
+def cached_predictor(bundle_path, **cache_kwargs):
+    return load_predictor(bundle_path, prediction_cache=PredictionCache(**cache_kwargs),
+                          drift_monitor=DriftMonitor())
+
+def test_cache_does_not_change_predictions(bundle_path, feature_rows):
+    uncached = load_predictor(bundle_path)
+    cached = cached_predictor(bundle_path)
+    expected = [uncached.predict_delay_risk(row) for row in feature_rows]
+    assert [cached.predict_delay_risk(row) for row in feature_rows] == expected
+    assert [cached.predict_delay_risk(row) for row in feature_rows] == expected
+    stats = cached.prediction_cache.stats()
+    assert stats['hits'] == len(feature_rows) and stats['misses'] == len(feature_rows)
+
+def test_single_and_batch_endpoints_agree_with_the_default_cache(api, client):
+    flight = dict(SAMPLE_FLIGHT, temperature=84.4, origin_congestion=0.72)
+    batch = client.post('/api/batch-predict', json=[flight]).json['predictions'][0]
+    for _ in range(2):
+        single = client.post('/api/predict-delay', json=flight).json
+        assert single['delay_probability'] == batch['delay_probability']
+
+def test_nearby_flights_get_their_own_entries(bundle_path, feature_rows):
+    cached = cached_predictor(bundle_path)
+    row = feature_rows[0]
+    cached.predict_delay_risk(row)
+    cached.predict_delay_risk(dict(row, temperature=row['temperature'] + 0.01))
+    assert cached.prediction_cache.stats()['hits'] == 0
+
+def test_bucketing_is_opt_in_and_only_affects_the_key(bundle_path, feature_rows):
+    uncached = load_predictor(bundle_path)
+    cached = cached_predictor(bundle_path, buckets=COARSE_BUCKETS)
+    row = dict(feature_rows[0], temperature=70.2)
+    assert cached.predict_delay_risk(row) == uncached.predict_delay_risk(row)
+    assert cached.predict_delay_risk(dict(row, temperature=70.3)) == uncached.predict_delay_risk(row)
+    assert cached.prediction_cache.stats()['hits'] == 1
+
+def test_cache_hits_are_observed_by_the_drift_monitor(bundle_path, feature_rows):
+    uncached = load_predictor(bundle_path, drift_monitor=DriftMonitor())
+    cached = cached_predictor(bundle_path)
+    for _ in range(2):
+        for row in feature_rows[:50]:
+            uncached.predict_delay_risk(row)
+            cached.predict_delay_risk(row)
+    assert cached.prediction_cache.stats()['hits'] == 50
+    expected, actual = uncached.drift_monitor.summary(), cached.drift_monitor.summary()
+    assert actual['rows'] == expected['rows'] == 100
+    assert actual['features'] == expected['features']
+    assert actual['scores'] == expected['scores']
+
+def test_feature_row_encodes_like_preprocessing(trained_predictor, feature_rows):
+    rows = [dict(feature_rows[0], airline='ZZ'), feature_rows[1]]
+    expected = trained_predictor.preprocess_data(pd.DataFrame(rows))[trained_predictor.feature_columns]
+    actual = np.vstack([trained_predictor._feature_row(row) for row in rows])
+    np.testing.assert_array_equal(actual, expected.to_numpy(dtype=float))
+
+def test_new_model_version_invalidates_entries():
+    cache = PredictionCache()
+    cache.set('v1|a', {'delay_probability': 0.5})
+    assert cache.get('v1|a') == {'delay_probability': 0.5}
+    assert cache.get('v2|a') is None
+    assert cache.stats()['invalidations'] == 1 and cache.stats()['size'] == 0
+
+def test_least_recently_used_entries_are_evicted():
+    cache = PredictionCache(max_size=2)
+    for key in ('v|a', 'v|b'):
+        cache.set(key, {'value': key})
+    cache.get('v|a')
+    cache.set('v|c', {'value': 'c'})
+    assert cache.get('v|b') is None
+    assert cache.get('v|a') is not None and cache.get('v|c') is not None
+    assert cache.stats()['evictions'] == 1
+
+def test_entries_expire_after_the_ttl():
+    cache = PredictionCache(ttl=0.01)
+    cache.set('v|a', {'value': 1})
+    time.sleep(0.02)
+    assert cache.get('v|a') is None
+    assert cache.stats()['expirations'] == 1
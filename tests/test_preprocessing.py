@@ -0,0 +1,35 @@
+import numpy as np
+import pandas as pd
+
+from flight_delay_predictor import CATEGORICAL_COLUMNS
+
+def test_lookup_encoding_matches_label_encoders(trained_predictor, training_data):
+    encoded = trained_predictor.preprocess_data(training_data)
+    for col in CATEGORICAL_COLUMNS:
+        expected = trained_predictor.label_encoders[col].transform(training_data[col])
+        np.testing.assert_array_equal(encoded[col].to_numpy(), expected)
+
+def test_unseen_categories_encode_as_minus_one(trained_predictor, training_data):
+    df = training_data.head(3).copy()
+    df['airline'] = ['ZZ', 'AA', None]
+    encoded = trained_predictor.preprocess_data(df)
+    assert encoded['airline'].tolist()[0] == -1
+    assert encoded['airline'].tolist()[1] == trained_predictor.category_lookups['airline'].get_loc('AA')
+    assert encoded['airline'].tolist()[2] == -1
+
+def test_categorical_dtype_encodes_like_object_columns(trained_predictor, training_data):
+    df = training_data.head(500).copy()
+    df.loc[df.index[:5], 'origin_airport'] = 'XXX'
+    as_category = df.astype({col: 'category' for col in CATEGORICAL_COLUMNS})
+    pd.testing.assert_frame_equal(
+        trained_predictor.preprocess_data(as_category)[CATEGORICAL_COLUMNS],
+        trained_predictor.preprocess_data(df)[CATEGORICAL_COLUMNS],
+        check_dtype=False
+    )
+
+def test_preprocess_copies_unless_asked_not_to(trained_predictor, training_data):
+    df = training_data.head(10).copy()
+    trained_predictor.preprocess_data(df)
+    assert not pd.api.types.is_numeric_dtype(df['airline'])
+    trained_predictor.preprocess_data(df, copy=False)
+    assert pd.api.types.is_integer_dtype(df['airline'])
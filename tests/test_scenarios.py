@@ -0,0 +1,44 @@
+import itertools
+
+import numpy as np
+import pytest
+
+from conftest import SAMPLE_FLIGHT
+
+def test_sweep_matches_batch_scoring(trained_predictor, feature_rows):
+    flight = {col: value for col, value in feature_rows[0].items()
+              if col not in ('origin_congestion', 'dest_congestion')}
+    grid = {'departure_hour': [6, 12, 18, 22], 'month': [1, 7], 'temperature': [20.0, 85.5, 101.0]}
+    probabilities = trained_predictor.predict_scenarios(flight, grid)
+    assert probabilities.shape == (4, 2, 3)
+
+    scenarios = [dict(flight, **dict(zip(grid, values))) for values in itertools.product(*grid.values())]
+    expected, errors = trained_predictor.predict_delay_probabilities(scenarios)
+    assert errors == [None] * len(scenarios)
+    np.testing.assert_allclose(probabilities.ravel(), expected, rtol=0, atol=1e-12)
+
+@pytest.mark.parametrize('grid, message', [
+    ({'airline': ['AA']}, 'Cannot vary airline'),
+    ({'month': []}, 'non-empty list of numbers'),
+    ({'month': ['July']}, 'non-empty list of numbers'),
+    ({'wind_speed': [1.0, float('nan')]}, 'non-empty list of numbers')
+])
+def test_invalid_grids_are_rejected(trained_predictor, feature_rows, grid, message):
+    with pytest.raises(ValueError, match=message):
+        trained_predictor.predict_scenarios(feature_rows[0], grid)
+
+def test_scenario_endpoint(client):
+    grid = {'departure_hour': [7, 19], 'precipitation': [0.0, 0.5, 1.5]}
+    body = client.post('/api/predict-scenarios', json={'flight': SAMPLE_FLIGHT, 'grid': grid}).json
+    assert body['fields'] == ['departure_hour', 'precipitation'] and body['shape'] == [2, 3]
+    probabilities = np.array(body['delay_probability'])
+    assert probabilities.shape == (2, 3)
+    assert body['lowest_risk']['delay_probability'] == probabilities.min()
+
+    response = client.post('/api/predict-scenarios', json={'flight': SAMPLE_FLIGHT, 'grid': {'month': 7}})
+    assert response.status_code == 400 and response.json == {'error': 'Grid values must be lists'}
+    too_big = {'month': list(range(1000)), 'departure_hour': list(range(1000))}
+    assert client.post('/api/predict-scenarios', json={'flight': SAMPLE_FLIGHT, 'grid': too_big}).status_code == 400
+    missing = {key: value for key, value in SAMPLE_FLIGHT.items() if key != 'airline'}
+    response = client.post('/api/predict-scenarios', json={'flight': missing, 'grid': grid})
+    assert response.status_code == 400 and response.json == {'error': 'Missing required field: airline'}
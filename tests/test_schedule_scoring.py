@@ -0,0 +1,86 @@
+import sqlite3
+
+import pytest
+
+from conftest import quiet
+from database_pool import ConnectionPool
+from schedule_scoring import ScheduleScoringJob
+
+AIRPORTS = ['JFK', 'LAX', 'ORD', 'Delhi', 'Mumbai']
+
+@pytest.fixture
+def database(tmp_path):
+    path = tmp_path / 'airline.db'
+    connection = sqlite3.connect(path)
+    connection.execute('CREATE TABLE FlightTbl (FlCode VARCHAR(10) PRIMARY KEY, FlSource VARCHAR(50) NOT NULL, '
+                       'FlDest VARCHAR(50) NOT NULL, FlDate DATE NOT NULL, FlSeats INT NOT NULL)')
+    connection.executemany('INSERT INTO FlightTbl VALUES (?, ?, ?, ?, ?)', [
+        (f'{airline}{i:03d}', AIRPORTS[i % 5], AIRPORTS[(i + 1) % 5], f'2030-0{1 + i % 9}-1{i % 10}', 180)
+        for airline in ('AA', 'DL') for i in range(25)
+    ])
+    connection.commit()
+    connection.close()
+    pool = ConnectionPool(f'sqlite:///{path}', size=2)
+    yield pool, path
+    pool.close()
+
+def run_job(pool, predictor, **kwargs):
+    job = ScheduleScoringJob(pool, predictor, chunk_size=20, from_date='2030-01-01', **kwargs)
+    with quiet():
+        return job.run()
+
+def predictions(path):
+    with sqlite3.connect(path) as connection:
+        return dict((row[0], row[1:]) for row in connection.execute(
+            'SELECT PredFlightCode, PredProbability, PredRiskLevel, PredInputHash FROM FlightDelayPredictionTbl'))
+
+def test_scores_every_flight_in_chunks(database, trained_predictor):
+    pool, path = database
+    stats = run_job(pool, trained_predictor)
+    assert (stats['chunks'], stats['flights_read'], stats['scored'], stats['errors']) == (3, 50, 50, 0)
+    scored = predictions(path)
+    assert len(scored) == 50
+
+    job = ScheduleScoringJob(pool, trained_predictor, chunk_size=20)
+    chunk = job._read_chunk('')
+    expected = trained_predictor.predict_delay_risk_batch(job.flight_features(chunk))
+    assert [scored[code][0] for code in chunk['FlCode']] == [result['delay_probability'] for result in expected]
+
+def test_rerun_only_rescores_changed_flights(database, trained_predictor):
+    pool, path = database
+    run_job(pool, trained_predictor)
+    stats = run_job(pool, trained_predictor)
+    assert (stats['scored'], stats['unchanged']) == (0, 50)
+
+    with pool.connection() as connection:
+        connection.execute("UPDATE FlightTbl SET FlDest = 'ORD', FlSource = 'JFK' WHERE FlCode = 'DL007'")
+    before = predictions(path)
+    stats = run_job(pool, trained_predictor)
+    assert (stats['scored'], stats['unchanged']) == (1, 49)
+    after = predictions(path)
+    assert after['DL007'][2] != before['DL007'][2]
+    assert {code: row for code, row in after.items() if code != 'DL007'} == \
+        {code: row for code, row in before.items() if code != 'DL007'}
+
+def test_interrupted_run_resumes_after_the_checkpoint(database, trained_predictor, monkeypatch):
+    pool, path = database
+    score_chunk = ScheduleScoringJob._score_chunk
+    calls = []
+
+    def failing_score_chunk(job, chunk):
+        calls.append(chunk['FlCode'].iloc[-1])
+        if len(calls) == 2:
+            raise RuntimeError('interrupted')
+        return score_chunk(job, chunk)
+
+    monkeypatch.setattr(ScheduleScoringJob, '_score_chunk', failing_score_chunk)
+    with pytest.raises(RuntimeError):
+        run_job(pool, trained_predictor)
+    assert len(predictions(path)) == 20
+
+    stats = run_job(pool, trained_predictor)
+    assert stats['resumed_after'] == calls[0]
+    assert (stats['flights_read'], stats['scored']) == (30, 30)
+    assert len(predictions(path)) == 50
+    # A completed run starts from the beginning next time
+    assert run_job(pool, trained_predictor)['resumed_after'] is None
@@ -0,0 +1,47 @@
+import csv
+import io
+import json
+
+from conftest import SAMPLE_FLIGHT
+
+FLIGHTS = [
+    SAMPLE_FLIGHT,
+    dict(SAMPLE_FLIGHT, airline='DL', temperature=40.5),
+    dict(SAMPLE_FLIGHT, origin_airport='ORD', dest_airport='SEA', distance=1720),
+    dict(SAMPLE_FLIGHT, temperature='warm'),
+    dict(SAMPLE_FLIGHT, precipitation=1.2, wind_speed=31)
+]
+
+def stream(client, body, content_type, **params):
+    response = client.post('/api/batch-predict/stream', data=body, content_type=content_type,
+                           query_string=params)
+    assert response.status_code == 200
+    return [json.loads(line) for line in response.get_data(as_text=True).splitlines()]
+
+def expected_predictions(client):
+    return client.post('/api/batch-predict', json=FLIGHTS).json['predictions']
+
+def test_ndjson_stream_matches_batch_endpoint(client):
+    body = '\n'.join(json.dumps(flight) for flight in FLIGHTS) + '\n\n'
+    assert stream(client, body, 'application/x-ndjson', chunk_size=2) == expected_predictions(client)
+
+def test_csv_stream_matches_batch_endpoint(client):
+    body = io.StringIO()
+    writer = csv.DictWriter(body, fieldnames=list(SAMPLE_FLIGHT))
+    writer.writeheader()
+    writer.writerows(FLIGHTS)
+    assert stream(client, body.getvalue(), 'text/csv', chunk_size=3) == expected_predictions(client)
+
+def test_unparseable_lines_become_error_rows(client):
+    body = json.dumps(SAMPLE_FLIGHT) + '\n{"airline": \n' + json.dumps(SAMPLE_FLIGHT) + '\n'
+    results = stream(client, body, 'application/x-ndjson')
+    assert [result['flight_index'] for result in results] == [0, 1, 2]
+    assert results[1]['error'].startswith('Invalid JSON')
+    assert results[0]['delay_probability'] == results[2]['delay_probability']
+
+def test_unsupported_body_and_bad_chunk_size_are_rejected(client):
+    response = client.post('/api/batch-predict/stream', data='x', content_type='text/plain')
+    assert response.status_code == 415
+    response = client.post('/api/batch-predict/stream', data='', content_type='text/csv',
+                           query_string={'chunk_size': 'many'})
+    assert response.status_code == 400
@@ -0,0 +1,41 @@
+import pandas as pd
+import pytest
+
+from flight_delay_predictor import AIRLINES, AIRPORTS, DEPARTURE_HOURS, FlightDelayPredictor
+
+def test_generation_is_reproducible():
+    predictor = FlightDelayPredictor()
+    pd.testing.assert_frame_equal(predictor.generate_synthetic_data(500, random_state=3),
+                                  predictor.generate_synthetic_data(500, random_state=3))
+
+def test_values_stay_in_their_domains():
+    df = FlightDelayPredictor().generate_synthetic_data(5000, random_state=0)
+    assert len(df) == 5000
+    assert set(df['airline']) <= set(AIRLINES)
+    assert set(df['origin_airport']) | set(df['dest_airport']) <= set(AIRPORTS)
+    assert (df['origin_airport'] != df['dest_airport']).all()
+    assert df['month'].between(1, 12).all() and df['day_of_week'].between(1, 7).all()
+    assert set(df['departure_hour']) <= set(DEPARTURE_HOURS)
+    assert set(df['is_delayed']) == {0, 1}
+    assert 0.2 < df['is_delayed'].mean() < 0.8
+
+def test_chunks_cover_the_requested_rows():
+    chunks = list(FlightDelayPredictor().iter_synthetic_data(2500, chunk_size=1000, random_state=5))
+    assert [len(chunk) for chunk in chunks] == [1000, 1000, 500]
+    combined = pd.concat(chunks)
+    assert combined.index.tolist() == list(range(2500))
+
+@pytest.mark.parametrize('file_format', ['csv', 'parquet'])
+def test_shards_round_trip(tmp_path, file_format):
+    predictor = FlightDelayPredictor()
+    paths = predictor.write_synthetic_data(str(tmp_path), 1200, chunk_size=500,
+                                           file_format=file_format, random_state=5)
+    assert [p.rsplit('/', 1)[-1] for p in paths] == [f'part-0000{i}.{file_format}' for i in range(3)]
+    read = pd.read_csv if file_format == 'csv' else pd.read_parquet
+    written = pd.concat([read(path) for path in paths], ignore_index=True)
+    expected = pd.concat(predictor.iter_synthetic_data(1200, chunk_size=500, random_state=5), ignore_index=True)
+    pd.testing.assert_frame_equal(written, expected, check_dtype=False)
+
+def test_unknown_file_format_is_rejected(tmp_path):
+    with pytest.raises(ValueError):
+        FlightDelayPredictor().write_synthetic_data(str(tmp_path), 10, file_format='json')
@@ -0,0 +1,80 @@
+import gc
+import multiprocessing
+
+import numpy as np
+import pytest
+
+from conftest import load_predictor, quiet
+from drift_monitor import DriftMonitor
+from worker_pool import InferenceWorkerPool
+
+pytestmark = pytest.mark.skipif('fork' not in multiprocessing.get_all_start_methods(),
+                                reason='the worker pool forks its workers')
+
+@pytest.fixture
+def pool_and_predictor(bundle_path):
+    predictor = load_predictor(bundle_path, drift_monitor=DriftMonitor())
+    pool = InferenceWorkerPool(predictor, n_workers=2, min_rows_per_worker=50)
+    with quiet():
+        pool.start()
+    yield pool, predictor
+    pool.close()
+
+def test_pool_matches_in_process_scoring(pool_and_predictor, bundle_path, feature_rows):
+    pool, _ = pool_and_predictor
+    rows = [dict(row) for row in feature_rows]
+    rows[120]['temperature'] = 'warm'
+    expected = load_predictor(bundle_path).predict_delay_risk_batch(rows)
+    assert pool.predict_delay_risk_batch(rows) == expected
+    probabilities, errors = pool.predict_delay_probabilities(rows)
+    np.testing.assert_array_equal(probabilities, [row.get('delay_probability', np.nan) for row in expected])
+    assert errors[120] == 'Invalid value for field: temperature'
+
+def test_pooled_rows_reach_the_parent_drift_monitor(pool_and_predictor, bundle_path, feature_rows):
+    pool, predictor = pool_and_predictor
+    in_process = load_predictor(bundle_path, drift_monitor=DriftMonitor())
+    in_process.predict_delay_probabilities(feature_rows)
+    pool.predict_delay_probabilities(feature_rows)
+    expected, actual = in_process.drift_monitor.summary(), predictor.drift_monitor.summary()
+    assert actual['rows'] == len(feature_rows)
+    assert actual['scores'] == expected['scores']
+    for col, stats in expected['features'].items():
+        assert actual['features'][col] == pytest.approx(stats, abs=1e-3)
+
+def test_unobserved_and_small_batches(pool_and_predictor, feature_rows):
+    pool, predictor = pool_and_predictor
+    pool.predict_delay_probabilities(feature_rows, observe=False)
+    assert predictor.drift_monitor.summary()['rows'] == 0
+    pool.predict_delay_risk_batch(feature_rows[:60])
+    assert predictor.drift_monitor.summary()['rows'] == 60
+
+def test_pools_of_two_models_share_the_frozen_heap(pool_and_predictor, bundle_path, feature_rows):
+    pool, predictor = pool_and_predictor
+    other = load_predictor(bundle_path)
+    other_pool = InferenceWorkerPool(other, n_workers=2, min_rows_per_worker=50)
+    with quiet():
+        pool.start()
+        other_pool.start()
+    try:
+        assert gc.get_freeze_count() > 0
+        other_pool.close()
+        assert gc.get_freeze_count() > 0
+        expected, _ = load_predictor(bundle_path).predict_delay_probabilities(feature_rows)
+        np.testing.assert_array_equal(pool.predict_delay_probabilities(feature_rows, observe=False)[0], expected)
+    finally:
+        other_pool.close()
+    pool.close()
+    assert gc.get_freeze_count() == 0
+
+def test_workers_are_reforked_when_the_model_changes(pool_and_predictor, feature_rows):
+    pool, predictor = pool_and_predictor
+    pool.predict_delay_probabilities(feature_rows, observe=False)
+    workers = pool._pool
+    pool.predict_delay_probabilities(feature_rows, observe=False)
+    assert pool._pool is workers
+    revision = predictor.model_revision
+    predictor._model_changed()
+    assert predictor.model_revision == revision + 1
+    with quiet():
+        pool.predict_delay_probabilities(feature_rows, observe=False)
+    assert pool._pool is not workers